@@ -0,0 +1,591 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from array import array
+from gc import disable, enable, isenabled
+from importlib.util import find_spec
+from io import BytesIO, BufferedReader, BufferedIOBase, BufferedWriter, FileIO
+from json import dumps, loads
+from mmap import mmap, ACCESS_READ
+from pathlib import Path
+from struct import Struct
+from sys import byteorder
+from threading import Lock
+from ..containers import MoleculeContainer, CGRContainer, QueryContainer, QueryCGRContainer, ReactionContainer
+from ..containers.bonds import Bond, DynamicBond
+from ..containers.common import Graph
+from ..periodictable import (Element, DynamicElement, QueryElement, DynamicQueryElement, AnyElement,
+                             DynamicAnyElement)
+
+
+class CGRBRead:
+    """
+    CGRtools binary files reader. works similar to opened file object. support `with` context manager.
+    on initialization accept string path to file, pathlib.Path object or opened in binary mode seekable file.
+    file contains molecules, CGRs, queries and reactions in packed arrays and footer with records offsets table.
+    reader is always indexable: supported methods seek, tell, object size and subscription.
+    files stored on disk are memory mapped.
+    """
+    def __init__(self, file):
+        """
+        :param file: path, binary file or memoryview of packed data, which is used without copying
+        """
+        if isinstance(file, memoryview):
+            self.__file = None
+            self.__is_buffer = True
+            self.__data = file
+        elif isinstance(file, (str, Path)):
+            self.__file = open(file, 'rb')
+            self.__is_buffer = False
+        elif isinstance(file, (BytesIO, BufferedReader, BufferedIOBase)):
+            self.__file = file
+            self.__is_buffer = True
+        else:
+            raise TypeError('invalid file. BytesIO, BufferedReader, BufferedIOBase and memoryview possible')
+
+        if self.__file is not None:
+            if isinstance(getattr(self.__file, 'raw', None), FileIO):
+                try:
+                    self.__data = mmap(self.__file.fileno(), 0, access=ACCESS_READ)
+                except ValueError:  # empty file
+                    raise ValueError('invalid CGRB file')
+            else:
+                self.__file.seek(0)
+                self.__data = self.__file.read()
+
+        data = self.__data
+        if len(data) < _header.size + _footer.size:
+            raise ValueError('invalid CGRB file')
+        magic, version = _header.unpack_from(data)
+        if magic != _magic:
+            raise ValueError('invalid CGRB file')
+        elif version != _version:
+            raise ValueError(f'unsupported CGRB file version: {version}')
+        count, table, magic = _footer.unpack_from(data, len(data) - _footer.size)
+        if magic != _end or table + (count + 1) * 8 + _footer.size != len(data):
+            raise ValueError('CGRB file is truncated or not closed')
+        self.__shifts = _unpack(data, table, 'Q', count + 1)
+
+    def close(self, force=False):
+        """
+        close opened file
+
+        :param force: force closing of externally opened file or buffer
+        """
+        if isinstance(self.__data, mmap):
+            self.__data.close()
+        self.__data = b''
+        if self.__file is not None and (not self.__is_buffer or force):
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.__shifts) - 1
+
+    def read(self):
+        """
+        parse whole file
+
+        :return: list of parsed molecules or reactions
+        """
+        # containers don't have reference cycles. garbage collector only slows down creation of many objects
+        enabled = isenabled()
+        disable()
+        try:
+            return list(iter(self))
+        finally:
+            if enabled:
+                enable()
+
+    def __iter__(self):
+        while self.__current < len(self.__shifts) - 1:
+            self.__current += 1
+            yield self[self.__current - 1]
+
+    def __next__(self):
+        return next(iter(self))
+
+    def seek(self, offset):
+        """
+        shifts on a given number of record in the file
+        :param offset: number of record
+        """
+        if 0 <= offset < len(self.__shifts):
+            self.__current = offset
+        else:
+            raise IndexError('invalid offset')
+
+    def tell(self):
+        """
+        :return: number of records processed from the file
+        """
+        return self.__current
+
+    def __getitem__(self, item):
+        """
+        getting the item by index from the original file,
+        if the required block of the file with an error, then only the correct blocks are returned
+        :param item: int or slice
+        :return: ReactionContainer or list of ReactionContainers
+        """
+        if isinstance(item, slice):
+            return [self[x] for x in range(*item.indices(len(self)))]
+        elif isinstance(item, int):
+            if item < 0:
+                item += len(self)
+            if not 0 <= item < len(self):
+                raise IndexError('list index out of range')
+            data = self.__data[self.__shifts[item]:self.__shifts[item + 1]]
+            return _decode(data, 0)[0]
+        raise TypeError('Indices must be integers or slices')
+
+    __current = 0
+
+
+class CGRBWrite:
+    """
+    CGRtools binary files writer. works similar to opened for writing file object. support `with` context manager.
+    on initialization accept string path to file, pathlib.Path object or opened in binary mode file.
+    records offsets table is written on closing. random access works only for closed files.
+    metadata and names of containers should be JSON serializable. metadata keys are stored as strings
+    """
+    def __init__(self, file):
+        if isinstance(file, (str, Path)):
+            self.__file = open(file, 'wb')
+            self.__is_buffer = False
+        elif isinstance(file, (BytesIO, BufferedWriter, BufferedIOBase)):
+            self.__file = file
+            self.__is_buffer = True
+        else:
+            raise TypeError('invalid file. BytesIO, BufferedWriter and BufferedIOBase subclasses possible')
+        self.__file.write(_header.pack(_magic, _version))
+        self.__shifts = array('Q', [_header.size])
+        self.__writable = True
+
+    def close(self, force=False):
+        """
+        write offsets table and close opened file
+
+        :param force: force closing of externally opened file or buffer
+        """
+        if self.__writable:
+            shifts = self.__shifts
+            table = shifts[-1]
+            if _swap:
+                shifts.byteswap()
+            self.__file.write(shifts.tobytes())
+            self.__file.write(_footer.pack(len(self.__shifts) - 1, table, _end))
+            self.write = self.__write_closed
+            self.__writable = False
+
+        if not self.__is_buffer or force:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+
+    def write(self, data):
+        """
+        write single molecule, CGR, query or reaction into file
+        """
+        buffer = []
+        _encode(data, buffer)
+        data = b''.join(buffer)
+        self.__file.write(data)
+        self.__shifts.append(self.__shifts[-1] + len(data))
+
+    @staticmethod
+    def __write_closed(_):
+        raise ValueError('I/O operation on closed writer')
+
+
+class SharedMemoryRead(CGRBRead):
+    """
+    molecules, CGRs, queries and reactions packed into shared memory block in CGRB layout.
+    block is created once by `create` method from any reader or iterable of containers. worker processes attach
+    block by name or get pickled reader object, which is transferred as block name only.
+    records are decoded by index directly from shared memory without block copying and unpickling.
+    block exists until `unlink` call, usually by creator process. supports all CGRBRead methods
+    """
+    def __init__(self, name):
+        """
+        :param name: name of shared memory block
+        """
+        try:
+            memory = SharedMemory(name, track=False)  # attached block is not removed on process exit
+        except TypeError:  # python < 3.13
+            memory = _attach_untracked(name)
+        self.__attach(memory)
+
+    @classmethod
+    def create(cls, data, name=None):
+        """
+        pack records into new shared memory block
+
+        :param data: reader object or iterable of containers
+        :param name: name of block. by default unique name is generated
+        :return: reader of created block
+        """
+        buffer = BytesIO()
+        with CGRBWrite(buffer) as f:
+            for x in data:
+                f.write(x)
+        size = buffer.tell()
+        memory = SharedMemory(name, create=True, size=size + _block.size)
+        try:
+            _block.pack_into(memory.buf, 0, size)
+            memory.buf[_block.size:_block.size + size] = buffer.getbuffer()
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+        obj = object.__new__(cls)
+        obj.__attach(memory)
+        return obj
+
+    @property
+    def name(self):
+        """
+        name of shared memory block
+        """
+        return self.__memory.name
+
+    def close(self, force=False):
+        """
+        detach shared memory block. block is not removed
+        """
+        super().close()
+        if self.__view is not None:
+            self.__view.release()
+            self.__view = None
+            self.__memory.close()
+
+    def unlink(self):
+        """
+        remove shared memory block. attached readers keep access to data until closing
+        """
+        self.__memory.unlink()
+
+    def __reduce__(self):
+        return type(self), (self.__memory.name,)
+
+    def __del__(self):
+        if self.__view is not None:  # block can't be closed while data view exists
+            self.close()
+
+    def __attach(self, memory):
+        # size of block can be rounded up to memory page size
+        size, = _block.unpack_from(memory.buf)
+        self.__memory = memory
+        self.__view = memory.buf[_block.size:_block.size + size]
+        super().__init__(self.__view)
+
+    __view = None
+
+
+def _encode(data, buffer):
+    if isinstance(data, ReactionContainer):
+        buffer.append(_reaction.pack(_kinds[ReactionContainer], len(data.reactants), len(data.products),
+                                     len(data.reagents)))
+        for x in (*data.reactants, *data.products, *data.reagents):
+            _encode(x, buffer)
+        _pack_text(data.name, data.meta, buffer)
+        return
+
+    kind = _kinds.get(type(data))
+    if kind is None:
+        raise TypeError('Graph or ReactionContainer expected')
+    atoms = data._atoms
+    bonds = data._bonds
+    index = {n: i for i, n in enumerate(atoms)}
+    size = len(atoms)
+    tc = 'B' if size < 256 else 'H' if size < 65536 else 'I'
+    stereo = getattr(data, '_atoms_stereo', {})
+    conformers = getattr(data, '_conformers', ())
+    ids = list(atoms)
+    sequential = ids == list(range(1, size + 1))
+    buffer.append(_graph.pack(kind, sequential, size, sum(len(x) for x in bonds.values()) // 2,
+                              len(data._parsed_mapping), len(stereo), len(conformers)))
+
+    if not sequential:
+        _pack('I', ids, buffer)
+    _pack('B', [a.atomic_number for a in atoms.values()], buffer)
+    _pack('H', [a.isotope or 0 for a in atoms.values()], buffer)
+    _pack('b', [data._charges[n] for n in atoms], buffer)
+    _pack('B', [data._radicals[n] for n in atoms], buffer)
+    _pack('d', [c for n in atoms for c in data._plane[n]], buffer)
+
+    bonds = _bonds_order(bonds)
+    _pack(tc, [index[n] for n, _, _ in bonds], buffer)
+    _pack(tc, [index[m] for _, m, _ in bonds], buffer)
+    if kind in (1, 3):  # dynamic bonds
+        _pack('B', [(b.order or 0) << 4 | (b.p_order or 0) for _, _, b in bonds], buffer)
+        _pack('b', [data._p_charges[n] for n in atoms], buffer)
+        _pack('B', [data._p_radicals[n] for n in atoms], buffer)
+    else:
+        _pack('B', [b.order for _, _, b in bonds], buffer)
+
+    _pack('I', [x for n, m in data._parsed_mapping.items() for x in (index[n], m)], buffer)
+    if kind < 2:  # cached atoms marks. stored to avoid recalculation on loading
+        marks = [data._neighbors, data._hybridizations]
+        if kind == 0:
+            _pack('B', [255 if data._hydrogens[n] is None else data._hydrogens[n] for n in atoms], buffer)
+        else:
+            marks.extend((data._p_neighbors, data._p_hybridizations))
+        for mark in marks:
+            _pack('B', [mark[n] for n in atoms], buffer)
+    else:  # queries
+        marks = [data._neighbors, data._hybridizations]
+        if kind == 3:
+            marks.extend((data._p_neighbors, data._p_hybridizations))
+        for mark in marks:
+            _pack('B', [len(mark[n]) for n in atoms], buffer)
+            _pack('B', [x for n in atoms for x in mark[n]], buffer)
+    if stereo:
+        _pack(tc, [index[n] for n in stereo], buffer)
+        _pack('B', stereo.values(), buffer)
+    for conformer in conformers:
+        _pack('d', [c for n in atoms for c in conformer[n]], buffer)
+    _pack_text(data.name, data.meta, buffer)
+
+
+def _decode(data, pos):
+    kind = data[pos]
+    if kind == _kinds[ReactionContainer]:
+        _, *counts = _reaction.unpack_from(data, pos)
+        pos += _reaction.size
+        groups = []
+        for c in counts:
+            group = []
+            for _ in range(c):
+                g, pos = _decode(data, pos)
+                group.append(g)
+            groups.append(group)
+        (name, meta), pos = _unpack_text(data, pos)
+        r = object.__new__(ReactionContainer)
+        r.__setstate__({'reactants': tuple(groups[0]), 'products': tuple(groups[1]), 'reagents': tuple(groups[2]),
+                        'meta': meta, 'name': name})
+        return r, pos
+
+    _, sequential, size, bonds_count, mapping_count, stereo_count, conformers_count = _graph.unpack_from(data, pos)
+    pos += _graph.size
+    tc = 'B' if size < 256 else 'H' if size < 65536 else 'I'
+    if sequential:
+        ids = list(range(1, size + 1))
+    else:
+        ids, pos = _unpack_from(data, pos, 'I', size)
+    numbers, pos = _unpack_from(data, pos, 'B', size)
+    isotopes, pos = _unpack_from(data, pos, 'H', size)
+    charges, pos = _unpack_from(data, pos, 'b', size)
+    radicals, pos = _unpack_from(data, pos, 'B', size)
+    plane, pos = _unpack_from(data, pos, 'd', size * 2)
+
+    bonds_n, pos = _unpack_from(data, pos, tc, bonds_count)
+    bonds_m, pos = _unpack_from(data, pos, tc, bonds_count)
+    orders, pos = _unpack_from(data, pos, 'B', bonds_count)
+
+    classes = _classes[kind]
+    state = {'atoms': {n: classes[a](i or None) for n, a, i in zip(ids, numbers, isotopes)},
+             'charges': dict(zip(ids, charges)), 'radicals': {n: bool(x) for n, x in zip(ids, radicals)},
+             'plane': dict(zip(ids, zip(plane[::2], plane[1::2])))}
+
+    state['bonds'] = sb = {n: {} for n in ids}
+    if kind in (1, 3):
+        for n, m, o in zip(bonds_n, bonds_m, orders):
+            n = ids[n]
+            m = ids[m]
+            sb[n][m] = sb[m][n] = DynamicBond(o >> 4 or None, o & 15 or None)
+        p_charges, pos = _unpack_from(data, pos, 'b', size)
+        p_radicals, pos = _unpack_from(data, pos, 'B', size)
+        state['p_charges'] = dict(zip(ids, p_charges))
+        state['p_radicals'] = {n: bool(x) for n, x in zip(ids, p_radicals)}
+    else:
+        for n, m, o in zip(bonds_n, bonds_m, orders):
+            n = ids[n]
+            m = ids[m]
+            sb[n][m] = sb[m][n] = Bond(o)
+
+    mapping, pos = _unpack_from(data, pos, 'I', mapping_count * 2)
+    state['parsed_mapping'] = {ids[n]: m for n, m in zip(mapping[::2], mapping[1::2])}
+    if kind < 2:
+        if kind == 0:
+            hydrogens, pos = _unpack_from(data, pos, 'B', size)
+            marks = {'hydrogens': {n: None if h == 255 else h for n, h in zip(ids, hydrogens)}}
+            keys = ('neighbors', 'hybridizations')
+        else:
+            marks = {}
+            keys = ('neighbors', 'hybridizations', 'p_neighbors', 'p_hybridizations')
+        for key in keys:
+            values, pos = _unpack_from(data, pos, 'B', size)
+            marks[key] = dict(zip(ids, values))
+    else:
+        keys = ['neighbors', 'hybridizations']
+        if kind == 3:
+            keys.extend(('p_neighbors', 'p_hybridizations'))
+        for key in keys:
+            lengths, pos = _unpack_from(data, pos, 'B', size)
+            values, pos = _unpack_from(data, pos, 'B', sum(lengths))
+            state[key] = mark = {}
+            i = 0
+            for n, d in zip(ids, lengths):
+                mark[n] = tuple(values[i:i + d])
+                i += d
+    if kind != 1 and kind != 3:
+        stereo, pos = _unpack_from(data, pos, tc, stereo_count)
+        values, pos = _unpack_from(data, pos, 'B', stereo_count)
+        state['atoms_stereo'] = {ids[n]: bool(x) for n, x in zip(stereo, values)}
+    if kind == 0:
+        state['conformers'] = conformers = []
+        for _ in range(conformers_count):
+            xyz, pos = _unpack_from(data, pos, 'd', size * 3)
+            conformers.append(dict(zip(ids, zip(xyz[::3], xyz[1::3], xyz[2::3]))))
+    (state['name'], state['meta']), pos = _unpack_text(data, pos)
+
+    g = object.__new__(_containers[kind])
+    if kind < 2:  # restore without marks recalculation
+        Graph.__setstate__(g, state)
+        for key, value in marks.items():
+            setattr(g, f'_{key}', value)
+        if kind == 0:
+            g._conformers = state['conformers']
+            g._atoms_stereo = state['atoms_stereo']
+        else:
+            g._p_charges = state['p_charges']
+            g._p_radicals = state['p_radicals']
+    else:
+        g.__setstate__(state)
+    return g, pos
+
+
+def _bonds_order(bonds):
+    """
+    list of unique bonds in order reproducing neighbors order of each atom on bonds adding
+    """
+    neighbors = {n: list(x) for n, x in bonds.items()}
+    heads = dict.fromkeys(bonds, 0)
+    ready = [(n, x[0]) for n, x in neighbors.items() if x and n < x[0] and neighbors[x[0]][0] == n]
+    ready.reverse()
+    out = []
+    while ready:
+        n, m = ready.pop()
+        out.append((n, m, bonds[n][m]))
+        for x in (m, n):
+            heads[x] += 1
+            if heads[x] < len(neighbors[x]):
+                y = neighbors[x][heads[x]]
+                if heads[y] < len(neighbors[y]) and neighbors[y][heads[y]] == x:
+                    ready.append((x, y))
+    if len(out) * 2 != sum(len(x) for x in neighbors.values()):  # inconsistent order. impossible for valid graphs
+        seen = {(n, m) for n, m, _ in out}
+        out.extend((n, m, b) for n, x in bonds.items() for m, b in x.items()
+                   if n < m and (n, m) not in seen and (m, n) not in seen)
+    return out
+
+
+def _pack(typecode, values, buffer):
+    values = array(typecode, values)
+    if _swap:
+        values.byteswap()
+    buffer.append(values.tobytes())
+
+
+def _unpack(data, pos, typecode, count):
+    values = array(typecode)
+    values.frombytes(data[pos:pos + count * values.itemsize])
+    if _swap:
+        values.byteswap()
+    return values
+
+
+def _unpack_from(data, pos, typecode, count):
+    values = _unpack(data, pos, typecode, count)
+    return values.tolist(), pos + count * values.itemsize
+
+
+def _pack_text(name, meta, buffer):
+    text = dumps([name, meta], ensure_ascii=False, separators=(',', ':')).encode()
+    buffer.append(_size.pack(len(text)))
+    buffer.append(text)
+
+
+def _unpack_text(data, pos):
+    size, = _size.unpack_from(data, pos)
+    pos += _size.size
+    return loads(bytes(data[pos:pos + size])), pos + size
+
+
+_magic = b'CGRBFILE'
+_end = b'CGRBEND\x00'
+_version = 1
+_header = Struct('<8sI4x')
+_footer = Struct('<QQ8s')  # records count, offsets table position, end marker
+_graph = Struct('<B?IIIII')  # kind, sequential atoms numbers, atoms, bonds, mapped atoms, stereo, conformers
+_reaction = Struct('<BIII')  # kind, reactants, products, reagents
+_size = Struct('<I')
+_block = Struct('<Q')  # size of data in shared memory block
+_swap = byteorder == 'big'  # file data stored in little-endian
+
+_containers = (MoleculeContainer, CGRContainer, QueryContainer, QueryCGRContainer)
+_kinds = {x: n for n, x in enumerate(_containers)}
+_kinds[ReactionContainer] = len(_containers)
+_classes = []
+for _base, _any in ((Element, None), (DynamicElement, None), (QueryElement, AnyElement),
+                    (DynamicQueryElement, DynamicAnyElement)):
+    _table = {x.atomic_number.fget(None): x for x in _base.__subclasses__()}
+    if _any is not None:
+        _table[0] = lambda _, cls=_any: cls()
+    _classes.append(_table)
+del _base, _any, _table
+
+
+__all__ = ['CGRBRead', 'CGRBWrite']
+
+if find_spec('multiprocessing.shared_memory'):
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+
+    _untracked = Lock()
+
+    def _attach_untracked(name):
+        """
+        attach block without registration in resource tracker. otherwise tracker of process not related to creator
+        unlinks block on exit and prints leak warning. unregister after attach isn't used: tracker shared with
+        creator keeps names in set, thus creator registration would be lost
+        """
+        with _untracked:
+            register = resource_tracker.register
+            resource_tracker.register = _skip_register
+            try:
+                return SharedMemory(name)
+            finally:
+                resource_tracker.register = register
+
+    def _skip_register(name, rtype):
+        pass
+
+    __all__.append('SharedMemoryRead')
+else:  # python < 3.8
+    del SharedMemoryRead
@@ -16,26 +16,30 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, see <https://www.gnu.org/licenses/>.
 #
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import c_char, c_double, c_short, c_long, create_string_buffer, POINTER, Structure, cdll, byref
 from distutils.util import get_platform
-from io import StringIO, TextIOWrapper
 from logging import warning
 from os import name
 from pathlib import Path
-from re import split
 from sys import prefix, exec_prefix
-from traceback import format_exc
+from threading import local
 from typing import List, Optional
 from warnings import warn
-from ._CGRrw import CGRRead, common_isotopes
+from ._CGRrw import common_isotopes
+from ._LINErw import LineRead
 from ..containers import MoleculeContainer
 
 
-class INCHIRead(CGRRead):
+buffers = local()  # reusable per thread INCHI structures
+
+
+class INCHIRead(LineRead):
     """
     INCHI separated per lines files reader. works similar to opened file object. support `with` context manager.
-    on initialization accept opened in text mode file, string path to file,
-    pathlib.Path object or another buffered reader object.
+    on initialization accept opened in text mode file, string path to file, pathlib.Path object,
+    another buffered reader object or binary stream, e.g. BytesIO, pipe or `sys.stdin.buffer`.
+    gzip, bzip2 and xz compressed files given by path are decompressed on the fly.
     line should be start with INCHI string and
     optionally continues with space/tab separated list of key:value [or key=value] data if header=None.
         example:
@@ -46,57 +50,15 @@ class INCHIRead(CGRRead):
             InChI=1S/C2H5/c1-2/h1H2,2H3/q+1 1 2
     also possible to pass list of keys (without inchi_pseudo_key) for mapping space/tab separated list
     of INCHI and values: header=['key1', 'key2'] # order depended
+    records can be skipped by `meta_filter` and `counts_filter` callables. metadata is checked before INCHI parsing,
+    counts of atoms and bonds are checked before container building.
+    with `indexable=True` supported methods seek, tell, object size and subscription for seekable files and buffers.
+    byte offsets of lines of files stored on disk are saved into index file for reuse (in user cache directory,
+    `index_dir` directory or next to the file with `index_dir=True`).
+    with `workers` greater than 1 chunks of `chunksize` lines are parsed in threads. INCHI library calls release GIL.
+    if `ordered=False` records are returned in order of chunks parsing finish.
+    `prefetch` limits number of chunks in processing at the same time (default is twice the workers count).
     """
-    def __init__(self, file, *args, header=None, **kwargs):
-        if isinstance(file, str):
-            self.__file = open(file)
-            self.__is_buffer = False
-        elif isinstance(file, Path):
-            self.__file = file.open()
-            self.__is_buffer = False
-        elif isinstance(file, (TextIOWrapper, StringIO)):
-            self.__file = file
-            self.__is_buffer = True
-        else:
-            raise TypeError('invalid file. TextIOWrapper, StringIO subclasses possible')
-        super().__init__(*args, **kwargs)
-
-        if header is True:
-            self.__header = next(self.__file).split()[1:]
-        elif header:
-            if not isinstance(header, (list, tuple)) or not all(isinstance(x, str) for x in header):
-                raise TypeError('expected list (tuple) of strings')
-            self.__header = header
-        else:
-            self.__header = None
-
-        self._data = (self.parse(line) for line in self.__file)
-
-    @classmethod
-    def create_parser(cls, *args, **kwargs):
-        """
-        Create INCHI parser function configured same as INCHIRead object
-        """
-        obj = object.__new__(cls)
-        obj._INCHIRead__header = None
-        super(INCHIRead, obj).__init__(*args, **kwargs)
-        return obj.parse
-
-    def close(self, force=False):
-        """
-        close opened file
-
-        :param force: force closing of externally opened file or buffer
-        """
-        if not self.__is_buffer or force:
-            self.__file.close()
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, _type, value, traceback):
-        self.close()
-
     def read(self) -> List[Optional[MoleculeContainer]]:
         """
         parse whole file
@@ -105,33 +67,22 @@ class INCHIRead(CGRRead):
         """
         return list(iter(self))
 
-    def __iter__(self):
-        return (x for x in self._data if x is not None)
-
-    def __next__(self):
-        return next(iter(self))
-
     def parse(self, inchi: str) -> Optional[MoleculeContainer]:
         """
         convert INCHI string into MoleculeContainer object. string should be start with INCHI and
         optionally continues with space/tab separated list of key:value [or key=value] data.
         """
-        inchi, *data = inchi.split()
-        if self.__header is None:
-            meta = {}
-            for x in data:
-                try:
-                    k, v = split('[=:]', x, 1)
-                    meta[k] = v
-                except ValueError:
-                    warning(f'invalid metadata entry: {x}')
-        else:
-            meta = dict(zip(self.__header, data))
+        string, meta = self._split_line(inchi)
+        if self._skip_record(meta=meta):
+            return
 
         try:
-            record = self.__parse_inchi(inchi)
+            record = self.__parse_inchi(string)
         except ValueError:
-            warning(f'string: {inchi}\nconsist errors:\n{format_exc()}')
+            self._report(f'string: {string}\nconsist errors', inchi)
+            return
+        if self._counts_filter is not None and \
+                self._skip_record(counts={'atoms': len(record['atoms']), 'bonds': len(record['bonds'])}):
             return
 
         record['meta'] = meta
@@ -139,12 +90,24 @@ class INCHIRead(CGRRead):
             container, mapping = self._convert_structure(record)
             return container
         except ValueError:
-            warning(f'record consist errors:\n{format_exc()}')
+            self._report(record=inchi)
 
     @staticmethod
     def __parse_inchi(string):
-        structure = INCHIStructure()
-        if lib.GetStructFromINCHI(byref(InputINCHI(string)), byref(structure)):
+        string = string.encode()
+        try:
+            inchi, structure, buffer = buffers.inchi
+        except AttributeError:  # first call in thread
+            inchi, structure = InputINCHI(''), INCHIStructure()
+            buffer = create_string_buffer(1024)
+            inchi.szInChI = buffer
+            buffers.inchi = inchi, structure, buffer
+        if len(string) >= len(buffer):  # grow string buffer of thread
+            buffer = create_string_buffer(max(len(string) + 1, 2 * len(buffer)))
+            inchi.szInChI = buffer
+            buffers.inchi = inchi, structure, buffer
+        buffer.value = string  # null terminated copy
+        if lib.GetStructFromINCHI(byref(inchi), byref(structure)):
             lib.FreeStructFromINCHI(byref(structure))
             raise ValueError('invalid INCHI')
 
@@ -176,6 +139,8 @@ class INCHIRead(CGRRead):
         lib.FreeStructFromINCHI(byref(structure))
         return {'atoms': atoms, 'bonds': bonds}
 
+    _executor = ThreadPoolExecutor
+
 
 class InputINCHI(Structure):
     def __init__(self, string, options=None):
@@ -18,77 +18,172 @@
 #
 from collections import defaultdict
 from importlib.util import find_spec
-from io import StringIO, BytesIO, TextIOWrapper, BufferedIOBase, BufferedReader
-from itertools import count
+from io import FileIO, StringIO, BytesIO, TextIOWrapper, BufferedIOBase, BufferedReader, RawIOBase
+from itertools import chain, count
 from logging import warning
 from pathlib import Path
-from traceback import format_exc
+from re import compile
+from sys import modules
 from warnings import warn
 from ._CGRrw import CGRRead
+from ._compressed import open_file, StreamWrapper
+from ._index import scan_tags, OffsetsIndex
+from ._pool import imap
+from ._writer import BufferedWrite
 from ..containers import MoleculeContainer, ReactionContainer
 from ..exceptions import EmptyMolecule
 
 
-def xml_dict(parent_element, stop_list=None):
-    stop_list = set() if stop_list is None else set(stop_list)
-    out = {}
-    for x, y in parent_element.items():
-        y = y.strip()
-        if y:
-            x = '@%s' % x.strip()
-            out[x] = y
-
-    text = []
-    if len(parent_element):
-        elements_grouped = defaultdict(list)
-        for element in parent_element:
-            name = QName(element).localname
-            if name in stop_list:
-                text.append(tostring(element, encoding=str, with_tail=False))
-            else:
-                elements_grouped[name].append(element)
+def _local(element):
+    """
+    local name of element. None for comments and processing instructions
+    """
+    tag = element.tag
+    if isinstance(tag, str):
+        return tag[tag.index('}') + 1:] if tag[0] == '{' else tag
 
-            if element.tail:
-                t = element.tail.strip()
-                if t:
-                    text.append(t)
 
-        for element_tag, element_group in elements_grouped.items():
-            if len(element_group) == 1:
-                out[element_tag] = xml_dict(element_group[0], stop_list)
-            else:
-                out[element_tag] = [xml_dict(x, stop_list) for x in element_group]
+def _children(element, name):
+    return [x for x in element if _local(x) == name]
+
+
+def _child(element, name):
+    """
+    single child element with given name. None if child not found or not unique
+    """
+    found = None
+    for x in element:
+        if _local(x) == name:
+            if found is not None:
+                return
+            found = x
+    return found
+
+
+def _attrs(element):
+    """
+    stripped not empty attributes of element
+    """
+    return {k: v for k, v in ((k, v.strip()) for k, v in element.items()) if v}
+
+
+def _text(element):
+    """
+    stripped text of element and tails of its children
+    """
+    return ''.join(x.strip() for x in chain((element.text,), (x.tail for x in element)) if x)
+
+
+def _fragment(data):
+    """
+    cut MChemicalStruct element from data started with its start tag
+    """
+    end = end_tag.search(data)
+    return data if end is None else data[:end.end()]
+
 
-    if parent_element.text:
-        t = parent_element.text.strip()
-        if t:
-            text.insert(0, t)
-    if text:
-        out['$'] = ''.join(text)
+end_tag = compile(rb'</MChemicalStruct\s*>')
 
-    return out
 
+class MRVReadMeta(type):
+    def __call__(cls, *args, **kwargs):
+        if kwargs.get('indexable'):
+            cls = type(cls.__name__, (cls,), {'__len__': lambda x: len(x._shifts) - 1, '__module__': cls.__module__})
+        obj = object.__new__(cls)
+        obj.__init__(*args, **kwargs)
+        return obj
 
-class MRVRead(CGRRead):
+
+class MRVRead(CGRRead, OffsetsIndex, metaclass=MRVReadMeta):
     """
     ChemAxon MRV files reader. works similar to opened file object. support `with` context manager.
     on initialization accept opened in binary mode file, string path to file,
-    pathlib.Path object or another binary buffered reader object
+    pathlib.Path object, another binary buffered reader object or raw stream, e.g. pipe.
+    gzip, bzip2 and xz compressed files given by path are decompressed on the fly.
+    records can be skipped by `title_filter`, `meta_filter` and `counts_filter` callables before structure parsing
     """
-    def __init__(self, file, *args, **kwargs):
-        if isinstance(file, str):
-            self.__file = open(file, 'rb')
-            self.__is_buffer = False
-        elif isinstance(file, Path):
-            self.__file = file.open('rb')
-            self.__is_buffer = False
+    def __init__(self, file, *args, indexable=False, index_dir=None, workers=1, ordered=True, chunksize=100,
+                 prefetch=None, resume_from=None, **kwargs):
+        """
+        :param indexable: if True: supported methods seek, tell, object size and subscription, it only works when
+            dealing with a seekable file or buffer. byte offsets of MChemicalStruct elements are found by bytes
+            scan and records are parsed as separate XML fragments. offsets of files stored on disk are saved
+            into index file for reuse
+        :param index_dir: directory for index files. if True: index file is stored next to the parsed file.
+            by default index files are stored in user cache directory
+        :param workers: number of processes used for records parsing. if greater than 1, then file is split into
+            chunks of records by byte offsets index (same as for indexable mode) and chunks are parsed in parallel.
+            affects only iteration over file
+        :param ordered: if True: parallel mode returns records in file order, otherwise in order of parsing finish
+        :param chunksize: number of records in one chunk passed to worker process
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+        :param resume_from: Checkpoint returned by `checkpoint` method or record index. reading starts from given
+            record. file is indexed same as in indexable mode and checkpoint offset is checked against index
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        elif not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif workers > 1:
+            self.__workers = workers
+            self._parallel = True
+            self.__ordered = ordered
+            self.__chunksize = chunksize
+            self.__prefetch = prefetch
+
+        if isinstance(file, (str, Path)):
+            self._file = open_file(file, binary=True)
+            self._is_buffer = False
         elif isinstance(file, (BytesIO, BufferedReader, BufferedIOBase)):
-            self.__file = file
-            self.__is_buffer = True
+            self._file = file
+            self._is_buffer = True
+        elif isinstance(file, RawIOBase):  # pipes and unbuffered files
+            self._file = BufferedReader(file)
+            self._is_buffer = True
+            self.__raw = True
         else:
-            raise TypeError('invalid file. BytesIO, BufferedReader and BufferedIOBase subclasses possible')
+            raise TypeError('invalid file. '
+                            'BytesIO, BufferedReader, BufferedIOBase and RawIOBase subclasses possible')
         super().__init__(*args, **kwargs)
-        self._data = self.__reader()
+        self.__config = (args, kwargs)
+        self._index_dir = index_dir
+
+        if self.__workers and not self._file.seekable():
+            raise self._implement_error
+        elif (indexable or self.__workers or resume_from is not None) and self._file.seekable():
+            shifts = self._load_cache()
+            if shifts is None:
+                shifts = scan_tags(self._file, b'MChemicalStruct')
+                self._dump_cache(shifts)
+            self._shifts = shifts
+            self._data = self.__index_reader()
+        else:
+            self._data = self.__reader()
+        if resume_from is not None:
+            self._resume(resume_from)
+
+    @classmethod
+    def create_parser(cls, *args, **kwargs):
+        """
+        create parser function configured same as MRVRead object. parser accepts MChemicalStruct element string
+        """
+        obj = object.__new__(cls)
+        super(MRVRead, obj).__init__(*args, **kwargs)
+        return obj.parse
+
+    def parse(self, data):
+        """
+        convert MChemicalStruct element string into MoleculeContainer or ReactionContainer
+
+        :param data: bytes or string of element without XML declaration
+        :return: container or None for records with errors or skipped by filters
+        """
+        try:
+            element = fromstring(data)
+        except XMLSyntaxError:
+            self._report(record=data)
+            return
+        return self.__parse_struct(element)
 
     def close(self, force=False):
         """
@@ -96,8 +191,13 @@ class MRVRead(CGRRead):
 
         :param force: force closing of externally opened file or buffer
         """
-        if not self.__is_buffer or force:
-            self.__file.close()
+        if self.__pool_data is not None:
+            self.__pool_data.close()
+        self._close_cache()
+        if not self._is_buffer or force:
+            self._file.close()
+        elif self.__raw:
+            self._file.detach()
 
     def __enter__(self):
         return self
@@ -114,66 +214,183 @@ class MRVRead(CGRRead):
         return list(iter(self))
 
     def __iter__(self):
-        return (x for x in self._data if x is not None)
+        if self.__workers:
+            if self.__pool_data is None:
+                self.__pool_data = self.__pool_reader()
+            return self._records(self.__pool_data)
+        return self._records(self._data)
 
     def __next__(self):
         return next(iter(self))
 
+    def seek(self, offset):
+        """
+        shifts on a given number of record in the original file
+        :param offset: number of record
+        """
+        if self._shifts:
+            if 0 <= offset < len(self._shifts):
+                self.__cursor = offset
+                self._record_index = offset - 1
+                self._data = self.__index_reader()
+            else:
+                raise IndexError('invalid offset')
+        else:
+            raise self._implement_error
+
+    def tell(self):
+        """
+        :return: number of records processed from the original file
+        """
+        if self._shifts:
+            return self.__cursor
+        raise self._implement_error
+
     def __reader(self):
-        for _, element in iterparse(self.__file, tag='{*}MChemicalStruct'):
-            parsed = xml_dict(element)
+        for _, element in iterparse(self._file, tag='{*}MChemicalStruct'):
+            self._record_index += 1
+            yield self.__parse_struct(element)
             element.clear()
-            if 'molecule' in parsed and isinstance(parsed['molecule'], dict):
-                parsed = parsed['molecule']
-                try:
-                    record = self.__parse_molecule(parsed)
-                except (KeyError, ValueError):
-                    warning(f'record consist errors:\n{format_exc()}')
-                    yield None
-                else:
-                    if 'propertyList' in parsed and 'property' in parsed['propertyList']:
-                        record['meta'] = self.__parse_property(parsed['propertyList']['property'])
-                    else:
-                        record['meta'] = {}
-                    try:
-                        container, mapping = self._convert_structure(record)
-                        yield container
-                    except ValueError:
-                        warning(f'record consist errors:\n{format_exc()}')
-                        yield None
-            elif 'reaction' in parsed and isinstance(parsed['reaction'], dict):
-                parsed = parsed['reaction']
-                try:
-                    record = self.__parse_reaction(parsed)
-                except (KeyError, ValueError):
-                    warning(f'record consist errors:\n{format_exc()}')
-                    yield None
-                else:
-                    if 'propertyList' in parsed and 'property' in parsed['propertyList']:
-                        record['meta'] = self.__parse_property(parsed['propertyList']['property'])
-                    else:
-                        record['meta'] = {}
-                    try:
-                        container, mapping = self._convert_reaction(record)
-                        yield container
-                    except ValueError:
-                        warning(f'record consist errors:\n{format_exc()}')
-                        yield None
+
+    def __index_reader(self):
+        file = self._file
+        shifts = self._shifts
+        while self.__cursor < len(shifts) - 1:
+            start, stop = shifts[self.__cursor], shifts[self.__cursor + 1]
+            self._record_index = self.__cursor
+            self.__cursor += 1
+            file.seek(start)
+            yield self.parse(_fragment(file.read(stop - start)))
+
+    def __pool_reader(self):
+        """
+        parse chunks of records in worker processes. chunks boundaries taken from byte offsets index.
+        number of chunks in processing is limited by prefetch window
+        """
+        shifts = self._shifts
+        total = len(shifts) - 1
+        chunksize = self.__chunksize
+        args, kwargs = self.__config
+        # indexable readers are dynamic subclasses. workers require importable class
+        reader = getattr(modules[type(self).__module__], type(self).__name__)
+        tasks = ((reader, self.__chunk(shifts[i], shifts[min(i + chunksize, total)]),
+                  shifts[i:i + chunksize + 1].tolist(), i, args,
+                  {**kwargs, 'errors': self.errors.spawn(), 'stats': None})
+                 for i in range(self._record_index + 1, total, chunksize))
+
+        self.__pool_position = shifts[self._record_index + 1]  # header is counted as in serial mode
+        for records, errors, size in imap(_parse_chunk, tasks, self.__workers, self.__ordered, self.__prefetch):
+            if errors:
+                self._merge_errors(errors)
+            self.__pool_position += size
+            yield from (x for x in records if x is not None)
+
+    def __chunk(self, start, stop):
+        """
+        workers read records from disk files themselves. records of buffers and compressed files are read here
+        """
+        file = self._file
+        name = getattr(file, 'name', None)
+        if isinstance(getattr(file, 'raw', None), FileIO) and isinstance(name, str):
+            return name
+
+        position = file.tell()
+        file.seek(start)
+        data = file.read(stop - start)
+        file.seek(position)
+        return data
+
+    def _position(self):
+        if self._parallel:  # workers read files themselves
+            return self.__pool_position
+        return super()._position()
+
+    def __parse_struct(self, element):
+        molecule = _child(element, 'molecule')
+        if molecule is not None:
+            if self.__skip(molecule, False):
+                return
+            try:
+                record = self.__parse_molecule(molecule)
+            except (KeyError, ValueError):
+                self._report()
+                return
+            record['meta'] = self.__get_meta(molecule)
+            try:
+                container, mapping = self._convert_structure(record)
+            except ValueError:
+                self._report()
+                return
+            return container
+
+        reaction = _child(element, 'reaction')
+        if reaction is not None:
+            if self.__skip(reaction, True):
+                return
+            try:
+                record = self.__parse_reaction(reaction)
+            except (KeyError, ValueError):
+                self._report()
+                return
+            record['meta'] = self.__get_meta(reaction)
+            try:
+                container, mapping = self._convert_reaction(record)
+            except ValueError:
+                self._report()
+                return
+            return container
+        self._report('invalid MDocument', error=ValueError('molecule or reaction not found'))
+
+    def __skip(self, data, is_reaction):
+        """
+        check record by pre-filters before structure parsing
+        """
+        if self._skip_record(title=(data.get('title') or '').strip()):
+            return True
+        if self._meta_filter is not None and self._skip_record(meta=self.__get_meta(data)):
+            return True
+        if self._counts_filter is not None:
+            if is_reaction:
+                counts = {group: self.__size(data, tag, 'molecule') for tag, group in
+                          (('reactantList', 'reactants'), ('productList', 'products'), ('agentList', 'reagents'))}
             else:
-                warning('invalid MDocument')
-                yield None
+                atoms = _child(data, 'atomArray')
+                if atoms is None:  # parser reports errors
+                    return False
+                counts = {'atoms': len(_children(atoms, 'atom')) or len((atoms.get('atomID') or '').split()),
+                          'bonds': self.__size(data, 'bondArray', 'bond')}
+            return self._skip_record(counts=counts)
+        return False
+
+    @staticmethod
+    def __size(data, group, tag):
+        data = _child(data, group)
+        return 0 if data is None else len(_children(data, tag))
+
+    @staticmethod
+    def __get_meta(data):
+        meta = {}
+        properties = _child(data, 'propertyList')
+        if properties is not None:
+            for x in _children(properties, 'property'):
+                key = (x.get('title') or '').strip()
+                val = _child(x, 'scalar')
+                val = '' if val is None else _text(val)
+                if key and val:
+                    meta[key] = val
+                else:
+                    warning(f'invalid metadata entry: {key}: {val}')
+        return meta
 
     def __parse_reaction(self, data):
         reaction = {'reactants': [], 'products': [], 'reagents': []}
-        title = data.get('@title')
+        title = (data.get('title') or '').strip()
         if title:
             reaction['title'] = title
         for tag, group in (('reactantList', 'reactants'), ('productList', 'products'), ('agentList', 'reagents')):
-            if tag in data and 'molecule' in data[tag]:
-                molecule = data[tag]['molecule']
-                if isinstance(molecule, dict):
-                    molecule = (molecule,)
-                for m in molecule:
+            molecules = _child(data, tag)
+            if molecules is not None:
+                for m in _children(molecules, 'molecule'):
                     try:
                         reaction[group].append(self.__parse_molecule(m))
                     except EmptyMolecule:
@@ -182,169 +399,151 @@ class MRVRead(CGRRead):
                         warning('empty molecule ignored')
         return reaction
 
-    @staticmethod
-    def __parse_property(data):
-        meta = {}
-        if isinstance(data, dict):
-            key = data['@title']
-            val = data['scalar']['$'].strip()
-            if key and val:
-                meta[key] = val
-            else:
-                warning(f'invalid metadata entry: {data}')
-        else:
-            for x in data:
-                key = x['@title']
-                val = x['scalar']['$'].strip()
-                if key and val:
-                    meta[key] = val
-                else:
-                    warning(f'invalid metadata entry: {x}')
-        return meta
-
     def __parse_molecule(self, data):
         atoms, bonds, stereo = [], [], []
         atom_map = {}
-        if 'atom' in data['atomArray']:
-            da = data['atomArray']['atom']
-            if isinstance(da, dict):
-                da = (da,)
+        atom_array = _child(data, 'atomArray')
+        if atom_array is None:
+            raise KeyError('atomArray')
+        da = _children(atom_array, 'atom')
+        if da:
             for n, atom in enumerate(da):
-                atom_map[atom['@id']] = n
-                atoms.append({'element': atom['@elementType'],
-                              'isotope': int(atom['@isotope']) if '@isotope' in atom else None,
-                              'charge': int(atom.get('@formalCharge', 0)),
-                              'is_radical': '@radical' in atom,
-                              'mapping': int(atom.get('@mrvMap', 0))})
-                if '@z3' in atom:
-                    atoms[-1].update(x=float(atom['@x3']), y=float(atom['@y3']), z=float(atom['@z3']))
+                atom = _attrs(atom)
+                atom_map[atom['id']] = n
+                atoms.append({'element': atom['elementType'],
+                              'isotope': int(atom['isotope']) if 'isotope' in atom else None,
+                              'charge': int(atom.get('formalCharge', 0)),
+                              'is_radical': 'radical' in atom,
+                              'mapping': int(atom.get('mrvMap', 0))})
+                if 'z3' in atom:
+                    atoms[-1].update(x=float(atom['x3']), y=float(atom['y3']), z=float(atom['z3']))
                 else:
-                    atoms[-1].update(x=float(atom['@x2']) / 2, y=float(atom['@y2']) / 2, z=0.)
-                if '@mrvQueryProps' in atom:
+                    atoms[-1].update(x=float(atom['x2']) / 2, y=float(atom['y2']) / 2, z=0.)
+                if 'mrvQueryProps' in atom:
                     raise ValueError('queries unsupported')
         else:
-            atom = data['atomArray']
-            for n, (_id, e) in enumerate(zip(atom['@atomID'].split(), atom['@elementType'].split())):
+            atom = _attrs(atom_array)
+            for n, (_id, e) in enumerate(zip(atom['atomID'].split(), atom['elementType'].split())):
                 atom_map[_id] = n
                 atoms.append({'element': e, 'charge': 0, 'mapping': 0, 'isotope': None, 'is_radical': False})
-            if '@z3' in atom:
-                for a, x, y, z in zip(atoms, atom['@x3'].split(), atom['@y3'].split(), atom['@z3'].split()):
+            if 'z3' in atom:
+                for a, x, y, z in zip(atoms, atom['x3'].split(), atom['y3'].split(), atom['z3'].split()):
                     a['x'] = float(x)
                     a['y'] = float(y)
                     a['z'] = float(z)
             else:
-                for a, x, y in zip(atoms, atom['@x2'].split(), atom['@y2'].split()):
+                for a, x, y in zip(atoms, atom['x2'].split(), atom['y2'].split()):
                     a['x'] = float(x) / 2
                     a['y'] = float(y) / 2
                     a['z'] = 0.
-            if '@isotope' in atom:
-                for a, x in zip(atoms, atom['@isotope'].split()):
+            if 'isotope' in atom:
+                for a, x in zip(atoms, atom['isotope'].split()):
                     if x != '0':
                         a['isotope'] = int(x)
-            if '@formalCharge' in atom:
-                for a, x in zip(atoms, atom['@formalCharge'].split()):
+            if 'formalCharge' in atom:
+                for a, x in zip(atoms, atom['formalCharge'].split()):
                     if x != '0':
                         a['charge'] = int(x)
-            if '@mrvMap' in atom:
-                for a, x in zip(atoms, atom['@mrvMap'].split()):
+            if 'mrvMap' in atom:
+                for a, x in zip(atoms, atom['mrvMap'].split()):
                     if x != '0':
                         a['mapping'] = int(x)
-            if '@radical' in atom:
-                for a, x in zip(atoms, atom['@radical'].split()):
+            if 'radical' in atom:
+                for a, x in zip(atoms, atom['radical'].split()):
                     if x != '0':
                         a['is_radical'] = True
-            if '@mrvQueryProps' in atom:
+            if 'mrvQueryProps' in atom:
                 raise ValueError('queries unsupported')
         if not atoms:
             raise EmptyMolecule
 
-        if 'bond' in data['bondArray']:
-            db = data['bondArray']['bond']
-            if isinstance(db, dict):
-                db = (db,)
-            for bond in db:
-                order = self.__bond_map[bond['@queryType' if '@queryType' in bond else '@order']]
-                a1, a2 = bond['@atomRefs2'].split()
-                if 'bondStereo' in bond:
-                    if '$' in bond['bondStereo']:
-                        s = bond['bondStereo']['$']
-                        if s == 'H':
-                            stereo.append((atom_map[a1], atom_map[a2], -1))
-                        elif s == 'W':
-                            stereo.append((atom_map[a1], atom_map[a2], 1))
-                        else:
-                            warning('invalid or unsupported stereo')
+        bond_array = _child(data, 'bondArray')
+        if bond_array is None:
+            raise KeyError('bondArray')
+        for bond in _children(bond_array, 'bond'):
+            bond_stereo = _children(bond, 'bondStereo')
+            bond = _attrs(bond)
+            order = self.__bond_map[bond['queryType' if 'queryType' in bond else 'order']]
+            a1, a2 = bond['atomRefs2'].split()
+            if bond_stereo:
+                s = len(bond_stereo) == 1 and _text(bond_stereo[0])
+                if s:
+                    if s == 'H':
+                        stereo.append((atom_map[a1], atom_map[a2], -1))
+                    elif s == 'W':
+                        stereo.append((atom_map[a1], atom_map[a2], 1))
                     else:
-                        warning('incorrect bondStereo tag')
-                bonds.append((atom_map[a1], atom_map[a2], order))
+                        warning('invalid or unsupported stereo')
+                else:
+                    warning('incorrect bondStereo tag')
+            bonds.append((atom_map[a1], atom_map[a2], order))
 
         mol = {'atoms': atoms, 'bonds': bonds, 'stereo': stereo}
-        if '@title' in data:
-            mol['title'] = data['@title']
+        title = (data.get('title') or '').strip()
+        if title:
+            mol['title'] = title
         return mol
 
+    _shifts = None
+    _index_kind = b'MRV '
+    __cursor = 0
+    __workers = __pool_data = None
+    __pool_position = 0  # bytes of chunks parsed by workers
+    __raw = False
+    _implement_error = NotImplementedError('Indexable supported only for seekable files and buffers')
     __bond_map = {'Any': 8, 'any': 8, 'A': 4, 'a': 4, '1': 1, '2': 2, '3': 3}
     __radical_map = {'monovalent': 2, 'divalent': 1, 'divalent1': 1, 'divalent3': 3}
 
 
-class MRVWrite:
+def _parse_chunk(reader, chunk, offsets, index, args, kwargs):
+    start = offsets[0]
+    if isinstance(chunk, str):  # read records from disk
+        with open(chunk, 'rb') as f:
+            f.seek(start)
+            chunk = f.read(offsets[-1] - start)
+    parser = reader.create_parser(*args, **kwargs).__self__
+    records = []
+    for parser._record_index, x, y in zip(count(index), offsets, offsets[1:]):
+        records.append(parser.parse(_fragment(chunk[x - start:y - start])))
+    return records, parser.errors, offsets[-1] - start
+
+
+class MRVWrite(BufferedWrite):
     """
     ChemAxon MRV files writer. works similar to opened for writing file object. support `with` context manager.
-    on initialization accept opened for writing in text mode file, string path to file,
-    pathlib.Path object or another buffered writer object
+    on initialization accept opened for writing in text mode file, string path to file, pathlib.Path object,
+    another buffered writer object or binary stream, e.g. BytesIO, pipe or `sys.stdout.buffer`
     """
-    def __init__(self, file):
+    def __init__(self, file, *args, encoding=None, **kwargs):
+        """
+        :param encoding: encoding of file. by default locale encoding is used for files given by path
+        """
         if isinstance(file, str):
-            self._file = open(file, 'w')
+            self._file = open(file, 'w', encoding=encoding)
             self._is_buffer = False
         elif isinstance(file, Path):
-            self._file = file.open('w')
+            self._file = file.open('w', encoding=encoding)
             self._is_buffer = False
         elif isinstance(file, (TextIOWrapper, StringIO)):
             self._file = file
             self._is_buffer = True
+        elif isinstance(file, (BufferedIOBase, RawIOBase)):
+            self._file = StreamWrapper(file, encoding, True)
+            self._is_buffer = True
         else:
             raise TypeError('invalid file. '
                             'TextIOWrapper, StringIO, BytesIO, BufferedReader and BufferedIOBase subclasses possible')
-        self.__writable = True
-
-    def close(self, force=False):
-        """
-        write close tag of MRV file and close opened file
-
-        :param force: force closing of externally opened file or buffer
-        """
-        if not self.__finalized:
-            self._file.write('</cml>\n')
-            self.__finalized = True
-        if self.__writable:
-            self.write = self.__write_closed
-            self.__writable = False
-
-        if not self._is_buffer or force:
-            self._file.close()
-
-    def __enter__(self):
-        return self
+        super().__init__(*args, **kwargs)
 
-    def __exit__(self, _type, value, traceback):
-        self.close()
+    def _prologue(self):
+        return '<cml>\n'
 
-    @staticmethod
-    def __write_closed(_):
-        raise ValueError('I/O operation on closed writer')
+    def _epilogue(self):
+        return '</cml>\n'
 
-    def write(self, data):
-        """
-        write single molecule or reaction into file
-        """
-        self._file.write('<cml>\n')
-        self.__write(data)
-        self.write = self.__write
-
-    def __write(self, data):
+    def _format(self, data):
+        buffer = ['<MDocument><MChemicalStruct>']
         if isinstance(data, ReactionContainer):
-            buffer = ['<MDocument><MChemicalStruct>']
             if not data._arrow:
                 data.fix_positions()
 
@@ -378,26 +577,24 @@ class MRVWrite:
             buffer.append(f'<arrow type="DEFAULT" x1="{data._arrow[0] * 2:.4f}" y1="0" '
                           f'x2="{data._arrow[1] * 2:.4f}" y2="0"/>')
             buffer.append('</reaction>')
-            self._file.writelines(buffer)
         else:
             m = self.__convert_structure(data)
-            self._file.write('<MDocument><MChemicalStruct>')
-
             if data.name:
-                self._file.write(f'<molecule title="{data.name}">')
+                buffer.append(f'<molecule title="{data.name}">')
             else:
-                self._file.write('<molecule>')
+                buffer.append('<molecule>')
 
             if data.meta:
-                self._file.write('<propertyList>')
+                buffer.append('<propertyList>')
                 for k, v in data.meta.items():
                     if isinstance(v, str):
                         v = f'<![CDATA[{v}]]>'
-                    self._file.write(f'<property title="{k}"><scalar>{v}</scalar></property>')
-                self._file.write('</propertyList>')
-            self._file.write(m)
-            self._file.write('</molecule>')
-        self._file.write('</MChemicalStruct></MDocument>\n')
+                    buffer.append(f'<property title="{k}"><scalar>{v}</scalar></property>')
+                buffer.append('</propertyList>')
+            buffer.append(m)
+            buffer.append('</molecule>')
+        buffer.append('</MChemicalStruct></MDocument>\n')
+        return ''.join(buffer)
 
     def __convert_structure(self, g):
         if not isinstance(g, MoleculeContainer):
@@ -436,7 +633,6 @@ class MRVWrite:
         return ''.join(out)
 
     __bond_map = {8: '1" queryType="Any', 4: 'A', 1: '1', 2: '2', 3: '3', None: '0'}
-    __finalized = False
 
 
 class MRVread:
@@ -480,7 +676,7 @@ class MRVwrite:
 __all__ = ['MRVWrite', 'MRVwrite']
 
 if find_spec('lxml'):
-    from lxml.etree import iterparse, QName, tostring
+    from lxml.etree import iterparse, fromstring, XMLSyntaxError
 
     __all__.extend(['MRVRead', 'MRVread'])
 else:
@@ -21,47 +21,69 @@ from bisect import bisect_left
 from collections import defaultdict
 from itertools import chain
 from logging import warning
-from os.path import getsize
-from subprocess import check_output
-from sys import platform
 from time import strftime
-from traceback import format_exc
 from warnings import warn
+from ._index import scan_offsets
 from ._MDLrw import MDLRead, MDLWrite, MOLRead, EMOLRead, RXNRead, ERXNRead
-from ..containers import ReactionContainer
+from ..containers import MoleculeContainer, ReactionContainer
 from ..containers.common import Graph
 
 
 class RDFRead(MDLRead):
     """
     MDL RDF files reader. works similar to opened file object. support `with` context manager.
-    on initialization accept opened in text mode file, string path to file,
-    pathlib.Path object or another buffered reader object
+    on initialization accept opened in text mode file, string path to file, pathlib.Path object,
+    another buffered reader object or binary stream, e.g. BytesIO, pipe or `sys.stdin.buffer`.
+    gzip, bzip2 and xz compressed files given by path are decompressed on the fly
     """
-    def __init__(self, *args, indexable=False, **kwargs):
+    def __init__(self, *args, indexable=False, resume_from=None, **kwargs):
         """
         :param indexable: if True: supported methods seek, tell, object size and subscription, it only works when
-            dealing with a real file (the path to the file is specified) because the external grep utility is used,
-            supporting in unix-like OS the object behaves like a normal open file.
+            dealing with a seekable file or buffer. the object behaves like a normal open file.
+            gzip files support fast random access, bzip2 and xz files are decompressed
+            from the beginning on backward seek.
+            byte offsets of records of files stored on disk are saved into index file for reuse.
 
             if False: works like generator converting a record into ReactionContainer and returning each object in
             order, records with errors are skipped
+        :param index_dir: directory for index files. if True: index file is stored next to the parsed file.
+            by default index files are stored in user cache directory
+        :param encoding: encoding of files given by path and binary streams. by default locale encoding is used
+        :param workers: number of processes used for records parsing. if greater than 1, then file is split into
+            chunks of records by byte offsets index (same as for indexable mode) and chunks are parsed in parallel.
+            affects only iteration over file
+        :param ordered: if True: parallel mode returns records in file order, otherwise in order of parsing finish
+        :param chunksize: number of records in one chunk passed to worker process
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+        :param title_filter: callable accepting title string. records with False result are skipped before CTAB parsing
+        :param meta_filter: callable accepting metadata dict. records with False result are skipped before CTAB parsing.
+            CTAB lines are collected and parsed only after metadata check
+        :param counts_filter: callable accepting dict of counts line values. for molecules dict contains `atoms`,
+            `bonds` counts and `version` ('V2000' or 'V3000'), for reactions - `reactants`, `products` and `reagents`
+            counts. records with False result are skipped before CTAB parsing
+        :param resume_from: Checkpoint returned by `checkpoint` method or record index. reading starts from given
+            record. file is indexed same as in indexable mode and checkpoint offset is checked against index
         """
         super().__init__(*args, **kwargs)
         self._data = self.__reader()
 
-        if indexable and platform != 'win32' and not self._is_buffer:
+        if self._workers and not self._file.seekable():
+            raise self._implement_error
+        elif (indexable or self._workers or resume_from is not None) and self._file.seekable():
             self.__file = iter(self._file.readline, '')
             if next(self._data):
                 self._shifts = self._load_cache()
                 if self._shifts is None:
-                    self._shifts = [int(x.split(b':', 1)[0]) for x in
-                                    check_output(['grep', '-boE', r'^\$[RM]FMT', self._file.name]).split()]
-                    self._shifts.append(getsize(self._file.name))
+                    self._shifts = self._scan_offsets(self._file)
                     self._dump_cache(self._shifts)
+            else:  # RXN file can't be parsed in parallel
+                self._workers = None
+                self._parallel = False
         else:
             self.__file = self._file
             next(self._data)
+        if resume_from is not None:
+            self._resume(resume_from)
 
     def seek(self, offset):
         """
@@ -70,6 +92,7 @@ class RDFRead(MDLRead):
         """
         if self._shifts:
             if 0 <= offset < len(self._shifts):
+                self._record_index = offset - 1
                 current_pos = self._file.tell()
                 new_pos = self._shifts[offset]
                 if current_pos != new_pos:
@@ -107,15 +130,44 @@ class RDFRead(MDLRead):
                 return bisect_left(self._shifts, t) - 1
         raise self._implement_error
 
+    @staticmethod
+    def _scan_offsets(file):
+        return scan_offsets(file, (b'$RFMT', b'$MFMT'), eof=True)
+
+    @staticmethod
+    def _parse_meta(record, encoding):
+        skip = 2 if record.startswith(b'$RFMT') else 1  # $RXN line before reaction title
+        start = 0
+        for _ in range(skip):
+            start = record.find(b'\n', start) + 1
+        end = record.find(b'\n', start)
+        title = record[start:end].strip().decode(encoding) if start and end != -1 else ''
+
+        meta = defaultdict(list)
+        start = record.find(b'\n$DTYPE')
+        if start != -1:
+            mkey = None
+            for line in record[start + 1:].split(b'\n'):
+                if line.startswith(b'$DTYPE'):
+                    mkey = line[7:].strip().decode(encoding)
+                    if not mkey:
+                        warning(f'invalid metadata entry: {line}')
+                elif mkey:
+                    data = line.lstrip(b'$DATUM').strip()
+                    if data:
+                        meta[mkey].append(data.decode(encoding))
+        return title, meta
+
     def __reader(self):
         record = parser = mkey = None
-        failed = False
+        failed = v3000 = False
 
         if next(self.__file).startswith('$RXN'):  # parse RXN file
             is_reaction = True
             ir = 3
             meta = defaultdict(list)
             yield False
+            self._record_index = 0
         elif next(self.__file).startswith('$DATM'):  # skip header
             ir = 0
             is_reaction = meta = None
@@ -123,10 +175,26 @@ class RDFRead(MDLRead):
         else:
             raise ValueError('invalid file')
 
-        for line in self.__file:
+        ctab = None
+        deferred = self._meta_filter is not None  # CTAB parsing postponed until metadata check
+        counts_filter = self._counts_filter is not None
+        for line in self._lines(self.__file):
             if failed and not line.startswith(('$RFMT', '$MFMT')):
                 continue
-            elif parser:
+            elif deferred and parser and line.startswith(('$DTYPE', '$RFMT', '$MFMT')):  # end of CTAB
+                record, parser = parser, None
+
+            if parser:
+                if v3000 and line.startswith('M  V30 COUNTS'):
+                    v3000 = False
+                    if self._skip_record(counts=self._molecule_counts(line)):
+                        failed = True
+                        parser = None
+                        yield None
+                        continue
+                if deferred:
+                    ctab.append(line)
+                    continue
                 try:
                     if parser(line):
                         record = parser.getvalue()
@@ -134,57 +202,25 @@ class RDFRead(MDLRead):
                 except ValueError:
                     failed = True
                     parser = None
-                    warning(f'line:\n{line}\nconsist errors:\n{format_exc()}')
+                    self._report(f'line:\n{line}\nconsist errors')
                     yield None
-            elif line.startswith('$RFMT'):
-                if record:
-                    record['meta'] = self._prepare_meta(meta)
-                    if title:
-                        record['title'] = title
-                    try:
-                        if is_reaction:
-                            container, mapping = self._convert_reaction(record)
-                        else:
-                            container, mapping = self._convert_structure(record)
-                        seek = yield container
-                    except ValueError:
-                        warning(f'record consist errors:\n{format_exc()}')
-                        seek = yield None
-
-                    record = None
-                    if seek:
-                        yield
-                        self.__already_seeked = False
-                        continue
-
-                is_reaction = True
-                ir = 4
-                failed = False
-                mkey = None
-                meta = defaultdict(list)
-            elif line.startswith('$MFMT'):
+            elif line.startswith(('$RFMT', '$MFMT')):
                 if record:
-                    record['meta'] = self._prepare_meta(meta)
-                    if title:
-                        record['title'] = title
-                    try:
-                        if is_reaction:
-                            container, mapping = self._convert_reaction(record)
-                        else:
-                            container, mapping = self._convert_structure(record)
-                        seek = yield container
-                    except ValueError:
-                        warning(f'record consist errors:\n{format_exc()}')
-                        seek = yield None
-
+                    seek = yield self.__convert_record(record, ctab, title, meta, is_reaction)
                     record = None
                     if seek:
                         yield
                         self.__already_seeked = False
                         continue
 
-                ir = 3
-                failed = is_reaction = False
+                self._record_index += 1
+                if line.startswith('$RFMT'):
+                    is_reaction = True
+                    ir = 4
+                else:
+                    is_reaction = False
+                    ir = 3
+                failed = v3000 = False
                 mkey = None
                 meta = defaultdict(list)
             elif record:
@@ -199,8 +235,24 @@ class RDFRead(MDLRead):
             elif ir:
                 if ir == 3:  # parse mol or rxn title
                     title = line.strip()
+                    if self._skip_record(title=title):
+                        failed = True
+                        yield None
+                        continue
                 ir -= 1
             else:
+                if counts_filter:
+                    if is_reaction:
+                        counts = self._reaction_counts(line)
+                    elif 'V2000' in line:
+                        counts = self._molecule_counts(line)
+                    else:
+                        counts = None
+                        v3000 = 'V3000' in line
+                    if self._skip_record(counts=counts):
+                        failed = True
+                        yield None
+                        continue
                 try:
                     if is_reaction:
                         if line.startswith('M  V30 COUNTS'):
@@ -216,56 +268,85 @@ class RDFRead(MDLRead):
                             raise ValueError('invalid MOL entry')
                 except ValueError:
                     failed = True
-                    warning(f'line:\n{line}\nconsist errors:\n{format_exc()}')
+                    self._report(f'line:\n{line}\nconsist errors')
                     yield None
+                else:
+                    if deferred:
+                        ctab = []
+
+        if deferred and parser:  # last record without metadata
+            record = parser
         if record:
-            record['meta'] = self._prepare_meta(meta)
-            if title:
-                record['title'] = title
+            yield self.__convert_record(record, ctab, title, meta, is_reaction)
+
+    def __convert_record(self, record, ctab, title, meta, is_reaction):
+        meta = self._prepare_meta(meta)
+        if ctab is not None:  # record is parser with postponed CTAB
+            if self._skip_record(meta=meta):
+                return
             try:
-                if is_reaction:
-                    container, mapping = self._convert_reaction(record)
-                else:
-                    container, mapping = self._convert_structure(record)
-                yield container
+                for line in ctab:
+                    if record(line):
+                        break
+                record = record.getvalue()
             except ValueError:
-                warning(f'record consist errors:\n{format_exc()}')
-                yield None
+                self._report()
+                return
+
+        record['meta'] = meta
+        if title:
+            record['title'] = title
+        try:
+            if is_reaction:
+                container, mapping = self._convert_reaction(record)
+            else:
+                container, mapping = self._convert_structure(record)
+            return container
+        except ValueError:
+            self._report()
 
     __already_seeked = False
+    _chunk_header = '$RDFILE 1\n$DATM\n'
+    _index_kind = b'RDF '
 
 
 class RDFWrite(MDLWrite):
     """
     MDL RDF files writer. works similar to opened for writing file object. support `with` context manager.
-    on initialization accept opened for writing in text mode file, string path to file,
-    pathlib.Path object or another buffered writer object
+    on initialization accept opened for writing in text mode file, string path to file, pathlib.Path object,
+    another buffered writer object or binary stream, e.g. BytesIO, pipe or `sys.stdout.buffer`
     """
-    def write(self, data):
-        """
-        write single molecule or reaction into file
-        """
-        self._file.write(strftime('$RDFILE 1\n$DATM    %m/%d/%y %H:%M\n'))
-        self.__write(data)
-        self.write = self.__write
+    def _prologue(self):
+        return strftime('$RDFILE 1\n$DATM    %m/%d/%y %H:%M\n')
 
-    def __write(self, data):
+    def _format(self, data):
         if isinstance(data, Graph):
-            m = self._convert_structure(data)
-            self._file.write('$MFMT\n')
-            self._file.write(m)
+            out = ['$MFMT\n', self._convert_structure(data)]
         elif isinstance(data, ReactionContainer):
-            self._file.write(f'$RFMT\n$RXN\n{data.name}\n\n\n'
-                             f'{len(data.reactants):3d}{len(data.products):3d}{len(data.reagents):3d}\n')
-            for m in chain(data.reactants, data.products, data.reagents):
-                m = self._convert_structure(m)
-                self._file.write('$MOL\n')
-                self._file.write(m)
+            if any([self._is_v3000(m) for m in chain(data.reactants, data.products, data.reagents)]):
+                out = [f'$RFMT\n$RXN V3000\n{data.name}\n\n\n'
+                       f'M  V30 COUNTS {len(data.reactants)} {len(data.products)} {len(data.reagents)}\n']
+                for group, molecules in (('REACTANT', data.reactants), ('PRODUCT', data.products),
+                                         ('AGENT', data.reagents)):
+                    if molecules:
+                        out.append(f'M  V30 BEGIN {group}\n')
+                        for m in molecules:
+                            if not isinstance(m, MoleculeContainer):
+                                raise ValueError('V3000 format supported only for molecules')
+                            out.extend(self._convert_ctab(m))
+                        out.append(f'M  V30 END {group}\n')
+                out.append('M  END\n')
+            else:
+                out = [f'$RFMT\n$RXN\n{data.name}\n\n\n'
+                       f'{len(data.reactants):3d}{len(data.products):3d}{len(data.reagents):3d}\n']
+                for m in chain(data.reactants, data.products, data.reagents):
+                    out.append('$MOL\n')
+                    out.append(self._convert_structure(m))
         else:
             raise TypeError('Graph or Reaction object expected')
 
-        for k, v in data.meta.items():
-            self._file.write(f'$DTYPE {k}\n$DATUM {v}\n')
+        out.extend(f'$DTYPE {k}\n$DATUM {v}\n' for k, v in data.meta.items())
+        return ''.join(out)
 
 
 class RDFread:
@@ -16,46 +16,75 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, see <https://www.gnu.org/licenses/>.
 #
-from bisect import bisect_left
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from io import BytesIO
+from io import FileIO, StringIO
+from itertools import islice
 from logging import warning
-from subprocess import check_output
-from sys import platform
-from traceback import format_exc
+from mmap import mmap, ACCESS_READ
 from warnings import warn
+from ._index import scan_offsets
 from ._MDLrw import MDLRead, MDLWrite, MOLRead, EMOLRead
 
 
 class SDFRead(MDLRead):
     """
     MDL SDF files reader. works similar to opened file object. support `with` context manager.
-    on initialization accept opened in text mode file, string path to file,
-    pathlib.Path object or another buffered reader object
+    on initialization accept opened in text mode file, string path to file, pathlib.Path object,
+    another buffered reader object or binary stream, e.g. BytesIO, pipe or `sys.stdin.buffer`.
+    gzip, bzip2 and xz compressed files given by path are decompressed on the fly
     """
-    def __init__(self, *args, indexable=False, **kwargs):
+    def __init__(self, *args, indexable=False, memory_map=False, resume_from=None, **kwargs):
         """
         :param indexable: if True: supported methods seek, tell, object size and subscription, it only works when
-            dealing with a real file (the path to the file is specified) because the external grep utility is used,
-            supporting in unix-like OS the object behaves like a normal open file.
+            dealing with a seekable file or buffer. the object behaves like a normal open file.
+            gzip files support fast random access, bzip2 and xz files are decompressed
+            from the beginning on backward seek.
+            byte offsets of records of files stored on disk are saved into index file for reuse.
 
             if False: works like generator converting a record into MoleculeContainer and returning each object in
             order, records with errors are skipped
+        :param index_dir: directory for index files. if True: index file is stored next to the parsed file.
+            by default index files are stored in user cache directory
+        :param encoding: encoding of files given by path and binary streams. by default locale encoding is used
+        :param workers: number of processes used for records parsing. if greater than 1, then file is split into
+            chunks of records by byte offsets index (same as for indexable mode) and chunks are parsed in parallel.
+            affects only iteration over file
+        :param ordered: if True: parallel mode returns records in file order, otherwise in order of parsing finish
+        :param chunksize: number of records in one chunk passed to worker process
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+        :param memory_map: if True: file is memory mapped and records are split by byte offsets index (same as for
+            indexable mode). text of each record is decoded by one call. ignored for buffers and compressed files
+        :param title_filter: callable accepting title string. records with False result are skipped before CTAB parsing
+        :param meta_filter: callable accepting metadata dict. records with False result are skipped before CTAB parsing.
+            CTAB lines are collected and parsed only after metadata check
+        :param counts_filter: callable accepting dict with `atoms`, `bonds` counts and `version` ('V2000' or 'V3000')
+            from counts line. records with False result are skipped before CTAB parsing
+        :param resume_from: Checkpoint returned by `checkpoint` method or record index. reading starts from given
+            record. file is indexed same as in indexable mode and checkpoint offset is checked against index
         """
         super().__init__(*args, **kwargs)
+        if memory_map and isinstance(getattr(getattr(self._file, 'buffer', None), 'raw', None), FileIO):
+            try:
+                self.__mmap = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+            except ValueError:  # empty file
+                pass
         self._data = self.__reader()
 
-        if indexable and platform != 'win32' and not self._is_buffer:
-            self.__file = iter(self._file.readline, '')
+        if self._workers and not self._file.seekable():
+            raise self._implement_error
+        elif (indexable or self._workers or resume_from is not None or self.__mmap is not None) and \
+                self._file.seekable():
             self._shifts = self._load_cache()
             if self._shifts is None:
-                self._shifts = [0]
-                for x in BytesIO(check_output(['grep', '-bE', r'\$\$\$\$', self._file.name])):
-                    _pos, _line = x.split(b':', 1)
-                    self._shifts.append(int(_pos) + len(_line))
+                self._shifts = self._scan_offsets(self._file)
                 self._dump_cache(self._shifts)
+            self.__file = iter(self._file.readline, '') if self.__mmap is None else self.__mmap_lines()
         else:
             self.__file = self._file
+        if resume_from is not None:
+            self._resume(resume_from)
 
     def seek(self, offset):
         """
@@ -64,6 +93,12 @@ class SDFRead(MDLRead):
         """
         if self._shifts:
             if 0 <= offset < len(self._shifts):
+                self._record_index = offset - 1
+                if self.__mmap is not None:
+                    self.__cursor = self._shifts[offset]
+                    self.__file = self.__mmap_lines()
+                    self._data = self.__reader()
+                    return
                 current_pos = self._file.tell()
                 new_pos = self._shifts[offset]
                 if current_pos != new_pos:
@@ -81,19 +116,45 @@ class SDFRead(MDLRead):
         :return: number of records processed from the original file
         """
         if self._shifts:
-            t = self._file.tell()
+            t = self._file.tell() if self.__mmap is None else self.__cursor
             return bisect_left(self._shifts, t)
         raise self._implement_error
 
+    def close(self, force=False):
+        """
+        close opened file
+
+        :param force: force closing of externally opened file or buffer
+        """
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+        super().close(force)
+
     def __reader(self):
         im = 3
-        failkey = False
-        mkey = parser = record = None
+        failkey = v3000 = False
+        mkey = parser = record = ctab = None
         meta = defaultdict(list)
-        for line in self.__file:
+        deferred = self._meta_filter is not None  # CTAB parsing postponed until metadata check
+        counts_filter = self._counts_filter is not None
+        for line in self._lines(self.__file):
             if failkey and not line.startswith("$$$$"):
                 continue
-            elif parser:
+            elif deferred and parser and line.startswith(('>  <', '$$$$')):  # end of CTAB
+                record, parser = parser, None
+
+            if parser:
+                if v3000 and line.startswith('M  V30 COUNTS'):
+                    v3000 = False
+                    if self._skip_record(counts=self._molecule_counts(line)):
+                        failkey = True
+                        parser = None
+                        yield None
+                        continue
+                if deferred:
+                    ctab.append(line)
+                    continue
                 try:
                     if parser(line):
                         record = parser.getvalue()
@@ -101,20 +162,12 @@ class SDFRead(MDLRead):
                 except ValueError:
                     failkey = True
                     parser = None
-                    warning(f'line:\n{line}\nconsist errors:\n{format_exc()}')
+                    self._report(f'line:\n{line}\nconsist errors')
                     yield None
 
             elif line.startswith("$$$$"):
                 if record:
-                    record['meta'] = self._prepare_meta(meta)
-                    if title:
-                        record['title'] = title
-                    try:
-                        container, mapping = self._convert_structure(record)
-                        yield container
-                    except ValueError:
-                        warning(f'record consist errors:\n{format_exc()}')
-                        yield None
+                    yield self.__convert_record(record, ctab, title, meta)
                     record = None
 
                 im = 3
@@ -132,48 +185,122 @@ class SDFRead(MDLRead):
                         meta[mkey].append(data)
             elif im:
                 if im == 3:  # parse mol title
+                    self._record_index += 1
                     title = line.strip()
+                    if self._skip_record(title=title):
+                        failkey = True
+                        yield None
+                        continue
                 im -= 1
             elif not im:
+                if counts_filter and 'V2000' in line and self._skip_record(counts=self._molecule_counts(line)):
+                    failkey = True
+                    yield None
+                    continue
                 try:
                     if 'V2000' in line:
                         parser = MOLRead(line)
                     elif 'V3000' in line:
                         parser = EMOLRead()
+                        v3000 = counts_filter
                     else:
                         raise ValueError('invalid MOL entry')
                 except ValueError:
                     failkey = True
-                    warning(f'line:\n{line}\nconsist errors:\n{format_exc()}')
+                    self._report(f'line:\n{line}\nconsist errors')
                     yield None
+                else:
+                    if deferred:
+                        ctab = []
 
+        if deferred and parser:  # MOL file without metadata
+            record = parser
         if record:  # True for MOL file only.
-            record['meta'] = self._prepare_meta(meta)
-            if title:
-                record['title'] = title
+            yield self.__convert_record(record, ctab, title, meta)
+
+    def __convert_record(self, record, ctab, title, meta):
+        meta = self._prepare_meta(meta)
+        if ctab is not None:  # record is parser with postponed CTAB
+            if self._skip_record(meta=meta):
+                return
             try:
-                container, mapping = self._convert_structure(record)
-                yield container
+                for line in ctab:
+                    if record(line):
+                        break
+                record = record.getvalue()
             except ValueError:
-                warning(f'record consist errors:\n{format_exc()}')
-                yield None
+                self._report()
+                return
+
+        record['meta'] = meta
+        if title:
+            record['title'] = title
+        try:
+            container, mapping = self._convert_structure(record)
+            return container
+        except ValueError:
+            self._report()
+
+    @staticmethod
+    def _scan_offsets(file):
+        shifts = array('Q', [0])
+        shifts.extend(scan_offsets(file, (b'$$$$',), after=True))
+        return shifts
+
+    @staticmethod
+    def _parse_meta(record, encoding):
+        end = record.find(b'\n')
+        title = (record if end == -1 else record[:end]).strip().decode(encoding)
+        meta = defaultdict(list)
+        end = record.find(b'M  END')
+        if end != -1:
+            mkey = None
+            for line in record[record.find(b'\n', end) + 1:].split(b'\n'):
+                if line.startswith(b'>  <'):
+                    mkey = line.rstrip()[4:-1].strip().decode(encoding)
+                    if not mkey:
+                        warning(f'invalid metadata entry: {line}')
+                elif line.startswith(b'$$$$'):
+                    break
+                elif mkey:
+                    line = line.strip()
+                    if line:
+                        meta[mkey].append(line.decode(encoding))
+        return title, meta
+
+    def __mmap_lines(self):
+        """
+        lines of memory mapped file from cursor. records are split by offsets index and decoded by one call.
+        newlines are translated same as in text mode
+        """
+        data = self.__mmap
+        shifts = self._shifts
+        encoding = self._file.encoding
+        start = self.__cursor
+        for stop in islice(shifts, bisect_right(shifts, start), None):
+            self.__cursor = stop  # position of next record
+            yield from StringIO(data[start:stop].decode(encoding), None)
+            start = stop
+        if start < len(data):  # last record without terminator
+            self.__cursor = len(data)
+            yield from StringIO(data[start:].decode(encoding), None)
+
+    __mmap = None
+    __cursor = 0
+    _index_kind = b'SDF '
 
 
 class SDFWrite(MDLWrite):
     """
     MDL SDF files writer. works similar to opened for writing file object. support `with` context manager.
-    on initialization accept opened for writing in text mode file, string path to file,
-    pathlib.Path object or another buffered writer object
+    on initialization accept opened for writing in text mode file, string path to file, pathlib.Path object,
+    another buffered writer object or binary stream, e.g. BytesIO, pipe or `sys.stdout.buffer`
     """
-    def write(self, data):
-        """
-        write single molecule into file
-        """
-        self._file.write(self._convert_structure(data))
-
-        for k, v in data.meta.items():
-            self._file.write(f'>  <{k}>\n{v}\n')
-        self._file.write('$$$$\n')
+    def _format(self, data):
+        out = [self._convert_structure(data)]
+        out.extend(f'>  <{k}>\n{v}\n' for k, v in data.meta.items())
+        out.append('$$$$\n')
+        return ''.join(out)
 
 
 class SDFread:
@@ -18,14 +18,12 @@
 #  along with this program; if not, see <https://www.gnu.org/licenses/>.
 #
 from itertools import permutations
-from io import StringIO, TextIOWrapper
+from functools import lru_cache
 from logging import warning
-from pathlib import Path
-from re import split, compile, fullmatch
-from traceback import format_exc
+from re import compile, fullmatch
 from typing import Union, List
 from warnings import warn
-from ._CGRrw import CGRRead
+from ._LINErw import LineRead
 from ..containers import MoleculeContainer, CGRContainer, ReactionContainer
 from ..exceptions import IncorrectSmiles
 
@@ -38,9 +36,7 @@ from ..exceptions import IncorrectSmiles
 # 2: open chain (
 # 3: close chain )
 # 4: dot bond .
-# 5: in bracket raw data []
 # 6: closure number
-# 7: raw closure number
 # 8: aromatic atom
 # 9: up down bond
 # 10: dynamic bond
@@ -63,13 +59,19 @@ dyn_radical_dict = {'*': (True,), '*>^': (True, ('radical', None)), '^>*': (Fals
 
 atom_re = compile(r'([1-9][0-9]{0,2})?([A-IK-PR-Zacnops][a-ik-pr-vy]?)(@@|@)?(H[1-4]?)?([+-][1-4+-]?)?(:[0-9]{1,4})?')
 dyn_atom_re = compile(r'([1-9][0-9]{0,2})?([A-IK-PR-Z][a-ik-pr-vy]?)([+-0][1-4+-]?(>[+-0][1-4+-]?)?)?([*^](>[*^])?)?')
-delimiter = compile(r'[=:]')
+tokens_re = compile(r'(Cl|Br|[BCNOPSFIcnops])|([1-9])|\[([^\[\]]+)]|([=#:~-])|(\()|(\))|([\\/])|(\.)|'
+                   r'%([1-9][0-9]*)|(.)')
+simple_atoms = {x: (8 if x.islower() else 0, {'element': x.capitalize(), 'charge': 0, 'isotope': None,
+                                             'is_radical': False, 'mapping': 0, 'x': 0., 'y': 0., 'z': 0.,
+                                             'hydrogen': 0, 'stereo': 0})
+                for x in ('B', 'C', 'N', 'O', 'P', 'S', 'F', 'I', 'Cl', 'Br', 'c', 'n', 'o', 'p', 's')}
 
 
-class SMILESRead(CGRRead):
+class SMILESRead(LineRead):
     """SMILES separated per lines files reader. Works similar to opened file object. Support `with` context manager.
-    On initialization accept opened in text mode file, string path to file,
-    pathlib.Path object or another buffered reader object.
+    On initialization accept opened in text mode file, string path to file, pathlib.Path object,
+    another buffered reader object or binary stream, e.g. BytesIO, pipe or `sys.stdin.buffer`.
+    Gzip, bzip2 and xz compressed files given by path are decompressed on the fly.
 
     Line should be start with SMILES string and optionally continues with space/tab separated list of
     `key:value` [or `key=value`] data if `header=None`. For example::
@@ -86,57 +88,19 @@ class SMILESRead(CGRRead):
     of SMILES and values: `header=['key1', 'key2'] # order depended`.
 
     For reactions . [dot] in bonds should be used only for molecules separation.
-    """
-    def __init__(self, file, *args, header=None, **kwargs):
-        if isinstance(file, str):
-            self.__file = open(file)
-            self.__is_buffer = False
-        elif isinstance(file, Path):
-            self.__file = file.open()
-            self.__is_buffer = False
-        elif isinstance(file, (TextIOWrapper, StringIO)):
-            self.__file = file
-            self.__is_buffer = True
-        else:
-            raise TypeError('invalid file. TextIOWrapper, StringIO subclasses possible')
-        super().__init__(*args, **kwargs)
-
-        if header is True:
-            self.__header = next(self.__file).split()[1:]
-        elif header:
-            if not isinstance(header, (list, tuple)) or not all(isinstance(x, str) for x in header):
-                raise TypeError('expected list (tuple) of strings')
-            self.__header = header
-        else:
-            self.__header = None
-
-        self._data = (self.parse(line) for line in self.__file)
-
-    @classmethod
-    def create_parser(cls, *args, **kwargs):
-        """
-        Create SMILES parser function configured same as SMILESRead object.
-        """
-        obj = object.__new__(cls)
-        obj._SMILESRead__header = None
-        super(SMILESRead, obj).__init__(*args, **kwargs)
-        return obj.parse
-
-    def close(self, force=False):
-        """
-        Close opened file.
 
-        :param force: Force closing of externally opened file or buffer.
-        """
-        if not self.__is_buffer or force:
-            self.__file.close()
+    Records can be skipped by `meta_filter` and `counts_filter` callables. Metadata is checked before SMILES parsing.
+    Counts of molecules in reactions are checked before parsing, counts of atoms and bonds of molecules
+    are checked after SMILES parsing but before container building.
 
-    def __enter__(self):
-        return self
-
-    def __exit__(self, _type, value, traceback):
-        self.close()
+    With `indexable=True` supported methods seek, tell, object size and subscription for seekable files and buffers.
+    Byte offsets of lines of files stored on disk are saved into index file for reuse (in user cache directory,
+    `index_dir` directory or next to the file with `index_dir=True`).
 
+    With `workers` greater than 1 chunks of `chunksize` lines are parsed in worker processes.
+    If `ordered=False` records are returned in order of chunks parsing finish.
+    `prefetch` limits number of chunks in processing at the same time (default is twice the workers count).
+    """
     def read(self) -> List[Union[MoleculeContainer, CGRContainer, ReactionContainer]]:
         """
         Parse whole file.
@@ -145,32 +109,23 @@ class SMILESRead(CGRRead):
         """
         return list(iter(self))
 
-    def __iter__(self):
-        return (x for x in self._data if x is not None)
-
-    def __next__(self):
-        return next(iter(self))
-
     def parse(self, smiles: str) -> Union[MoleculeContainer, CGRContainer, ReactionContainer, None]:
         """SMILES string parser."""
-        smi, *data = smiles.split()
-        if self.__header is None:
-            meta = {}
-            for x in data:
-                try:
-                    k, v = split(delimiter, x, 1)
-                    meta[k] = v
-                except ValueError:
-                    warning(f'invalid metadata entry: {x}')
-        else:
-            meta = dict(zip(self.__header, data))
+        smi, meta = self._split_line(smiles)
+        if self._skip_record(meta=meta):
+            return
 
         if '>' in smi and (smi[smi.index('>') + 1] in '>([' or smi[smi.index('>') + 1].isalpha()):
             record = dict(reactants=[], reagents=[], products=[], meta=meta, title='')
             try:
                 reactants, reagents, products = smi.split('>')
-            except ValueError:
-                warning('invalid SMIRKS')
+            except ValueError as e:
+                self._report('invalid SMIRKS', smiles, e)
+                return
+            if self._counts_filter is not None and \
+                    self._skip_record(counts={'reactants': reactants.count('.') + 1 if reactants else 0,
+                                              'products': products.count('.') + 1 if products else 0,
+                                              'reagents': reagents.count('.') + 1 if reagents else 0}):
                 return
 
             try:
@@ -193,20 +148,23 @@ class SMILESRead(CGRRead):
                         else:
                             record['reagents'].append(self.__parse_tokens(x))
             except ValueError:
-                warning(f'record consist errors:\n{format_exc()}')
+                self._report(record=smiles)
                 return
 
             try:
                 container, mapping = self._convert_reaction(record)
                 return container
             except ValueError:
-                warning(f'record consist errors:\n{format_exc()}')
+                self._report(record=smiles)
                 return
         else:
             try:
                 record = self.__parse_tokens(smi)
             except ValueError:
-                warning(f'line: {smi}\nconsist errors:\n{format_exc()}')
+                self._report(f'line: {smi}\nconsist errors', smiles)
+                return
+            if self._counts_filter is not None and \
+                    self._skip_record(counts={'atoms': len(record['atoms']), 'bonds': len(record['bonds'])}):
                 return
 
             record['meta'] = meta
@@ -214,147 +172,54 @@ class SMILESRead(CGRRead):
                 container, mapping = self._convert_structure(record)
                 return container
             except ValueError:
-                warning(f'record consist errors:\n{format_exc()}')
+                self._report(record=smiles)
 
-    @staticmethod
-    def _raw_tokenize(smiles):
-        token_type = token = None
+    @classmethod
+    def _tokenize(cls, smiles):
+        """
+        Single pass SMILES lexer. Returns tokens ready for parsing: atoms and bonds are already converted.
+        """
         tokens = []
-        for s in smiles:
-            if s == '[':  # open complex token
-                if token_type == 5:  # two opened [
-                    raise IncorrectSmiles('[...[')
-                elif token:
-                    tokens.append((token_type, token))
-                elif token_type == 7:  # empty closure
-                    raise IncorrectSmiles('invalid closure')
-                token = []
-                token_type = 5
-            elif s == ']':  # close complex token
-                if token_type != 5:
-                    raise IncorrectSmiles(']..]')
-                elif not token:
-                    raise IncorrectSmiles('empty [] brackets')
-                tokens.append((5, ''.join(token)))
-                token_type = token = None
-            elif s in '()':
-                if token_type == 5:
-                    raise IncorrectSmiles('brackets in atom/bond token')
-                elif token:
-                    tokens.append((token_type, token))
-                    token = None
-                elif token_type == 7:  # empty closure
-                    raise IncorrectSmiles('invalid closure')
-                elif token_type == 2:  # barely opened
+        for match in tokens_re.finditer(smiles):
+            group = match.lastindex
+            token = match.group(group)
+            if group == 1:  # organic and aromatic atoms
+                token_type, token = simple_atoms[token]
+                tokens.append((token_type, token.copy()))
+            elif group in (2, 9):  # closures
+                tokens.append((6, int(token)))
+            elif group == 3:  # in bracket atoms and dynamic bonds
+                token_type, token = cls.__bracket_parse(token)
+                tokens.append((token_type, token if token_type == 10 else token.copy()))
+            elif group == 4:
+                tokens.append((1, replace_dict[token]))
+            elif group in (5, 6):  # ()
+                if tokens and tokens[-1][0] == 2:
                     raise IncorrectSmiles('(( or ()')
-                token_type = replace_dict[s]
-                tokens.append((token_type, None))
-            elif token_type == 5:  # grow token with brackets. skip validation
-                token.append(s)
-            elif s.isnumeric():  # closures
-                if token_type == 7:  # % already found. collect number
-                    if not token and s == '0':
-                        raise IncorrectSmiles('number starts with 0')
-                    token.append(s)
-                else:
-                    if s == '0':
-                        raise IncorrectSmiles('number starts with 0')
-                    elif token:
-                        tokens.append((token_type, token))
-                        token = None
-                    token_type = 6
-                    tokens.append((6, int(s)))
-            elif s == '%':
-                if token:
-                    tokens.append((token_type, token))
-                elif token_type == 7:
-                    raise IncorrectSmiles('%%')
-                token_type = 7
-                token = []
-            elif s in '=#:-~':  # bonds found
-                if token:
-                    tokens.append((token_type, token))
-                    token = None
-                token_type = 1
-                tokens.append((1, replace_dict[s]))
-            elif s in r'\/':
-                if token:
-                    tokens.append((token_type, token))
-                    token = None
-                token_type = 9
-                tokens.append((9, s == '/'))  # Up is true
-            elif s == '.':
-                if token:
-                    tokens.append((token_type, token))
-                    token = None
-                token_type = 4
+                tokens.append((group - 3, None))
+            elif group == 7:
+                tokens.append((9, token == '/'))  # Up is true
+            elif group == 8:
                 tokens.append((4, None))
-            elif s in 'NOPSFI':  # organic atoms
-                if token:
-                    tokens.append((token_type, token))
-                    token = None
-                token_type = 0
-                tokens.append((0, s))
-            elif s in 'cnops':  # aromatic ring atom
-                if token:
-                    tokens.append((token_type, token))
-                    token = None
-                token_type = 8
-                tokens.append((8, s.upper()))
-            elif s in 'CB':  # flag possible Cl or Br
-                if token:
-                    tokens.append((token_type, token))
-                token_type = 0
-                token = s
-            elif token_type == 0:
-                if s == 'l':
-                    if token == 'C':
-                        tokens.append((0, 'Cl'))
-                        token = None
-                    else:
-                        raise IncorrectSmiles('invalid element Bl')
-                elif s == 'r':
-                    if token == 'B':
-                        tokens.append((0, 'Br'))
-                        token = None
-                    else:
-                        raise IncorrectSmiles('invalid smiles for Cr')
-                else:
-                    raise IncorrectSmiles('invalid smiles')
             else:
-                raise IncorrectSmiles('invalid smiles')
-
-        if token_type == 5:
-            raise IncorrectSmiles('atom description has not finished')
-        elif token_type == 2:
+                raise IncorrectSmiles(f'invalid smiles at position {match.start()}')
+        if tokens and tokens[-1][0] == 2:
             raise IncorrectSmiles('not closed')
-        elif token:
-            tokens.append((token_type, token))  # %closure or C or B
-        return [(6, int(''.join(x[1]))) if x[0] == 7 else x for x in tokens]  # composite closures folding
+        return tokens
 
     @classmethod
-    def _fix_tokens(cls, tokens):
-        out = []
-        for token_type, token in tokens:
-            if token_type in (0, 8):  # simple atom
-                out.append((token_type, {'element': token, 'charge': 0, 'isotope': None, 'is_radical': False,
-                                         'mapping': 0, 'x': 0., 'y': 0., 'z': 0., 'hydrogen': 0, 'stereo': 0}))
-            elif token_type == 5:
-                if '>' in token:  # dynamic bond or atom
-                    if len(token) == 3:  # bond only possible
-                        try:
-                            out.append((10, dynamic_bonds[token]))
-                        except KeyError:
-                            raise IncorrectSmiles('invalid dynamic bond token')
-                    else:  # dynamic atom token
-                        out.append((11, cls.__dynatom_parse(token)))
-                elif '*' in token:  # CGR atom radical mark
-                    out.append((11, cls.__dynatom_parse(token)))
-                else:  # atom token
-                    out.append(cls.__atom_parse(token))
-            else:  # as is types: 1, 2, 3, 4, 6, 9
-                out.append((token_type, token))
-        return out
+    @lru_cache(4096)
+    def __bracket_parse(cls, token):
+        if '>' in token:  # dynamic bond or atom
+            if len(token) == 3:  # bond only possible
+                try:
+                    return 10, dynamic_bonds[token]
+                except KeyError:
+                    raise IncorrectSmiles('invalid dynamic bond token')
+            return 11, cls.__dynatom_parse(token)  # dynamic atom token
+        elif '*' in token:  # CGR atom radical mark
+            return 11, cls.__dynatom_parse(token)
+        return cls.__atom_parse(token)
 
     @staticmethod
     def __atom_parse(token):
@@ -436,9 +301,7 @@ class SMILESRead(CGRRead):
                 'mapping': 0, 'x': 0., 'y': 0., 'z': 0., 'cgr': cgr}
 
     def __parse_tokens(self, smiles):
-        tokens = self._raw_tokenize(smiles)
-        tokens = self._fix_tokens(tokens)
-        return self._parse_tokens(tokens)
+        return self._parse_tokens(self._tokenize(smiles))
 
     def _parse_tokens(self, tokens):
         strong_cycle = not self._ignore
@@ -17,10 +17,14 @@
 #  along with this program; if not, see <https://www.gnu.org/licenses/>.
 #
 from collections import defaultdict
+from functools import lru_cache
 from itertools import count
 from logging import warning
+from time import perf_counter
+from ._errors import ErrorSink
+from ._stats import _encoded_size, _encoding
 from ..containers import ReactionContainer, MoleculeContainer, CGRContainer, QueryContainer
-from ..containers.cgr import DynamicBond
+from ..containers.bonds import Bond, DynamicBond
 from ..exceptions import MappingError
 from ..periodictable import Element, DynamicElement, QueryElement
 
@@ -42,10 +46,174 @@ elements_set = set(common_isotopes)
 elements_list = list(common_isotopes)
 
 
+@lru_cache(None)
+def _element(symbol):
+    return Element.from_symbol(symbol)
+
+
 class CGRRead:
-    def __init__(self, remap=True, ignore=False):
+    def __init__(self, remap=True, ignore=False, title_filter=None, meta_filter=None, counts_filter=None,
+                 errors=None, trusted=False, stats=None):
+        """
+        :param title_filter: callable accepting title string of record. records with False result are skipped
+            before structure parsing
+        :param meta_filter: callable accepting metadata dict of record. records with False result are skipped
+            before structure parsing
+        :param counts_filter: callable accepting dict of record sizes. for molecules dict contains `atoms` and `bonds`
+            counts and `version` ('V2000' or 'V3000') for MDL files. for reactions dict contains `reactants`,
+            `products` and `reagents` counts. records with False result are skipped before structure parsing
+            or conversion into containers.
+            for parallel parsing filters should be picklable: module level functions or `functools.partial` objects
+        :param errors: ErrorSink object collecting records errors. available as `errors` attribute of reader.
+            by default new sink is created, which logs first 10 and every 100th errors
+        :param trusted: if True: containers are filled directly without charges, radicals and bonds validation.
+            implicit hydrogens, neighbors and hybridizations are calculated once per atom. use only for valid files,
+            e.g. produced by CGRtools writers
+        :param stats: IOStats object collecting records counts, read bytes and stages timings.
+            available as `stats` attribute of reader. by default reader is not instrumented
+        """
         self.__remap = remap
+        self.__trusted = trusted
         self._ignore = ignore
+        self._title_filter = title_filter
+        self._meta_filter = meta_filter
+        self._counts_filter = counts_filter
+        self.errors = ErrorSink() if errors is None else errors
+        self.stats = stats
+        if stats is not None:  # instance attributes override methods only in instrumented readers
+            self._convert_structure = self.__timed(self._convert_structure)
+            self._convert_reaction = self.__timed(self._convert_reaction)
+
+    def _report(self, message='record consist errors', record=None, error=None):
+        """
+        report error of current record into error sink. should be called from except block or with given error
+
+        :param record: raw record string or bytes. by default record is read by offsets index if available
+        """
+        errors = self.errors
+        index = self._record_index
+        shifts = self._shifts
+        offset = shifts[index] if shifts is not None and 0 <= index < len(shifts) - 1 else None
+        if errors.capture:
+            if record is None:
+                if offset is not None:
+                    record = self._read_record(index)
+            elif isinstance(record, bytes):
+                record = record.decode(getattr(self._file, 'encoding', None) or 'utf-8')
+        errors(index, offset, record, message, error)
+
+    def _records(self, data):
+        """
+        not skipped records of generator. in instrumented readers records are counted and timed
+        """
+        if self.stats is None:
+            return (x for x in data if x is not None)
+        return self.__timed_records(data)
+
+    def _lines(self, lines):
+        """
+        lines iterator of file. in instrumented readers lines reading is timed as io stage
+        """
+        if self.stats is None:
+            return lines
+        return self.__timed_lines(lines)
+
+    def _position(self):
+        """
+        position of reading in bytes. None for not seekable streams
+        """
+        file = self._file
+        try:
+            return getattr(file, 'buffer', file).tell()
+        except (OSError, ValueError):
+            return
+
+    def __timed_records(self, data):
+        stats = self.stats
+        timings = stats.timings
+        errors = self.errors.total
+        while True:
+            nested = timings['io'] + timings['convert']
+            start = perf_counter()
+            for x in data:
+                if x is not None:
+                    break
+            else:
+                x = None
+            timings['parse'] += perf_counter() - start - timings['io'] - timings['convert'] + nested
+
+            if self.__counted:  # encoded lines of records
+                size, self.__read = self.__read, 0
+            else:  # position of buffered stream advances by read-ahead blocks
+                position = self._position()
+                if position is not None and position > self.__position:  # backward seek is not counted
+                    size = position - self.__position
+                    self.__position = position
+                else:
+                    size = 0
+            total = self.errors.total
+            if x is None:
+                stats.count(0, size, total - errors)
+                stats.finish()
+                return
+            stats.count(1, size, total - errors)
+            errors = total
+            yield x
+
+    def __timed_lines(self, lines):
+        timings = self.stats.timings
+        encoding = _encoding(self._file)
+        self.__counted = True
+        start = perf_counter()
+        for line in lines:
+            timings['io'] += perf_counter() - start
+            self.__read += _encoded_size(line, encoding)
+            yield line
+            start = perf_counter()
+        timings['io'] += perf_counter() - start
+
+    def __timed(self, method):
+        timings = self.stats.timings
+
+        def wrapper(*args):
+            start = perf_counter()
+            try:
+                return method(*args)
+            finally:
+                timings['convert'] += perf_counter() - start
+        return wrapper
+
+    def _merge_errors(self, errors):
+        """
+        add errors collected in worker into reader sink. offsets and raw records are restored by offsets index
+        """
+        shifts = self._shifts
+        if shifts is None:
+            self.errors.merge(errors)
+            return
+        capture = self.errors.capture
+        entries = []
+        for x in errors.entries:
+            if 0 <= x.index < len(shifts) - 1:
+                x = x._replace(offset=shifts[x.index])
+                if capture and x.record is None:
+                    x = x._replace(record=self._read_record(x.index))
+            entries.append(x)
+        self.errors.merge(errors, entries)
+
+    def _skip_record(self, title=None, meta=None, counts=None):
+        """
+        check record by pre-filters. only given parts of record are checked
+
+        :return: True if record should be skipped
+        """
+        if title is not None and self._title_filter is not None and not self._title_filter(title):
+            return True
+        if meta is not None and self._meta_filter is not None and not self._meta_filter(meta):
+            return True
+        if counts is not None and self._counts_filter is not None and not self._counts_filter(counts):
+            return True
+        return False
 
     def _convert_reaction(self, reaction):
         if not (reaction['reactants'] or reaction['products'] or reaction['reagents']):
@@ -202,16 +370,104 @@ class CGRRead:
             g.add_bond(mapping[n], mapping[m], b)
         return g
 
+    @staticmethod
+    def __trusted_state(molecule, mapping, element):
+        """
+        containers state without validation. bonds are added as is
+        """
+        atoms, charges, radicals, plane, bonds, pm = {}, {}, {}, {}, {}, {}
+        for n, atom in enumerate(molecule['atoms']):
+            n = mapping[n]
+            atoms[n] = element(atom['element'])(atom['isotope'])
+            charges[n] = atom['charge']
+            radicals[n] = atom['is_radical']
+            plane[n] = (atom['x'], atom['y'])
+            bonds[n] = {}
+            pm[n] = atom['mapping']
+        return {'atoms': atoms, 'charges': charges, 'radicals': radicals, 'plane': plane, 'bonds': bonds,
+                'parsed_mapping': pm, 'meta': {}, 'name': ''}
+
+    def __trusted_molecule(self, molecule, mapping):
+        state = self.__trusted_state(molecule, mapping, _element)
+        bonds = state['bonds']
+        for n, m, b in molecule['bonds']:
+            n, m = mapping[n], mapping[m]
+            bonds[n][m] = bonds[m][n] = Bond(b)
+        atoms = molecule['atoms']
+        if any(a['z'] for a in atoms):
+            state['conformers'] = [{mapping[n]: (a['x'], a['y'], a['z']) for n, a in enumerate(atoms)}]
+        else:
+            state['conformers'] = []
+        state['atoms_stereo'] = {}
+        g = object.__new__(MoleculeContainer)
+        g.__setstate__(state)  # marks calculated once per atom
+        return g
+
+    def __trusted_cgr(self, molecule, mapping):
+        atoms = molecule['atoms']
+        cgr = defaultdict(dict)
+        p_charges = {mapping[n]: a['charge'] for n, a in enumerate(atoms)}
+        p_radicals = {mapping[n]: a['is_radical'] for n, a in enumerate(atoms)}
+        for nm, _type, value in molecule['cgr']:
+            if _type == 'radical':
+                p_radicals[mapping[nm]] = not atoms[nm]['is_radical']
+            elif _type == 'charge':
+                p_charges[mapping[nm]] = atoms[nm]['charge'] + value
+            else:
+                n, m = nm
+                cgr[n][m] = cgr[m][n] = DynamicBond(*value)
+
+        state = self.__trusted_state(molecule, mapping, DynamicElement.from_symbol)
+        state['p_charges'] = p_charges
+        state['p_radicals'] = p_radicals
+        bonds = state['bonds']
+        for n, m, b in molecule['bonds']:
+            bonds[mapping[n]][mapping[m]] = bonds[mapping[m]][mapping[n]] = cgr[n].get(m) or DynamicBond(b, b)
+        g = object.__new__(CGRContainer)
+        g.__setstate__(state)
+        return g
+
+    def __trusted_query(self, molecule, mapping):
+        atoms = molecule['atoms']
+        for n, _type, value in molecule['query']:
+            atoms[n][_type] = value
+
+        state = self.__trusted_state(molecule, mapping, QueryElement.from_symbol)
+        g = object.__new__(QueryContainer)
+        state['neighbors'] = {mapping[n]: g._validate_neighbors(a.get('neighbors')) for n, a in enumerate(atoms)}
+        state['hybridizations'] = {mapping[n]: g._validate_hybridization(a.get('hybridization'))
+                                   for n, a in enumerate(atoms)}
+        state['atoms_stereo'] = {}
+        bonds = state['bonds']
+        for n, m, b in molecule['bonds']:
+            n, m = mapping[n], mapping[m]
+            bonds[n][m] = bonds[m][n] = Bond(b)
+        g.__setstate__(state)
+        return g
+
     def __prepare_structure(self, molecule, mapping):
         if 'query' in molecule:
             if 'cgr' in molecule:
                 raise ValueError('QueryCGR parsing not supported')
-            g = self.__convert_query(molecule, mapping)
+            if self.__trusted:
+                g = self.__trusted_query(molecule, mapping)
+            else:
+                g = self.__convert_query(molecule, mapping)
         elif 'cgr' in molecule:
-            g = self.__convert_cgr(molecule, mapping)
+            if self.__trusted:
+                g = self.__trusted_cgr(molecule, mapping)
+            else:
+                g = self.__convert_cgr(molecule, mapping)
+        elif self.__trusted:
+            g = self.__trusted_molecule(molecule, mapping)
         else:
             g = self.__convert_molecule(molecule, mapping)
 
         if 'title' in molecule:
             g.name = molecule['title']
         return g
+
+    _shifts = stats = None
+    __position = __read = 0  # position of stream and bytes of counted lines
+    __counted = False  # True if read lines are counted
+    _record_index = -1  # index of currently parsed record
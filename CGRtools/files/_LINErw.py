@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from io import BufferedIOBase, RawIOBase, StringIO, TextIOWrapper
+from itertools import count, islice
+from logging import warning
+from pathlib import Path
+from re import compile, split
+from sys import modules
+from ._CGRrw import CGRRead
+from ._compressed import open_file, StreamWrapper
+from ._errors import ErrorSink
+from ._index import scan_lines, OffsetsIndex
+from ._pool import imap
+
+
+delimiter = compile(r'[=:]')
+
+
+class LineReadMeta(type):
+    def __call__(cls, *args, **kwargs):
+        if kwargs.get('indexable'):
+            cls = type(cls.__name__, (cls,), {'__len__': lambda x: len(x._shifts) - 1, '__module__': cls.__module__})
+        obj = object.__new__(cls)
+        obj.__init__(*args, **kwargs)
+        return obj
+
+
+class LineRead(CGRRead, OffsetsIndex, metaclass=LineReadMeta):
+    """
+    base class of one record per line files readers
+    """
+    def __init__(self, file, *args, header=None, indexable=False, index_dir=None, workers=1, ordered=True,
+                 chunksize=1000, prefetch=None, encoding=None, resume_from=None, **kwargs):
+        """
+        :param header: if True: first line of file is space/tab separated list of keys. also possible to pass list
+            of keys for mapping space/tab separated values after structure string
+        :param indexable: if True: supported methods seek, tell, object size and subscription, it only works when
+            dealing with a seekable file or buffer. byte offsets of lines of files stored on disk are saved into
+            index file for reuse
+        :param index_dir: directory for index files. if True: index file is stored next to the parsed file.
+            by default index files are stored in user cache directory
+        :param workers: number of workers used for lines parsing. if greater than 1, then chunks of lines
+            are parsed in parallel. affects only iteration over file
+        :param ordered: if True: parallel mode returns records in file order, otherwise in order of parsing finish
+        :param chunksize: number of lines in one chunk passed to worker
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+        :param encoding: encoding of files given by path and binary streams. by default locale encoding is used
+        :param resume_from: Checkpoint returned by `checkpoint` method or record index. reading starts from given
+            record. file is indexed same as in indexable mode and checkpoint offset is checked against index
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        elif not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif workers > 1:
+            self.__workers = workers
+            self._parallel = True
+            self.__ordered = ordered
+            self.__chunksize = chunksize
+            self.__prefetch = prefetch
+
+        if isinstance(file, (str, Path)):
+            self._file = open_file(file, encoding=encoding)
+            self._is_buffer = False
+        elif isinstance(file, (TextIOWrapper, StringIO)):
+            self._file = file
+            self._is_buffer = True
+        elif isinstance(file, (BufferedIOBase, RawIOBase)):
+            self._file = StreamWrapper(file, encoding)
+            self._is_buffer = True
+        else:
+            raise TypeError('invalid file. '
+                            'TextIOWrapper, StringIO, BytesIO, BufferedReader and BufferedIOBase subclasses possible')
+        super().__init__(*args, **kwargs)
+        self._config = (args, kwargs)
+        self._index_dir = index_dir
+
+        if (indexable or resume_from is not None) and self._file.seekable():
+            self.__file = iter(self._file.readline, '')  # text wrapper position is not available during iteration
+            shifts = self._load_cache()
+            if shifts is None:
+                shifts = scan_lines(self._file)
+                self._dump_cache(shifts)
+        else:
+            self.__file = self._file
+            shifts = None
+
+        if header is True:
+            self._header = next(self.__file).split()[1:]
+            if shifts is not None:
+                shifts = shifts[1:]
+        else:
+            self._header = self._check_header(header)
+
+        self._shifts = shifts
+        self._data = self.__reader()
+        if resume_from is not None:
+            self._resume(resume_from)
+
+    @classmethod
+    def create_parser(cls, *args, header=None, **kwargs):
+        """
+        create parser function configured same as reader object
+
+        :param header: list of metadata keys for space/tab separated values after structure string
+        """
+        obj = object.__new__(cls)
+        obj._header = cls._check_header(header)
+        super(LineRead, obj).__init__(*args, **kwargs)
+        return obj.parse
+
+    @classmethod
+    def parse_many(cls, strings, *args, header=None, workers=1, chunksize=1000, prefetch=None, errors=None,
+                   **kwargs):
+        """
+        parse strings. strings can contain metadata same as file lines
+
+        :param strings: iterable of strings
+        :param header: list of metadata keys for space/tab separated values after structure string
+        :param workers: number of workers. if greater than 1, chunks of `chunksize` strings are parsed in parallel
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+        :param errors: ErrorSink object collecting errors. records indices are strings indices
+        :return: list of parsed structures in order of strings. None for strings with errors
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        elif not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif errors is None:
+            errors = ErrorSink()
+        header = cls._check_header(header)
+        if workers == 1:
+            return _parse_lines(cls, strings, header, 0, args, {**kwargs, 'errors': errors})[0]
+
+        strings = iter(strings)
+        # each chunk has own sink. sinks of workers merged in order of chunks
+        tasks = ((cls, chunk, header, i, args, {**kwargs, 'errors': errors.spawn()}) for i, chunk in
+                 zip(count(0, chunksize), iter(lambda: list(islice(strings, chunksize)), [])))
+        out = []
+        for records, sink in imap(_parse_lines, tasks, workers, True, prefetch, cls._executor):
+            if sink:
+                errors.merge(sink)
+            out.extend(records)
+        return out
+
+    def close(self, force=False):
+        """
+        close opened file
+
+        :param force: force closing of externally opened file or buffer
+        """
+        if self.__pool_data is not None:
+            self.__pool_data.close()
+        self._close_cache()
+        if not self._is_buffer or force:
+            self._file.close()
+        elif isinstance(self._file, StreamWrapper):
+            self._file.detach()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+
+    def read(self):
+        """
+        parse whole file
+
+        :return: list of parsed structures
+        """
+        return list(iter(self))
+
+    def __iter__(self):
+        if self.__workers:
+            if self.__pool_data is None:
+                self.__pool_data = self.__pool_reader()
+            return self._records(self.__pool_data)
+        return self._records(self._data)
+
+    def __next__(self):
+        return next(iter(self))
+
+    def seek(self, offset):
+        """
+        shifts on a given number of record in the original file
+        :param offset: number of record
+        """
+        if self._shifts is not None:
+            if 0 <= offset < len(self._shifts):
+                self._record_index = offset - 1
+                current_pos = self._file.tell()
+                new_pos = self._shifts[offset]
+                if current_pos != new_pos:
+                    if current_pos == self._shifts[-1]:  # reached the end of the file
+                        self.__file = iter(self._file.readline, '')
+                        self._data = self.__reader()
+                    self._file.seek(new_pos)
+            else:
+                raise IndexError('invalid offset')
+        else:
+            raise self._implement_error
+
+    def tell(self):
+        """
+        :return: number of records processed from the original file
+        """
+        if self._shifts is not None:
+            return bisect_left(self._shifts, self._file.tell())
+        raise self._implement_error
+
+    def __reader(self):
+        for line in self._lines(self.__file):
+            self._record_index += 1
+            yield self.parse(line)
+
+    def __pool_reader(self):
+        """
+        parse chunks of lines in workers. number of chunks in processing is limited by prefetch window
+        """
+        args, kwargs = self._config
+        lines = iter(self._file.readline, '')
+        chunksize = self.__chunksize
+        # indexable readers are dynamic subclasses. workers require importable class
+        reader = getattr(modules[type(self).__module__], type(self).__name__)
+        tasks = ((reader, chunk, self._header, i, args, {**kwargs, 'errors': self.errors.spawn(), 'stats': None})
+                 for i, chunk in zip(count(self._record_index + 1, chunksize),
+                                     iter(lambda: list(islice(lines, chunksize)), [])))
+        for chunk, errors in imap(_parse_lines, tasks, self.__workers, self.__ordered, self.__prefetch,
+                                  self._executor):
+            if errors:
+                self._merge_errors(errors)
+            yield from (x for x in chunk if x is not None)
+
+    def _split_line(self, line):
+        """
+        split line into structure string and metadata
+        """
+        string, *data = line.split()
+        if self._header is None:
+            meta = {}
+            for x in data:
+                try:
+                    k, v = split(delimiter, x, 1)
+                    meta[k] = v
+                except ValueError:
+                    warning(f'invalid metadata entry: {x}')
+        else:
+            meta = dict(zip(self._header, data))
+        return string, meta
+
+    @staticmethod
+    def _check_header(header):
+        if not header:
+            return
+        elif not isinstance(header, (list, tuple)) or not all(isinstance(x, str) for x in header):
+            raise TypeError('expected list (tuple) of strings')
+        return header
+
+    _shifts = None
+    _index_kind = b'LINE'
+    _executor = ProcessPoolExecutor  # workers pool type
+    __workers = __pool_data = None
+    _implement_error = NotImplementedError('Indexable supported only for seekable files and buffers')
+
+
+def _parse_lines(reader, lines, header, index, args, kwargs):
+    parser = reader.create_parser(*args, header=header, **kwargs).__self__
+    records = []
+    for parser._record_index, line in enumerate(lines, index):
+        records.append(parser.parse(line))
+    return records, parser.errors
+
+
+__all__ = ['LineRead']
@@ -16,17 +16,20 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, see <https://www.gnu.org/licenses/>.
 #
-from base64 import urlsafe_b64encode
 from collections import defaultdict
 from csv import reader
 from logging import warning, info
-from io import StringIO, TextIOWrapper
+from io import BufferedIOBase, FileIO, RawIOBase, StringIO, TextIOBase, TextIOWrapper
 from itertools import chain, islice
-from os.path import abspath, join
+from mmap import mmap, ACCESS_READ
 from pathlib import Path
-from pickle import dump, load, UnpicklingError
-from tempfile import gettempdir
+from sys import modules
 from ._CGRrw import CGRRead, common_isotopes
+from ._compressed import open_file, StreamWrapper
+from ._index import OffsetsIndex
+from ._pool import imap
+from ._stats import _encoded_size
+from ._writer import BufferedWrite
 from ..containers import MoleculeContainer, CGRContainer, QueryContainer, QueryCGRContainer
 from ..exceptions import EmptyMolecule, NotChiral, IsChiral, ValenceError
 
@@ -459,19 +462,34 @@ class MDLReadMeta(type):
         return obj
 
 
-class MDLRead(CGRRead, metaclass=MDLReadMeta):
-    def __init__(self, file, *args, **kwargs):
-        if isinstance(file, str):
-            self._file = open(file)
-            self._is_buffer = False
-        elif isinstance(file, Path):
-            self._file = file.open()
+class MDLRead(CGRRead, OffsetsIndex, metaclass=MDLReadMeta):
+    def __init__(self, file, *args, encoding=None, index_dir=None, workers=1, ordered=True, chunksize=100,
+                 prefetch=None, **kwargs):
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        elif not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif workers > 1:
+            self._workers = workers
+            self._parallel = True
+            self.__ordered = ordered
+            self.__chunksize = chunksize
+            self.__prefetch = prefetch
+            self.__config = (args, kwargs)
+        self._index_dir = index_dir
+
+        if isinstance(file, (str, Path)):
+            self._file = open_file(file, encoding=encoding)
             self._is_buffer = False
         elif isinstance(file, (TextIOWrapper, StringIO)):
             self._file = file
             self._is_buffer = True
+        elif isinstance(file, (BufferedIOBase, RawIOBase)):
+            self._file = StreamWrapper(file, encoding)
+            self._is_buffer = True
         else:
-            raise TypeError('invalid file. TextIOWrapper, StringIO subclasses possible')
+            raise TypeError('invalid file. '
+                            'TextIOWrapper, StringIO, BytesIO, BufferedReader and BufferedIOBase subclasses possible')
         super().__init__(*args, **kwargs)
 
     def close(self, force=False):
@@ -480,8 +498,13 @@ class MDLRead(CGRRead, metaclass=MDLReadMeta):
 
         :param force: force closing of externally opened file or buffer
         """
+        if self.__pool_data is not None:
+            self.__pool_data.close()
+        self._close_cache()
         if not self._is_buffer or force:
             self._file.close()
+        elif isinstance(self._file, StreamWrapper):
+            self._file.detach()
 
     def __enter__(self):
         return self
@@ -489,34 +512,6 @@ class MDLRead(CGRRead, metaclass=MDLReadMeta):
     def __exit__(self, _type, value, traceback):
         self.close()
 
-    def _load_cache(self):
-        """
-        the method is implemented for the purpose of optimization, byte positions will not be re-read from a file
-        that has already been used, if the content of the file has changed, and the name has been left the same,
-        the old version of byte offsets will be loaded
-        :return: list of byte offsets from existing file
-        """
-        try:
-            with open(self.__cache_path, 'rb') as f:
-                return load(f)
-        except FileNotFoundError:
-            return
-        except IsADirectoryError as e:
-            raise IsADirectoryError(f'Please delete {self.__cache_path} directory') from e
-        except (UnpicklingError, EOFError) as e:
-            raise UnpicklingError(f'Invalid cache file {self.__cache_path}. Please delete it') from e
-
-    @property
-    def __cache_path(self):
-        return abspath(join(gettempdir(), 'cgrtools_' + urlsafe_b64encode(abspath(self._file.name).encode()).decode()))
-
-    def _dump_cache(self, _shifts):
-        """
-        _shifts dumps in /tmp directory after reboot it will drop
-        """
-        with open(self.__cache_path, 'wb') as f:
-            dump(_shifts, f)
-
     def read(self):
         """
         parse whole file
@@ -526,53 +521,141 @@ class MDLRead(CGRRead, metaclass=MDLReadMeta):
         return list(iter(self))
 
     def __iter__(self):
-        return (x for x in self._data if x is not None)
+        if self._workers:
+            if self.__pool_data is None:
+                self.__pool_data = self.__pool_reader()
+            return self._records(self.__pool_data)
+        return self._records(self._data)
 
     def __next__(self):
         return next(iter(self))
 
-    def __getitem__(self, item):
+    def read_meta(self):
         """
-        getting the item by index from the original file,
-        if the required record of the file with an error,
-        then only the correct record are returned
-        :param item: int or slice
-        :return: [Molecule, Reaction]Container or list of [Molecule, Reaction]Containers
+        iterate over titles and metadata of records without CTAB parsing. files stored on disk are memory mapped and
+        only titles and metadata blocks are decoded. structure errors are not detected, thus metadata of records
+        skipped by reader also returned. iteration over the reader is not affected.
+
+        :return: generator of (record index, title, metadata) tuples. index is number of record in the file
         """
-        if self._shifts:
-            _len = len(self._shifts) - 1
-            _current_pos = self.tell()
-
-            if isinstance(item, int):
-                if item >= _len or item < -_len:
-                    raise IndexError('List index out of range')
-                if item < 0:
-                    item += _len
-                self.seek(item)
-                records = next(self._data)
-            elif isinstance(item, slice):
-                start, stop, step = item.indices(_len)
-                if start == stop:
-                    return []
-
-                if step == 1:
-                    self.seek(start)
-                    records = [x for x in islice(self._data, 0, stop - start) if x is not None]
+        file = self._file
+        if not file.seekable():
+            raise self._implement_error
+        buffer = getattr(file, 'buffer', file)  # text wrapper position is not available during iteration
+        shifts = self._shifts
+        if shifts is None:
+            shifts = self._scan_offsets(buffer)
+
+        if isinstance(buffer, TextIOBase):  # StringIO
+            encoding = None
+        else:
+            encoding = file.encoding
+            if isinstance(getattr(buffer, 'raw', None), FileIO):
+                try:
+                    buffer = mmap(buffer.fileno(), 0, access=ACCESS_READ)
+                except ValueError:  # empty file
+                    return
+
+        position = buffer.tell()
+        stops = chain(islice(shifts, 1, None), (None,))  # last record of SDF can be not terminated
+        try:
+            if not isinstance(buffer, mmap):
+                buffer.seek(shifts[0])
+            for index, (start, stop) in enumerate(zip(shifts, stops)):
+                if isinstance(buffer, mmap):
+                    record = buffer[start:stop]
                 else:
-                    records = []
-                    for index in range(start, stop, step):
-                        self.seek(index)
-                        record = next(self._data)
-                        if record:
-                            records.append(record)
+                    record = buffer.read() if stop is None else buffer.read(stop - start)
+                if encoding is None:
+                    record = record.encode()
+                if stop is None and not record.strip():
+                    break
+                if b'\r' in record:
+                    record = record.replace(b'\r\n', b'\n')
+                title, meta = self._parse_meta(record, encoding or 'utf-8')
+                yield index, title, self._prepare_meta(meta)
+        finally:
+            if isinstance(buffer, mmap):
+                buffer.close()
             else:
-                raise TypeError('Indices must be integers or slices')
+                buffer.seek(position)
 
-            self.seek(_current_pos)
-            if records is None:
-                raise IndexError('Data block with requested index contain errors')
-            return records
-        raise self._implement_error
+    def __pool_reader(self):
+        """
+        parse chunks of records in worker processes. chunks boundaries taken from byte offsets index.
+        number of chunks in processing is limited by prefetch window
+        """
+        shifts = self._shifts
+        total = len(shifts) - 1
+        chunksize = self.__chunksize
+        args, kwargs = self.__config
+        # indexable readers are dynamic subclasses. workers require importable class
+        reader = getattr(modules[type(self).__module__], type(self).__name__)
+        kwargs = {**kwargs, 'errors': self.errors.spawn(), 'stats': None}
+        tasks = ((reader, self.__chunk(shifts[i], shifts[i + chunksize] if i + chunksize < total else None),
+                  self._chunk_header, i, args, kwargs) for i in range(self._record_index + 1, total or 1, chunksize))
+
+        self.__pool_position = shifts[self._record_index + 1]  # header is counted as in serial mode
+        for records, errors, size in imap(_parse_chunk, tasks, self._workers, self.__ordered, self.__prefetch):
+            if errors:
+                self._merge_errors(errors)
+            self.__pool_position += size
+            yield from records
+
+    def __chunk(self, start, stop):
+        """
+        workers read records from disk files themselves. records of buffers and compressed files are read here
+        """
+        file = self._file
+        buffer = getattr(file, 'buffer', None)
+        name = getattr(file, 'name', None)
+        if isinstance(getattr(buffer, 'raw', None), FileIO) and isinstance(name, str):
+            return name, file.encoding, start, stop
+
+        position = file.tell()
+        if buffer is None:  # StringIO
+            file.seek(start)
+            data = file.read() if stop is None else file.read(stop - start)
+            size = _encoded_size(data, 'utf-8')
+        else:
+            buffer.seek(start)
+            data = buffer.read() if stop is None else buffer.read(stop - start)
+            size = len(data)
+            data = data.decode(file.encoding)
+        file.seek(position)
+        return data, size
+
+    def _position(self):
+        if self._parallel:  # workers read files themselves
+            return self.__pool_position
+        return super()._position()
+
+    @staticmethod
+    def _molecule_counts(line):
+        """
+        atoms and bonds counts from V2000 counts line or V3000 COUNTS line. None for invalid line
+        """
+        try:
+            if line.startswith('M  V30 COUNTS'):
+                atoms, bonds = line[13:].split()[:2]
+                return {'atoms': int(atoms), 'bonds': int(bonds), 'version': 'V3000'}
+            return {'atoms': int(line[:3]), 'bonds': int(line[3:6]), 'version': 'V2000'}
+        except ValueError:  # parser reports errors
+            return
+
+    @staticmethod
+    def _reaction_counts(line):
+        """
+        molecules counts from RXN counts line or V3000 COUNTS line. None for invalid line
+        """
+        try:
+            if line.startswith('M  V30 COUNTS'):
+                tmp = line[13:].split()
+                return {'reactants': int(tmp[0]), 'products': int(tmp[1]),
+                        'reagents': int(tmp[2]) if len(tmp) == 3 else 0}
+            return {'reactants': int(line[:3]), 'products': int(line[3:6]), 'reagents': int(line[6:].rstrip() or 0)}
+        except (ValueError, IndexError):
+            return
 
     @staticmethod
     def _prepare_meta(meta):
@@ -584,51 +667,63 @@ class MDLRead(CGRRead, metaclass=MDLReadMeta):
                 warning(f'invalid metadata entry: {k}: {v}')
         return new_meta
 
-    _shifts = None
-    _implement_error = NotImplementedError('Indexable supported in unix-like o.s. and for files stored on disk')
-
-
-class MDLWrite:
-    def __init__(self, file):
+    _shifts = _workers = None
+    _chunk_header = ''
+    __pool_data = None
+    __pool_position = 0  # bytes of chunks parsed by workers
+    _implement_error = NotImplementedError('Indexable supported only for seekable files and buffers')
+
+
+def _parse_chunk(reader, chunk, header, index, args, kwargs):
+    """
+    :return: records, errors sink and size of chunk in bytes
+    """
+    if isinstance(chunk, str):  # records of async stream
+        size = _encoded_size(chunk, 'utf-8')
+    elif len(chunk) == 2:  # records of buffer read in main process
+        chunk, size = chunk
+    else:  # read records from disk
+        path, encoding, start, stop = chunk
+        with open(path, 'rb') as f:
+            f.seek(start)
+            chunk = f.read() if stop is None else f.read(stop - start)
+        size = len(chunk)
+        chunk = chunk.decode(encoding)
+    with reader(StringIO(header + chunk), *args, **kwargs) as f:
+        f._record_index = index - 1
+        return f.read(), f.errors, size
+
+
+class MDLWrite(BufferedWrite):
+    def __init__(self, file, *args, encoding=None, v3000=None, **kwargs):
+        """
+        :param v3000: if True: molecules are written in V3000 format. if False: V2000 format is used.
+            by default V3000 is used only for molecules with more than 999 atoms or bonds.
+            CGRs and queries are supported only in V2000 format
+        """
+        self._v3000 = v3000
         if isinstance(file, str):
-            self._file = open(file, 'w')
+            self._file = open(file, 'w', encoding=encoding)
             self._is_buffer = False
         elif isinstance(file, Path):
-            self._file = file.open('w')
+            self._file = file.open('w', encoding=encoding)
             self._is_buffer = False
         elif isinstance(file, (TextIOWrapper, StringIO)):
             self._file = file
             self._is_buffer = True
+        elif isinstance(file, (BufferedIOBase, RawIOBase)):
+            self._file = StreamWrapper(file, encoding, True)
+            self._is_buffer = True
         else:
             raise TypeError('invalid file. '
                             'TextIOWrapper, StringIO, BytesIO, BufferedReader and BufferedIOBase subclasses possible')
-        self.__write = True
-
-    def close(self, force=False):
-        """
-        close opened file
-
-        :param force: force closing of externally opened file or buffer
-        """
-        if self.__write:
-            self.write = self.__write_closed
-            self.__write = False
-
-        if not self._is_buffer or force:
-            self._file.close()
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, _type, value, traceback):
-        self.close()
-
-    @staticmethod
-    def __write_closed(_):
-        raise ValueError('I/O operation on closed writer')
+        super().__init__(*args, **kwargs)
 
     def _convert_structure(self, g):
-        if isinstance(g, MoleculeContainer):
+        if self._is_v3000(g):
+            return ''.join((f'{g.name}\n\n\n  0  0  0     0  0            999 V3000\n', *self._convert_ctab(g),
+                            'M  END\n'))
+        elif isinstance(g, MoleculeContainer):
             bonds = self.__convert_molecule(g)
         elif isinstance(g, CGRContainer):
             bonds = self.__convert_cgr(g)
@@ -662,6 +757,59 @@ class MDLWrite:
         out.append('M  END\n')
         return ''.join(out)
 
+    def _is_v3000(self, g):
+        """
+        check format of structure
+        """
+        v3000 = self._v3000
+        large = g.atoms_count > 999 or g.bonds_count > 999
+        if v3000 is None:
+            v3000 = large
+        if v3000:
+            if not isinstance(g, MoleculeContainer):
+                raise ValueError('V3000 format supported only for molecules')
+        elif large:
+            raise ValueError('V2000 format supports up to 999 atoms and bonds')
+        return v3000
+
+    @staticmethod
+    def _convert_ctab(g):
+        """
+        V3000 CTAB block of molecule. coordinates of first conformer are used if available
+        """
+        gc = g._charges
+        gr = g._radicals
+        conformers = g._conformers
+        xyz = conformers[0] if conformers else {n: (*xy, 0.) for n, xy in g._plane.items()}
+        atoms = {m: n for n, m in enumerate(g._atoms, start=1)}
+        out = ['M  V30 BEGIN CTAB\n', f'M  V30 COUNTS {len(atoms)} {g.bonds_count} 0 0 0\n', 'M  V30 BEGIN ATOM\n']
+        for (m, n), a in zip(atoms.items(), g._atoms.values()):
+            x, y, z = xyz[m]
+            line = f'M  V30 {n} {a.atomic_symbol} {x:.4f} {y:.4f} {z:.4f} {m}'
+            c = gc[m]
+            if c:
+                line += f' CHG={c}'
+            if gr[m]:
+                line += ' RAD=2'
+            if a.isotope:
+                line += f' MASS={a.isotope}'
+            out.append(_v30_wrap(line) if len(line) > 79 else line + '\n')
+        out.append('M  V30 END ATOM\n')
+
+        bonds = g._bonds
+        wedge = defaultdict(set)
+        out.append('M  V30 BEGIN BOND\n')
+        i = 0
+        for i, (n, m, s) in enumerate(g._wedge_map, start=1):
+            out.append(f'M  V30 {i} {bonds[n][m].order} {atoms[n]} {atoms[m]} CFG={s == 1 and "1" or "3"}\n')
+            wedge[n].add(m)
+            wedge[m].add(n)
+        for i, (n, m, b) in enumerate((x for x in g.bonds() if x[1] not in wedge[x[0]]), start=i + 1):
+            out.append(f'M  V30 {i} {b.order} {atoms[n]} {atoms[m]}\n')
+        out.append('M  V30 END BOND\n')
+        out.append('M  V30 END CTAB\n')
+        return out
+
     @classmethod
     def __convert_molecule(cls, g):
         bonds = g._bonds
@@ -762,9 +910,24 @@ class MDLWrite:
         out.extend(props)
         return out
 
+    _options = ('_v3000',)
+    _v3000 = None
     __charge_map = {-3: '  7', -2: '  6', -1: '  5', 0: '  0', 1: '  3', 2: '  2', 3: '  1'}
 
 
+def _v30_wrap(line):
+    """
+    split V3000 line longer than 80 symbols into continued lines
+    """
+    out = []
+    line = line[7:]
+    while len(line) > 71:
+        out.append(f'M  V30 {line[:71]}-\n')
+        line = line[71:]
+    out.append(f'M  V30 {line}\n')
+    return ''.join(out)
+
+
 class MOLStereo:
     @staticmethod
     def update_stereo(g, mapping, stereo):
@@ -19,11 +19,20 @@
 """
 Available file parsers and writers
 """
+from .CGRBrw import *
 from .INCHIrw import *
 from .MRVrw import *
 from .RDFrw import *
 from .SDFrw import *
 from .SMILESrw import *
+from ._archive import *
+from ._async import *
+from ._dataset import *
+from ._sharded import *
+from ._checkpoint import ResumableJob
+from ._errors import ErrorSink
+from ._stats import IOStats
 
 
 __all__ = [x for x in locals() if x.endswith(('Read', 'Write'))]
+__all__.extend(('ErrorSink', 'IOStats', 'ResumableJob'))
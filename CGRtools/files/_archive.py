@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from bz2 import BZ2File
+from gzip import GzipFile
+from importlib.util import find_spec
+from io import BufferedIOBase, BufferedReader, BytesIO, RawIOBase
+from lzma import LZMAFile
+from os.path import basename
+from pathlib import Path
+from tarfile import open as tar_open
+from zipfile import ZipFile, is_zipfile
+from ._errors import ErrorSink
+from ._LINErw import LineRead
+from ._MDLrw import MDLRead
+from ._pool import imap
+from . import INCHIrw
+from .RDFrw import RDFRead
+from .SDFrw import SDFRead
+from .SMILESrw import SMILESRead
+
+
+_extensions = {'sdf': SDFRead, 'sd': SDFRead, 'mol': SDFRead, 'rdf': RDFRead, 'rxn': RDFRead,
+               'smi': SMILESRead, 'smiles': SMILESRead}
+
+if 'INCHIRead' in INCHIrw.__all__:  # libinchi available
+    INCHIRead = INCHIrw.INCHIRead
+    _extensions['inchi'] = INCHIRead
+else:
+    INCHIRead = None
+
+if find_spec('lxml'):
+    from .MRVrw import MRVRead
+
+    _extensions['mrv'] = MRVRead
+else:
+    MRVRead = None
+
+
+class ArchiveRead:
+    """
+    reader of structures files packed into zip or tar archives. works similar to opened file object.
+    support `with` context manager. on initialization accept string path to archive, pathlib.Path object or
+    opened in binary mode file. tar archives can be gzip, bzip2 or xz compressed and read from not seekable streams,
+    e.g. pipes. zip archives require seekable files.
+
+    members are streamed from archive without extraction. reader of member is selected by file extension,
+    members with unknown extension are recognized by content. gzip, bzip2 and xz compressed members are decompressed
+    on the fly. directories and not recognized members are skipped.
+    records errors are collected into `errors` sink with (member name, record index in member) indices
+    """
+    def __init__(self, file, *args, readers=None, options=None, encoding=None, workers=1, ordered=True,
+                 prefetch=None, errors=None, **kwargs):
+        """
+        :param readers: dict of file extensions and reader classes. extends and overrides default mapping:
+            sdf, sd, mol - SDFRead; rdf, rxn - RDFRead; smi, smiles - SMILESRead; inchi - INCHIRead; mrv - MRVRead
+        :param options: dict of reader classes and their specific keyword arguments,
+            e.g. {SMILESRead: {'header': True}}. ErrorSink given as `errors` option receives errors of members
+            of this reader class in addition to `errors` sink
+        :param encoding: encoding of text files. by default locale encoding is used
+        :param workers: number of processes used for parsing. if greater than 1, then members are parsed in parallel.
+            members of zip archives given by path are read by workers themselves, other members are read here
+        :param ordered: if True: parallel mode returns members records in archive order,
+            otherwise in order of members parsing finish
+        :param prefetch: number of members in processing at the same time. default is twice the workers count
+        :param errors: ErrorSink object collecting records errors. available as `errors` attribute
+
+        other arguments are common options of readers, e.g. remap, ignore, filters or trusted
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        self.__readers = _extensions if readers is None else {**_extensions, **readers}
+        self.__options = options or {}
+        self.__encoding = encoding
+        self.__config = (args, kwargs)
+        self.__workers = workers
+        self.__ordered = ordered
+        self.__prefetch = prefetch
+        self.errors = ErrorSink() if errors is None else errors
+
+        if isinstance(file, (str, Path)):
+            file = str(file)
+            self.__is_buffer = False
+            if is_zipfile(file):
+                self.__zip = ZipFile(file)
+                self.__path = file
+            else:
+                self.__tar = tar_open(file, 'r:*')
+        elif isinstance(file, (BufferedIOBase, RawIOBase)):
+            self.__is_buffer = True
+            if file.seekable() and is_zipfile(file):
+                file.seek(0)
+                self.__zip = ZipFile(file)
+            elif file.seekable():
+                file.seek(0)
+                self.__tar = tar_open(fileobj=file, mode='r:*')
+            else:
+                self.__tar = tar_open(fileobj=file, mode='r|*')
+        else:
+            raise TypeError('invalid file. string path, pathlib.Path or opened in binary mode file possible')
+
+        self.member = None  # name of member of last returned record
+        self._data = self.__pool_reader() if workers > 1 else self.__reader()
+
+    def close(self, force=False):
+        """
+        close archive
+
+        :param force: force closing of externally opened file
+        """
+        self._data.close()
+        if self.__zip is not None:
+            file = self.__zip.fp
+            self.__zip.close()
+        else:
+            file = self.__tar.fileobj
+            self.__tar.close()
+        if self.__is_buffer and force and file is not None:
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+
+    def read(self):
+        """
+        parse all members
+
+        :return: list of parsed molecules or reactions
+        """
+        return list(iter(self))
+
+    def __iter__(self):
+        return self._data
+
+    def __next__(self):
+        return next(iter(self))
+
+    def __reader(self):
+        args, kwargs = self.__config
+        for name, reader, stream, member in self.__members():
+            sink = self.errors.spawn()
+            try:
+                with reader(stream, *args, **{**kwargs, **self.__reader_options(reader)}, errors=sink) as f:
+                    self.member = name
+                    yield from f
+            finally:
+                stream.close()
+                member.close()
+                self.__merge_errors(name, reader, sink)
+
+    def __pool_reader(self):
+        """
+        parse members in worker processes. number of members in processing is limited by prefetch window
+        """
+        args, kwargs = self.__config
+        kwargs = {**kwargs, 'errors': self.errors.spawn(), 'stats': None}
+        for name, reader, records, errors in imap(_parse_member, self.__tasks(args, kwargs), self.__workers,
+                                                  self.__ordered, self.__prefetch):
+            self.__merge_errors(name, reader, errors)
+            self.member = name
+            yield from records
+
+    def __tasks(self, args, kwargs):
+        for name, reader, stream, member in self.__members():
+            try:
+                if self.__path is not None:  # workers open zip archive themselves
+                    source = self.__path
+                else:
+                    source = stream.read()
+            finally:
+                stream.close()
+                member.close()
+            yield reader, name, source, args, {**kwargs, **self.__reader_options(reader)}
+
+    def __members(self):
+        """
+        recognized members: name, reader class, decompressed stream and opened member stream
+        """
+        if self.__zip is not None:
+            members = ((x.filename, self.__zip.open(x)) for x in self.__zip.infolist() if not x.is_dir())
+        else:
+            members = ((x.name, self.__tar.extractfile(x)) for x in self.__tar if x.isfile())
+
+        for name, member in members:
+            stream = _decompress(member)
+            reader = _by_extension(name, self.__readers)
+            if reader is None:
+                reader = _detect(stream.peek(_head)[:_head])
+            if reader is None:
+                stream.close()
+                member.close()
+                continue
+            yield name, reader, stream, member
+
+    def __reader_options(self, reader):
+        options = {}
+        for k, v in self.__options.items():
+            if issubclass(reader, k):
+                options.update(v)
+        options.pop('errors', None)  # members sinks are spawned from archive sink
+        if issubclass(reader, (MDLRead, LineRead)):
+            options.setdefault('encoding', self.__encoding)
+        return options
+
+    def __merge_errors(self, name, reader, errors):
+        if errors:
+            entries = [x._replace(index=(name, x.index)) for x in errors.entries]
+            self.errors.merge(errors, entries)
+            sink = None
+            for k, v in self.__options.items():
+                if issubclass(reader, k):
+                    sink = v.get('errors', sink)
+            if sink is not None and sink is not self.errors:
+                sink.merge(errors, entries)
+
+    __zip = __tar = __path = None
+
+
+class _MemberStream(RawIOBase):
+    """
+    not seekable raw view of archive member. members of tar streams fail on seekable check
+    """
+    def __init__(self, member):
+        self.__member = member
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self.__member.readinto(b)
+
+
+def _decompress(member):
+    """
+    buffered stream of member. compressed members are decompressed
+    """
+    stream = BufferedReader(_MemberStream(member))
+    magic = stream.peek(6)[:6]
+    if magic.startswith(b'\x1f\x8b'):
+        return BufferedReader(GzipFile(fileobj=stream))
+    elif magic.startswith(b'BZh'):
+        return BufferedReader(BZ2File(stream))
+    elif magic == b'\xfd7zXZ\x00':
+        return BufferedReader(LZMAFile(stream))
+    return stream
+
+
+def _by_extension(name, readers):
+    """
+    reader class by file extension. gz, bz2 and xz extensions of compressed files are skipped.
+    None for unknown extension
+    """
+    name = basename(name).lower()
+    if name.endswith(('.gz', '.bz2', '.xz')):
+        name = name.rsplit('.', 1)[0]
+    if '.' in name:
+        return readers.get(name.rsplit('.', 1)[-1])
+
+
+def _detect(head):
+    """
+    reader class by first bytes of file. None for not recognized content
+    """
+    head = head.lstrip()
+    if head.startswith((b'$RDFILE', b'$RXN')):
+        return RDFRead
+    elif head.startswith(b'<'):
+        if MRVRead is not None and (b'<cml' in head or b'MChemicalStruct' in head):
+            return MRVRead
+    elif head.startswith(b'InChI='):
+        return INCHIRead
+    elif b'V2000' in head or b'V3000' in head:
+        return SDFRead
+
+
+def _parse_member(reader, name, source, args, kwargs):
+    if isinstance(source, str):  # read member from zip archive on disk
+        with ZipFile(source) as z, z.open(name) as member:
+            stream = _decompress(member)
+            with stream, reader(stream, *args, **kwargs) as f:
+                return name, reader, f.read(), f.errors
+    with reader(BytesIO(source), *args, **kwargs) as f:
+        return name, reader, f.read(), f.errors
+
+
+_head = 4096
+
+
+__all__ = ['ArchiveRead']
@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from asyncio import get_running_loop
+from collections import deque
+from functools import partial
+from importlib.util import find_spec
+from ._errors import ErrorSink
+from ._LINErw import LineRead, _parse_lines
+from ._MDLrw import _parse_chunk as _parse_mdl
+from ._writer import BufferedWrite, _format_chunk
+from .MRVrw import end_tag, _parse_chunk as _parse_mrv
+from .RDFrw import RDFRead
+from .SDFrw import SDFRead
+
+
+if find_spec('lxml'):
+    from .MRVrw import MRVRead
+
+    _readers = (SDFRead, RDFRead, LineRead, MRVRead)
+else:
+    MRVRead = None
+    _readers = (SDFRead, RDFRead, LineRead)
+
+
+class AsyncRead:
+    """
+    asyncio adapter of SDF, RDF, SMILES, INCHI and MRV readers. supports `async for` and `async with`.
+    on initialization accept stream with `readline` and `read` coroutines, e.g. asyncio.StreamReader,
+    and reader class. records are split from stream in event loop and chunks of records are parsed in executor.
+    stream reading is suspended while `prefetch` chunks are in processing or not consumed.
+    reader options are same as for reader class, e.g. filters, remap and ignore. records splitting and metadata
+    are same as in reader class
+    """
+    def __init__(self, stream, reader, *args, chunksize=100, prefetch=2, executor=None, encoding='utf-8',
+                 errors=None, **kwargs):
+        """
+        :param reader: SDFRead, RDFRead, SMILESRead, INCHIRead or MRVRead class
+        :param chunksize: number of records in one chunk passed to executor
+        :param prefetch: number of chunks in processing at the same time
+        :param executor: concurrent.futures executor. by default executor of event loop is used.
+            ProcessPoolExecutor requires picklable reader options
+        :param encoding: encoding of bytes streams. streams of strings are also supported, except MRV
+        :param errors: ErrorSink object collecting records errors. available as `errors` attribute.
+            records indices are numbers of records in stream. offsets are not available
+        """
+        if not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif not isinstance(prefetch, int) or prefetch < 1:
+            raise ValueError('prefetch should be positive integer')
+        elif not isinstance(reader, type) or not issubclass(reader, _readers):
+            raise TypeError('SDFRead, RDFRead, SMILESRead, INCHIRead and MRVRead classes supported')
+        if issubclass(reader, LineRead):
+            self.__header = kwargs.pop('header', None)
+        self.__stream = stream
+        self.__reader = reader
+        self.__config = (args, kwargs)
+        self.__chunksize = chunksize
+        self.__prefetch = prefetch
+        self.__executor = executor
+        self.__encoding = encoding
+        self.errors = ErrorSink() if errors is None else errors
+
+    def __aiter__(self):
+        if self.__data is None:
+            self.__data = self.__iterator()
+        return self.__data
+
+    async def __anext__(self):
+        return await self.__aiter__().__anext__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, _type, value, traceback):
+        await self.close()
+
+    async def read(self):
+        """
+        parse whole stream
+
+        :return: list of parsed molecules or reactions
+        """
+        return [x async for x in self]
+
+    async def close(self):
+        """
+        stop parsing. stream is not closed
+        """
+        if self.__data is not None:
+            await self.__data.aclose()
+
+    async def __iterator(self):
+        loop = get_running_loop()
+        reader = self.__reader
+        args, kwargs = self.__config
+        if issubclass(reader, LineRead):
+            chunks = self.__lines()
+        elif MRVRead is not None and issubclass(reader, MRVRead):
+            chunks = self.__tags()
+        elif issubclass(reader, SDFRead):
+            chunks = self.__sdf()
+        else:
+            chunks = self.__rdf()
+
+        pending = deque()
+        try:
+            async for index, task, chunk in chunks:
+                kw = {**kwargs, 'errors': self.errors.spawn(), 'stats': None}
+                pending.append(loop.run_in_executor(self.__executor, partial(task, reader, *chunk, index, args, kw)))
+                if len(pending) >= self.__prefetch:
+                    for x in self.__result(await pending.popleft()):
+                        yield x
+            while pending:
+                for x in self.__result(await pending.popleft()):
+                    yield x
+        finally:
+            for x in pending:
+                x.cancel()
+
+    def __result(self, result):
+        records, errors = result[:2]  # chunks parsers of MDL and MRV also return size
+        if errors:
+            self.errors.merge(errors)
+        return [x for x in records if x is not None]
+
+    async def __readline(self):
+        line = await self.__stream.readline()
+        if isinstance(line, bytes):
+            line = line.decode(self.__encoding)
+        if line.endswith('\r\n'):
+            line = line[:-2] + '\n'
+        return line
+
+    async def __lines(self):
+        """
+        chunks of lines. header line is parsed same as in LineRead
+        """
+        header = self.__header
+        if header is True:
+            header = (await self.__readline()).split()[1:]
+        else:
+            header = self.__reader._check_header(header)
+
+        index = 0
+        chunksize = self.__chunksize
+        chunk = []
+        while True:
+            line = await self.__readline()
+            if not line:
+                break
+            chunk.append(line)
+            if len(chunk) == chunksize:
+                yield index, _parse_lines, (chunk, header)
+                index += chunksize
+                chunk = []
+        if chunk:
+            yield index, _parse_lines, (chunk, header)
+
+    async def __sdf(self):
+        """
+        chunks of records terminated by $$$$ line. last record can be not terminated
+        """
+        index = count = 0
+        chunksize = self.__chunksize
+        chunk = []
+        while True:
+            line = await self.__readline()
+            if not line:
+                break
+            chunk.append(line)
+            if line.startswith('$$$$'):
+                count += 1
+                if count == chunksize:
+                    yield index, _parse_mdl, (''.join(chunk), '')
+                    index += count
+                    count = 0
+                    chunk = []
+        if chunk:
+            yield index, _parse_mdl, (''.join(chunk), '')
+
+    async def __rdf(self):
+        """
+        chunks of records started with $RFMT or $MFMT lines. RXN and MOL files are passed as single record
+        """
+        line = await self.__readline()
+        if not line.startswith('$RDFILE'):
+            chunk = [line]
+            while line:
+                line = await self.__readline()
+                chunk.append(line)
+            if chunk[0]:
+                yield 0, _parse_mdl, (''.join(chunk), '')
+            return
+
+        header = RDFRead._chunk_header
+        while line and not line.startswith(('$RFMT', '$MFMT')):  # skip file header
+            line = await self.__readline()
+        index = count = 0
+        chunksize = self.__chunksize
+        chunk = []
+        while line:
+            if line.startswith(('$RFMT', '$MFMT')):
+                if count == chunksize:
+                    yield index, _parse_mdl, (''.join(chunk), header)
+                    index += count
+                    count = 0
+                    chunk = []
+                count += 1
+            chunk.append(line)
+            line = await self.__readline()
+        if chunk:
+            yield index, _parse_mdl, (''.join(chunk), header)
+
+    async def __tags(self):
+        """
+        chunks of MChemicalStruct elements. elements are found on bytes level same as in indexable MRVRead
+        """
+        read = self.__stream.read
+        pattern = b'<MChemicalStruct'
+        length = len(pattern)
+        index = 0
+        chunksize = self.__chunksize
+        chunk = []
+        data = b''
+        eof = False
+        while True:
+            start = data.find(pattern)
+            while start != -1 and start + length < len(data) and data[start + length] not in b' \t\r\n/>':
+                start = data.find(pattern, start + 1)  # skip elements with same prefix of name
+            if start == -1 or start + length >= len(data):
+                if eof:
+                    break
+                if start == -1:
+                    data = data[-length:]
+                block = await read(1 << 16)
+                eof = not block
+                data += block
+                continue
+
+            end = end_tag.search(data, start)
+            if end is None and not eof:
+                block = await read(1 << 16)
+                eof = not block
+                data += block
+                continue
+            stop = len(data) if end is None else end.end()
+            chunk.append(data[start:stop])
+            data = data[stop:]
+            if len(chunk) == chunksize:
+                yield index, _parse_mrv, self.__fragments(chunk)
+                index += chunksize
+                chunk = []
+        if chunk:
+            yield index, _parse_mrv, self.__fragments(chunk)
+
+    @staticmethod
+    def __fragments(chunk):
+        offsets = [0]
+        for x in chunk:
+            offsets.append(offsets[-1] + len(x))
+        return b''.join(chunk), offsets
+
+    __data = __header = None
+
+
+class AsyncWrite:
+    """
+    asyncio adapter of text writers. supports `async with`. on initialization accept stream with `write` method
+    and `drain` coroutine, e.g. asyncio.StreamWriter, and writer class. records are formatted by chunks
+    in executor. writing waits for stream drain, thus producer is suspended while transport buffer is full
+    """
+    def __init__(self, stream, writer, chunksize=100, executor=None, encoding='utf-8', **kwargs):
+        """
+        :param writer: SDFWrite, RDFWrite or MRVWrite class
+        :param chunksize: number of records in one chunk formatted in executor
+        :param executor: concurrent.futures executor. by default executor of event loop is used
+        :param encoding: encoding of text. if None, strings are written into stream
+
+        other keyword arguments are formatting options of writer class, e.g. `v3000` of SDFWrite
+        """
+        if not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif not isinstance(writer, type) or not issubclass(writer, BufferedWrite):
+            raise TypeError('SDFWrite, RDFWrite and MRVWrite classes supported')
+        self.__stream = stream
+        self.__writer = writer
+        self.__options = options = {x: kwargs.pop(x[1:]) for x in writer._options if x[1:] in kwargs}
+        if kwargs:
+            raise TypeError(f'unexpected options: {", ".join(kwargs)}')
+        self.__obj = obj = object.__new__(writer)
+        for k, v in options.items():
+            setattr(obj, k, v)
+        self.__chunksize = chunksize
+        self.__executor = executor
+        self.__encoding = encoding
+        self.__chunk = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, _type, value, traceback):
+        await self.close()
+
+    async def write(self, data):
+        """
+        write single record. records are formatted and written by chunks
+        """
+        if self.__closed:
+            raise ValueError('I/O operation on closed writer')
+        self.__chunk.append(data)
+        if len(self.__chunk) == self.__chunksize:
+            await self.__output()
+
+    async def write_many(self, data):
+        """
+        write records in iteration order
+
+        :param data: iterable or asynchronous iterable of records
+        """
+        if hasattr(data, '__aiter__'):
+            async for x in data:
+                await self.write(x)
+        else:
+            for x in data:
+                await self.write(x)
+
+    async def flush(self):
+        """
+        write all buffered records into stream and wait for stream drain
+        """
+        if self.__closed:
+            raise ValueError('I/O operation on closed writer')
+        await self.__output()
+
+    async def close(self):
+        """
+        write buffered records and epilogue. stream is not closed
+        """
+        if self.__closed:
+            return
+        try:
+            await self.__output()
+            epilogue = self.__obj._epilogue()
+            if epilogue:
+                if not self.__started:
+                    self.__started = True
+                    epilogue = self.__obj._prologue() + epilogue
+                await self.__send(epilogue)
+        finally:
+            self.__closed = True
+
+    async def __output(self):
+        chunk, self.__chunk = self.__chunk, []
+        if not chunk:
+            return
+        text = await get_running_loop().run_in_executor(self.__executor, _format_chunk, self.__writer, chunk,
+                                                         self.__options)
+        if not self.__started:
+            self.__started = True
+            text = self.__obj._prologue() + text
+        await self.__send(text)
+
+    async def __send(self, text):
+        self.__stream.write(text if self.__encoding is None else text.encode(self.__encoding))
+        await self.__stream.drain()
+
+    __closed = __started = False
+
+
+__all__ = ['AsyncRead', 'AsyncWrite']
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from json import dump, load
+from os import fsync, fstat, remove, replace, truncate
+from os.path import abspath, exists
+from ._index import Checkpoint
+
+
+class ResumableJob:
+    """
+    driver of long conversions with checkpoints. job consists of one reader and any number of writers of files.
+    every `every` processed records writers are flushed to disk and state file with reader checkpoint and sizes of
+    output files is atomically replaced. on start of job with existing state file reader continues from checkpoint
+    and output files are truncated to checkpoint sizes and continued, thus records processed after last checkpoint
+    are not duplicated. on successful finish state file is removed. support `with` context manager:
+
+    >>> with ResumableJob('job.json') as job:
+    ...     reader = job.reader(RDFRead, 'input.rdf')
+    ...     writer = job.writer(RDFWrite, 'output.rdf')
+    ...     for r in reader:
+    ...         writer.write(r)
+    ...         job.step()
+    """
+    def __init__(self, path, every=10000):
+        """
+        :param path: path of state file
+        :param every: number of records between checkpoints
+        """
+        if not isinstance(every, int) or every < 1:
+            raise ValueError('every should be positive integer')
+        self.__path = str(path)
+        self.__every = every
+        self.__count = 0
+        self.__writers = []
+        if exists(self.__path):
+            with open(self.__path) as f:
+                self.__state = load(f)
+        else:
+            self.__state = None
+
+    @property
+    def resumed(self):
+        """
+        True if job continues from checkpoint
+        """
+        return self.__state is not None
+
+    def reader(self, reader, file, *args, **kwargs):
+        """
+        open reader of job. file is indexed for checkpoints offsets
+
+        :param reader: SDFRead, RDFRead, SMILESRead, INCHIRead or MRVRead class
+        :param file: path to file
+        other arguments are options of reader
+        """
+        if self.__reader is not None:
+            raise ValueError('reader already opened')
+        file = abspath(file)
+        if self.__state is not None:
+            name, index, offset = self.__state['reader']
+            if name != file:
+                raise ValueError(f'checkpoint of other file: {name}')
+            kwargs['resume_from'] = Checkpoint(index, offset)
+        else:
+            kwargs['indexable'] = True
+        self.__reader = reader(file, *args, **kwargs)
+        self.__file = file
+        return self.__reader
+
+    def writer(self, writer, file, *args, encoding=None, **kwargs):
+        """
+        open writer of job. on resuming file is truncated to size saved in checkpoint and opened in append mode
+
+        :param writer: SDFWrite, RDFWrite or MRVWrite class
+        :param file: path to file
+        :param encoding: encoding of file. by default locale encoding is used
+        other arguments are options of writer
+        """
+        file = abspath(file)
+        if self.__state is not None:
+            size = self.__state['writers'].get(file)
+            if size is None:
+                raise ValueError(f'file not found in checkpoint: {file}')
+            truncate(file, size)
+            f = open(file, 'a', encoding=encoding)
+            kwargs['append'] = size > 0
+        else:
+            f = open(file, 'w', encoding=encoding)
+        try:
+            w = writer(f, *args, **kwargs)
+        except Exception:
+            f.close()
+            raise
+        self.__writers.append((file, w, f))
+        return w
+
+    def step(self, records=1):
+        """
+        mark records as processed. checkpoint is committed every `every` records.
+        records should be written into writers before call
+        """
+        self.__count += records
+        if self.__count >= self.__every:
+            self.commit()
+
+    def commit(self):
+        """
+        flush writers and save checkpoint of reader
+        """
+        if self.__reader is None:
+            raise ValueError('reader not opened')
+        sizes = {}
+        for file, w, f in self.__writers:
+            w.flush()
+            fsync(f.fileno())
+            sizes[file] = fstat(f.fileno()).st_size
+
+        index, offset = self.__reader.checkpoint()
+        tmp = f'{self.__path}.tmp'
+        with open(tmp, 'w') as f:
+            dump({'reader': [self.__file, index, offset], 'writers': sizes}, f)
+            f.flush()
+            fsync(f.fileno())
+        replace(tmp, self.__path)
+        self.__count = 0
+
+    def close(self, done=True):
+        """
+        close reader and writers
+
+        :param done: if True: job finished and state file is removed. otherwise job can be resumed from last checkpoint
+        """
+        try:
+            for _, w, f in self.__writers:
+                try:
+                    w.close()
+                finally:
+                    f.close()
+            if self.__reader is not None:
+                self.__reader.close()
+        finally:
+            self.__writers = []
+            self.__reader = None
+        if done and exists(self.__path):
+            remove(self.__path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close(_type is None)
+
+    __reader = __file = None
+
+
+__all__ = ['ResumableJob']
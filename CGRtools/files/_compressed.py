@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from bisect import bisect_right
+from bz2 import BZ2File
+from io import RawIOBase, BufferedReader, BufferedWriter, TextIOWrapper, SEEK_SET, SEEK_CUR, SEEK_END
+from lzma import LZMAFile
+from zlib import decompressobj
+
+
+def open_file(path, binary=False, encoding=None):
+    """
+    open file for reading. gzip, bzip2 and xz compressed files are detected by signature and transparently
+    decompressed. gzip files support fast random access.
+
+    :param path: string path or pathlib.Path object
+    :param binary: open in binary mode
+    :param encoding: encoding of text mode. by default locale encoding is used
+    """
+    path = str(path)
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+
+    if magic.startswith(b'\x1f\x8b'):
+        file = BufferedReader(GzipReader(path))
+    elif magic.startswith(b'BZh'):
+        file = BZ2Reader(path)
+    elif magic == b'\xfd7zXZ\x00':
+        file = XZReader(path)
+    elif binary:
+        return open(path, 'rb')
+    else:
+        return open(path, encoding=encoding)
+    return file if binary else TextIOWrapper(file, encoding=encoding)
+
+
+class StreamWrapper(TextIOWrapper):
+    """
+    text wrapper of externally opened binary stream: BytesIO, buffered or raw file, pipe or `sys.stdin.buffer`.
+    text is decoded and encoded incrementally. raw streams are buffered. `detach` returns original stream
+    without closing, thus readers and writers release external streams by detaching
+    """
+    def __init__(self, file, encoding=None, write=False):
+        if isinstance(file, RawIOBase):
+            self.__raw = True
+            file = BufferedWriter(file) if write else BufferedReader(file)
+        super().__init__(file, encoding=encoding)
+
+    def detach(self):
+        buffer = super().detach()
+        if self.__raw:
+            return buffer.detach()
+        return buffer
+
+    __raw = False
+
+
+class GzipReader(RawIOBase):
+    """
+    gzip file reader with random access. during reading checkpoints of inflate state are saved every `spacing`
+    bytes of decompressed data and at starts of gzip members. seek restores nearest checkpoint and decompresses
+    only data after it. for BGZF (blocked gzip) files checkpoints are collected from blocks headers without
+    decompression.
+    """
+    def __init__(self, path, spacing=1 << 22):
+        self.name = path
+        self.__file = open(path, 'rb')
+        self.__spacing = spacing
+        self.__positions = [0]  # decompressed offsets of checkpoints
+        self.__points = [(0, None)]  # compressed offsets and inflate states. None for gzip member start
+        self.__bgzf = self.__file.read(4) == b'\x1f\x8b\x08\x04'  # FEXTRA flag set
+        self.__restore(0)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.__position
+
+    def close(self):
+        if not self.closed:
+            self.__file.close()
+        super().close()
+
+    def readinto(self, b):
+        if self.__offset == len(self.__buffer) and not self.__fill():
+            return 0
+        n = min(len(b), len(self.__buffer) - self.__offset)
+        b[:n] = self.__buffer[self.__offset:self.__offset + n]
+        self.__offset += n
+        self.__position += n
+        return n
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence == SEEK_CUR:
+            offset += self.__position
+        elif whence == SEEK_END:
+            while True:
+                self.__position += len(self.__buffer) - self.__offset
+                self.__offset = len(self.__buffer)
+                if not self.__fill():
+                    break
+            offset += self.__position
+        elif whence != SEEK_SET:
+            raise ValueError('invalid whence')
+        if offset < 0:
+            raise ValueError('negative seek position')
+
+        if self.__bgzf and offset > self.__positions[-1]:
+            self.__index_bgzf()
+        i = bisect_right(self.__positions, offset) - 1
+        if offset < self.__position or self.__positions[i] > self.__position:
+            self.__restore(i)
+
+        while self.__position < offset:
+            if self.__offset == len(self.__buffer) and not self.__fill():
+                break  # end of file
+            n = min(offset - self.__position, len(self.__buffer) - self.__offset)
+            self.__offset += n
+            self.__position += n
+        return self.__position
+
+    def __restore(self, i):
+        offset, state = self.__points[i]
+        self.__file.seek(offset)
+        self.__inflate = decompressobj(31) if state is None else state.copy()
+        self.__position = self.__positions[i]
+        self.__buffer = b''
+        self.__offset = 0
+
+    def __checkpoint(self, offset, state):
+        position = self.__position  # buffer is empty
+        if state is None:
+            if position > self.__positions[-1]:
+                self.__positions.append(position)
+                self.__points.append((offset, None))
+        elif position >= self.__positions[-1] + self.__spacing:
+            self.__positions.append(position)
+            self.__points.append((offset, state.copy()))
+
+    def __fill(self):
+        """
+        decompress next portion of data into buffer
+        :return: False on end of file
+        """
+        inflate = self.__inflate
+        while True:
+            if inflate.eof:  # start of next gzip member
+                data = inflate.unused_data
+                offset = self.__file.tell() - len(data)
+                if len(data) < 2:
+                    data += self.__file.read(_block)
+                if data[:2] != b'\x1f\x8b':  # end of file or trailing garbage
+                    return False
+                self.__inflate = inflate = decompressobj(31)
+                self.__checkpoint(offset, None)
+            else:
+                self.__checkpoint(self.__file.tell(), inflate)
+                data = self.__file.read(_block)
+                if not data:
+                    raise EOFError('compressed file ended before the end-of-stream marker was reached')
+            data = inflate.decompress(data)
+            if data:
+                self.__buffer = data
+                self.__offset = 0
+                return True
+
+    def __index_bgzf(self):
+        """
+        collect gzip members starts from BGZF blocks headers. uncompressed size of block stored in its last 4 bytes
+        """
+        self.__bgzf = False
+        positions = [0]
+        points = [(0, None)]
+        file = self.__file
+        current = file.tell()
+        offset = position = 0
+        while True:
+            file.seek(offset)
+            header = file.read(18)
+            if len(header) < 18:
+                break
+            elif header[:4] != b'\x1f\x8b\x08\x04' or header[12:14] != b'BC':  # not BGZF block
+                file.seek(current)
+                return
+            offset += int.from_bytes(header[16:18], 'little') + 1
+            file.seek(offset - 4)
+            size = int.from_bytes(file.read(4), 'little')
+            if size:
+                position += size
+                positions.append(position)
+                points.append((offset, None))
+        file.seek(current)
+        self.__positions = positions
+        self.__points = points
+
+
+class BZ2Reader(BZ2File):
+    """
+    bzip2 file reader. seek is emulated by decompression
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self.name = path
+
+
+class XZReader(LZMAFile):
+    """
+    xz file reader. seek is emulated by decompression
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self.name = path
+
+
+_block = 1 << 16
+
+
+__all__ = ['open_file', 'StreamWrapper']
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from glob import glob
+from itertools import accumulate
+from pathlib import Path
+from ._archive import _by_extension, _extensions
+from ._errors import ErrorSink
+from ._index import OffsetsIndex
+from ._LINErw import LineRead
+from ._MDLrw import MDLRead
+from ._pool import imap
+
+
+class DatasetRead:
+    """
+    reader of dataset split into many files (shards). works similar to indexable reader: supported object size
+    and subscription by global record number. support `with` context manager.
+    on initialization accept glob pattern, path or list of paths to SDF, RDF, SMILES, INCHI or MRV files.
+    gzip, bzip2 and xz compressed files are supported.
+
+    byte offsets indexes of shards are built by indexable readers and saved into index files for reuse,
+    thus only first opening of dataset scans files. records errors are collected into `errors` sink with
+    (shard path, record index in shard) indices
+    """
+    def __init__(self, files, *args, reader=None, readers=None, index_dir=None, encoding=None, workers=1,
+                 ordered=True, chunksize=1000, prefetch=None, max_open=8, errors=None, **kwargs):
+        """
+        :param files: glob pattern (recursive `**` supported), path or list of paths. pattern matches are sorted.
+            index files are not matched
+        :param reader: reader class of all shards. by default reader is selected by file extension
+        :param readers: dict of file extensions and reader classes. extends and overrides default mapping:
+            sdf, sd, mol - SDFRead; rdf, rxn - RDFRead; smi, smiles - SMILESRead; inchi - INCHIRead; mrv - MRVRead
+        :param index_dir: directory for index files. if True: index files are stored next to the shards.
+            by default index files are stored in user cache directory
+        :param encoding: encoding of text files. by default locale encoding is used
+        :param workers: number of processes used for shards indexing and records parsing. if greater than 1,
+            then iteration is done by chunks of records of shards parsed in parallel
+        :param ordered: if True: parallel mode returns records in dataset order, otherwise in order of parsing finish
+        :param chunksize: max number of records in one chunk passed to worker. shards are not merged into chunks,
+            thus small shards are parsed whole
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+        :param max_open: number of shards readers kept opened for records access by index
+        :param errors: ErrorSink object collecting records errors. available as `errors` attribute
+
+        other arguments are options of readers, e.g. remap, ignore, filters, trusted or header of SMILES files.
+        for parallel parsing options should be picklable
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        elif not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif not isinstance(max_open, int) or max_open < 1:
+            raise ValueError('max_open should be positive integer')
+
+        if isinstance(files, (str, Path)):
+            # index files stored next to shards with index_dir=True are skipped
+            paths = sorted(x for x in glob(str(files), recursive=True) if not x.endswith('.cgri'))
+        else:
+            paths = [str(x) for x in files]
+        if not paths:
+            raise ValueError('no files found')
+
+        if reader is not None:
+            if not issubclass(reader, OffsetsIndex):
+                raise TypeError('indexable reader class expected')
+            shards = [reader] * len(paths)
+        else:
+            readers = _extensions if readers is None else {**_extensions, **readers}
+            shards = []
+            for path in paths:
+                r = _by_extension(path, readers)
+                if r is None:
+                    raise ValueError(f'unknown type of file: {path}')
+                shards.append(r)
+
+        self.__paths = paths
+        self.__readers = shards
+        self.__index_dir = index_dir
+        self.__encoding = encoding
+        self.__config = (args, kwargs)
+        self.__workers = workers
+        self.__ordered = ordered
+        self.__chunksize = chunksize
+        self.__prefetch = prefetch
+        self.__max_open = max_open
+        self.__opened = OrderedDict()
+        self.errors = ErrorSink() if errors is None else errors
+
+        tasks = ((r, p, index_dir, args, self.__options(r, kwargs)) for r, p in zip(shards, paths))
+        if workers > 1:
+            sizes = imap(_index_shard, tasks, workers)
+        else:
+            sizes = (_index_shard(*x) for x in tasks)
+        self.__bounds = array('Q', [0])
+        self.__bounds.extend(accumulate(sizes))
+
+    @property
+    def shards(self):
+        """
+        paths of shards files in dataset order
+        """
+        return list(self.__paths)
+
+    def locate(self, item):
+        """
+        shard path and record index in shard by global record number
+        """
+        shard, index = self.__locate(item)
+        return self.__paths[shard], index
+
+    def close(self):
+        """
+        close opened shards
+        """
+        if self.__data is not None:
+            self.__data.close()
+            self.__data = None
+        for f in self.__opened.values():
+            f.close()
+        self.__opened.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.__bounds[-1]
+
+    def read(self):
+        """
+        parse whole dataset
+
+        :return: list of parsed molecules or reactions
+        """
+        return list(iter(self))
+
+    def __iter__(self):
+        if self.__data is None:
+            self.__data = self.__pool_reader() if self.__workers > 1 else self.__reader()
+        return self.__data
+
+    def __next__(self):
+        return next(iter(self))
+
+    def __getitem__(self, item):
+        """
+        getting the item by global index. same as for indexable readers, records with errors in slices are skipped
+
+        :param item: int or slice
+        :return: [Molecule, Reaction]Container or list of [Molecule, Reaction]Containers
+        """
+        if isinstance(item, int):
+            shard, index = self.__locate(item)
+            return self.__access(shard, lambda f: f[index])
+        elif isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            records = []
+            if step == 1:
+                bounds = self.__bounds
+                while start < stop:
+                    shard = bisect_right(bounds, start) - 1
+                    end = min(stop, bounds[shard + 1])
+                    if end > start:
+                        s, e = start - bounds[shard], end - bounds[shard]
+                        records.extend(self.__access(shard, lambda f: f[s:e]))
+                    start = end
+            else:
+                for index in range(start, stop, step):
+                    try:
+                        records.append(self[index])
+                    except IndexError:  # record with errors
+                        pass
+            return records
+        raise TypeError('Indices must be integers or slices')
+
+    def __locate(self, item):
+        size = len(self)
+        if item >= size or item < -size:
+            raise IndexError('List index out of range')
+        if item < 0:
+            item += size
+        shard = bisect_right(self.__bounds, item) - 1
+        return shard, item - self.__bounds[shard]
+
+    def __access(self, shard, getter):
+        """
+        call getter with opened indexable reader of shard. least recently used readers are closed
+        """
+        opened = self.__opened
+        f = opened.get(shard)
+        if f is None:
+            if len(opened) >= self.__max_open:
+                opened.popitem(last=False)[1].close()
+            args, kwargs = self.__config
+            reader = self.__readers[shard]
+            f = opened[shard] = reader(self.__paths[shard], *args, indexable=True, index_dir=self.__index_dir,
+                                       errors=self.errors.spawn(), **self.__options(reader, kwargs))
+        else:
+            opened.move_to_end(shard)
+        try:
+            return getter(f)
+        finally:
+            if f.errors:
+                self.__merge_errors(shard, f.errors)
+                f.errors.clear()
+
+    def __reader(self):
+        args, kwargs = self.__config
+        for shard, (reader, path) in enumerate(zip(self.__readers, self.__paths)):
+            if self.__bounds[shard] == self.__bounds[shard + 1]:  # empty shard
+                continue
+            sink = self.errors.spawn()
+            try:
+                with reader(path, *args, errors=sink, **self.__options(reader, kwargs)) as f:
+                    yield from f
+            finally:
+                self.__merge_errors(shard, sink)
+
+    def __pool_reader(self):
+        """
+        parse chunks of records of shards in worker processes. workers seek records by shards indexes
+        """
+        for shard, records, errors in imap(_parse_range, self.__tasks(), self.__workers, self.__ordered,
+                                           self.__prefetch):
+            self.__merge_errors(shard, errors)
+            yield from records
+
+    def __tasks(self):
+        args, kwargs = self.__config
+        bounds = self.__bounds
+        chunksize = self.__chunksize
+        index_dir = self.__index_dir
+        for shard, (reader, path) in enumerate(zip(self.__readers, self.__paths)):
+            kw = {**self.__options(reader, kwargs), 'errors': self.errors.spawn(), 'stats': None}
+            size = bounds[shard + 1] - bounds[shard]
+            for start in range(0, size, chunksize):
+                yield reader, path, shard, start, min(start + chunksize, size), index_dir, args, kw
+
+    def __options(self, reader, kwargs):
+        if issubclass(reader, (MDLRead, LineRead)):
+            return {'encoding': self.__encoding, **kwargs}
+        return kwargs
+
+    def __merge_errors(self, shard, errors):
+        if errors:
+            path = self.__paths[shard]
+            self.errors.merge(errors, [x._replace(index=(path, x.index)) for x in errors.entries])
+
+    __data = None
+
+
+def _index_shard(reader, path, index_dir, args, kwargs):
+    """
+    build or load index of shard
+    :return: number of records
+    """
+    with reader(path, *args, indexable=True, index_dir=index_dir, **kwargs) as f:
+        return len(f)
+
+
+def _parse_range(reader, path, shard, start, stop, index_dir, args, kwargs):
+    with reader(path, *args, indexable=True, index_dir=index_dir, **kwargs) as f:
+        return shard, f[start:stop], f.errors
+
+
+__all__ = ['DatasetRead']
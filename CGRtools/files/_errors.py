@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from collections import Counter, deque, namedtuple
+from logging import warning
+from sys import exc_info
+from traceback import format_exc
+
+
+RecordError = namedtuple('RecordError', ('index', 'offset', 'error', 'message', 'record'))
+
+
+class ErrorSink:
+    """
+    collector of records errors of readers. counts errors by exception class, keeps last errors entries with
+    record index, byte offset and optionally raw record text, and logs first and sampled errors with traceback.
+    entries are `RecordError` tuples of record index in file, offset of record (None if file not indexed),
+    exception class name, exception message and raw record (None if capture disabled or record unavailable)
+    """
+    def __init__(self, capture=False, sample=100, first=10, limit=1000, callback=None):
+        """
+        :param capture: if True: raw text of failed records saved into entries. SDF, RDF and MRV records are
+            available only in indexable or parallel modes
+        :param sample: log every `sample`-th error after first ones. 0 disables sampled logging
+        :param first: number of first errors logged. traceback is formatted only for logged errors
+        :param limit: number of last entries to keep
+        :param callback: callable accepting RecordError entry. called for each error, e.g. for writing of
+            failed records into quarantine file
+        """
+        if not isinstance(sample, int) or sample < 0:
+            raise ValueError('sample should be non-negative integer')
+        elif not isinstance(first, int) or first < 0:
+            raise ValueError('first should be non-negative integer')
+        self.capture = capture
+        self.sample = sample
+        self.first = first
+        self.limit = limit
+        self.callback = callback
+        self.counts = Counter()
+        self.entries = deque(maxlen=limit)
+        self.total = 0
+
+    def __call__(self, index, offset, record, message, error=None):
+        """
+        register error. should be called from except block or with explicitly given exception
+
+        :param message: logged message. traceback of handled exception is appended for not given error
+        """
+        total = self.total
+        log = total < self.first or self.sample and not total % self.sample
+        if error is None:
+            error = exc_info()[1]
+            if log:
+                message = f'{message}:\n{format_exc()}'
+        self.total += 1
+        name = type(error).__name__
+        self.counts[name] += 1
+        if log:
+            warning(message)
+        self.append(RecordError(index, offset, name, str(error), record if self.capture else None))
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def append(self, entry):
+        """
+        save entry without counting
+        """
+        self.entries.append(entry)
+        if self.callback is not None:
+            self.callback(entry)
+
+    def merge(self, other, entries=None):
+        """
+        add counts and entries of other sink, e.g. sink of worker process. errors are not logged again
+
+        :param entries: replacement of other sink entries. for example entries with fixed indices
+        """
+        self.total += other.total
+        self.counts.update(other.counts)
+        for x in other.entries if entries is None else entries:
+            self.append(x)
+
+    def spawn(self):
+        """
+        new empty sink with same capture, sample, first and limit options, but without callback
+        """
+        return type(self)(self.capture, self.sample, self.first, self.limit)
+
+    def clear(self):
+        self.counts.clear()
+        self.entries.clear()
+        self.total = 0
+
+
+__all__ = ['ErrorSink', 'RecordError']
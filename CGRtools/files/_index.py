@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from array import array
+from collections import namedtuple
+from hashlib import blake2b
+from io import FileIO, TextIOBase, UnsupportedOperation
+from itertools import accumulate, count, islice
+from logging import warning
+from mmap import mmap, ACCESS_READ
+from operator import add
+from os import access, environ, makedirs, name as os_name, replace, stat, W_OK
+from os.path import abspath, expanduser, join
+from struct import Struct, error
+from tempfile import gettempdir
+from traceback import format_exc
+
+
+Checkpoint = namedtuple('Checkpoint', ('index', 'offset'))
+
+
+def scan_offsets(file, markers, after=False, eof=False, block=1 << 24):
+    """
+    find offsets of lines started with given markers. works on bytes level without lines decoding.
+    files stored on disk are memory mapped, other streams (including decompressed) are scanned by blocks.
+    position of stream is preserved.
+
+    :param file: seekable binary or text stream. for text wrappers underlying binary buffer is used.
+        for StringIO offsets are characters positions
+    :param markers: tuple of bytes lines prefixes
+    :param after: if True: return offsets of lines next to marked lines
+    :param eof: if True: append offset of the end of stream
+    :param block: size of blocks for streams which can't be memory mapped
+    :return: sorted array of offsets
+    """
+    position = file.tell()
+    stream = getattr(file, 'buffer', file)
+    if isinstance(stream, TextIOBase):
+        markers = tuple(x.decode() for x in markers)
+        nl = '\n'
+    else:
+        nl = b'\n'
+
+    offsets = []
+    try:
+        if not isinstance(getattr(stream, 'raw', stream), FileIO):  # compressed files report fileno of archive
+            raise UnsupportedOperation
+        data = mmap(stream.fileno(), 0, access=ACCESS_READ)
+    except (UnsupportedOperation, ValueError, OSError):  # not a disk file or empty file
+        stream.seek(0)
+        shift = 0
+        tail = nl[:0]
+        while True:
+            data = stream.read(block)
+            if not data:
+                break
+            if tail:
+                data = tail + data
+            end = data.rfind(nl) + 1  # scan only complete lines
+            if end:
+                for marker in markers:
+                    _scan(data, end, shift, marker, nl, after, offsets)
+                tail = data[end:]
+                shift += end
+            else:
+                tail = data
+        if tail:  # last line without newline
+            for marker in markers:
+                _scan(tail, len(tail), shift, marker, nl, after, offsets)
+        size = shift + len(tail)
+    else:
+        with data:
+            size = len(data)
+            for marker in markers:
+                _scan(data, size, 0, marker, nl, after, offsets)
+    file.seek(position)
+
+    if len(markers) > 1:
+        offsets.sort()
+    if eof:
+        offsets.append(size)
+    return array('Q', offsets)
+
+
+def _scan(data, end, shift, marker, nl, after, offsets):
+    """
+    data should start from the beginning of line
+    """
+    find = data.find
+    pattern = nl + marker
+    if data[:len(marker)] == marker:
+        i = -1  # virtual newline before data
+    else:
+        i = find(pattern, 0, end)
+        if i == -1:
+            return
+
+    while True:
+        if after:
+            j = find(nl, i + 1, end) + 1 or end
+            offsets.append(shift + j)
+            i = find(pattern, j - 1, end)
+        else:
+            offsets.append(shift + i + 1)
+            i = find(pattern, i + 1, end)
+        if i == -1:
+            break
+
+
+def scan_lines(file, block=1 << 24):
+    """
+    find offsets of lines starts. works on bytes level without lines decoding. position of stream is preserved.
+
+    :param file: seekable binary or text stream. for text wrappers underlying binary buffer is used.
+        for StringIO offsets are characters positions
+    :param block: size of blocks of stream reading
+    :return: array of offsets. last item is offset of the end of stream
+    """
+    position = file.tell()
+    stream = getattr(file, 'buffer', file)
+    nl = '\n' if isinstance(stream, TextIOBase) else b'\n'
+
+    offsets = array('Q', [0])
+    stream.seek(0)
+    size = 0
+    while True:
+        data = stream.read(block)
+        if not data:
+            break
+        # offset of next line is sum of lengths of previous lines and newlines
+        offsets.extend(map(add, accumulate(map(len, data.split(nl)[:-1])), count(size + 1)))
+        size += len(data)
+    file.seek(position)
+
+    if offsets[-1] != size:  # last line without newline
+        offsets.append(size)
+    return offsets
+
+
+def scan_tags(file, tag, block=1 << 24):
+    """
+    find offsets of XML elements start tags. works on bytes level without document parsing.
+    namespace prefixed tags are not detected. position of stream is preserved.
+
+    :param file: seekable binary stream
+    :param tag: bytes name of element
+    :param block: size of blocks of stream reading
+    :return: array of offsets. last item is offset of the end of stream
+    """
+    position = file.tell()
+    pattern = b'<' + tag
+    length = len(pattern)
+    offsets = array('Q')
+    file.seek(0)
+    shift = 0
+    tail = b''
+    while True:
+        data = file.read(block)
+        if not data:
+            break
+        if tail:
+            data = tail + data
+        end = len(data) - length  # next byte after tag name required for check
+        i = data.find(pattern, 0, end + length)
+        while i != -1 and i < end:
+            if data[i + length] in b' \t\r\n/>':  # skip elements with same prefix of name
+                offsets.append(shift + i)
+            i = data.find(pattern, i + 1, end + length)
+        if end > 0:
+            tail = data[end:]
+            shift += end
+        else:
+            tail = data
+    file.seek(position)
+    offsets.append(shift + len(tail))
+    return offsets
+
+
+class OffsetsIndex:
+    """
+    mixin for readers with records offsets index. supports records access by index, persistent index of
+    files stored on disk and checkpoints of reading. requires `_file`, `_shifts`, `_data`, `_record_index`
+    and `_index_kind` attributes and seek, tell methods
+    """
+    def _load_cache(self):
+        """
+        the method is implemented for the purpose of optimization, byte positions will not be re-read from a file
+        that has already been used. index is checked against file size, modification time and sampled content
+        checksum and is ignored if the file has changed
+        :return: memory mapped byte offsets from existing index file
+        """
+        path = self.__cache_path
+        if path is not None:
+            index = load_index(path, self._file.name, self._index_kind)
+            if index is not None:
+                self.__index_map, shifts = index
+                return shifts
+
+    @property
+    def __cache_path(self):
+        name = getattr(self._file, 'name', None)
+        if not isinstance(name, str):  # buffers and file descriptors not cached
+            return
+        name = abspath(name)
+        directory = self._index_dir
+        if directory is True:
+            return name + '.cgri'
+        elif directory is None:
+            directory = cache_dir()
+        return join(str(directory), blake2b(name.encode(), digest_size=16).hexdigest() + '.cgri')
+
+    def _dump_cache(self, _shifts):
+        """
+        _shifts dumps into user cache directory, index_dir directory or next to the file
+        """
+        path = self.__cache_path
+        if path is not None:
+            try:
+                dump_index(path, self._file.name, self._index_kind, _shifts)
+            except OSError:
+                warning(f'index file {path} not saved:\n{format_exc()}')
+
+    def __getitem__(self, item):
+        """
+        getting the item by index from the original file,
+        if the required record of the file with an error,
+        then only the correct record are returned
+        :param item: int or slice
+        :return: [Molecule, Reaction]Container or list of [Molecule, Reaction]Containers
+        """
+        if self._shifts:
+            _len = len(self._shifts) - 1
+            _current_pos = self.tell()
+
+            if isinstance(item, int):
+                if item >= _len or item < -_len:
+                    raise IndexError('List index out of range')
+                if item < 0:
+                    item += _len
+                self.seek(item)
+                records = next(self._data)
+            elif isinstance(item, slice):
+                start, stop, step = item.indices(_len)
+                if start == stop:
+                    return []
+
+                if step == 1:
+                    self.seek(start)
+                    records = [x for x in islice(self._data, 0, stop - start) if x is not None]
+                else:
+                    records = []
+                    for index in range(start, stop, step):
+                        self.seek(index)
+                        record = next(self._data)
+                        if record:
+                            records.append(record)
+            else:
+                raise TypeError('Indices must be integers or slices')
+
+            self.seek(_current_pos)
+            if records is None:
+                raise IndexError('Data block with requested index contain errors')
+            return records
+        raise self._implement_error
+
+    def checkpoint(self):
+        """
+        position of reading for resuming by `resume_from` option of reader. all records before position are returned
+        or skipped. not available in parallel mode
+
+        :return: Checkpoint of next record index and its byte offset. offset is None for not indexed files
+        """
+        if self._parallel:
+            raise ValueError('checkpoints not available in parallel mode')
+        index = self._record_index + 1
+        if self._shifts is not None and index < len(self._shifts):
+            return Checkpoint(index, self._shifts[index])
+        return Checkpoint(index, None)
+
+    def _resume(self, checkpoint):
+        """
+        seek to checkpoint. offset of checkpoint is checked against index, thus changed files are detected
+
+        :param checkpoint: Checkpoint, (index, offset) pair or record index
+        """
+        if isinstance(checkpoint, int):
+            index, offset = checkpoint, None
+        else:
+            index, offset = checkpoint
+        if self._shifts is None:
+            raise self._implement_error
+        elif not 0 <= index < len(self._shifts) or offset is not None and self._shifts[index] != offset:
+            raise ValueError('checkpoint does not match file')
+        self.seek(index)
+
+    def _read_record(self, index):
+        """
+        raw text of record by index. position of file is preserved
+        """
+        file = self._file
+        start, stop = self._shifts[index], self._shifts[index + 1]
+        buffer = getattr(file, 'buffer', file)
+        position = file.tell()
+        buffer.seek(start)
+        data = buffer.read(stop - start)
+        file.seek(position)
+        return data if isinstance(data, str) else data.decode(getattr(file, 'encoding', None) or 'utf-8')
+
+    def _close_cache(self):
+        """
+        release memory mapped index
+        """
+        if self.__index_map is not None:
+            self._shifts.release()
+            self._shifts = None
+            self.__index_map.close()
+            self.__index_map = None
+
+    _index_dir = __index_map = None
+    _parallel = False
+
+
+def cache_dir():
+    """
+    default directory of index files: `cgrtools` subdirectory of user cache directory.
+    temporary directory is used if cache directory is not writable
+    """
+    if os_name == 'nt':
+        base = environ.get('LOCALAPPDATA') or gettempdir()
+    else:
+        base = environ.get('XDG_CACHE_HOME') or join(expanduser('~'), '.cache')
+    path = join(base, 'cgrtools')
+    try:
+        makedirs(path, exist_ok=True)
+    except OSError:
+        return gettempdir()
+    return path if access(path, W_OK) else gettempdir()
+
+
+def dump_index(path, source, kind, offsets):
+    """
+    write offsets index file. file contains header with source file size, modification time and sampled content
+    checksum. atomically replaces existing index
+
+    :param path: index file path
+    :param source: indexed file path
+    :param kind: 4 bytes index type tag
+    :param offsets: array of offsets
+    """
+    if not isinstance(offsets, array) or offsets.typecode != 'Q':
+        offsets = array('Q', offsets)
+    st = stat(source)
+    header = _header.pack(_magic, kind, _version, st.st_size, st.st_mtime_ns, _checksum(source, st.st_size),
+                          len(offsets))
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(header)
+        offsets.tofile(f)
+    replace(tmp, path)
+
+
+def load_index(path, source, kind):
+    """
+    memory map offsets index file
+
+    :param path: index file path
+    :param source: indexed file path
+    :param kind: 4 bytes index type tag
+    :return: mmap object and offsets memoryview. None if index not found, invalid or outdated
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = mmap(f.fileno(), 0, access=ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # empty files can't be mapped
+        return
+    try:
+        magic, k, version, size, mtime, checksum, count = _header.unpack_from(data)
+    except error:
+        data.close()
+        return
+
+    st = stat(source)
+    # native byteorder used. on other architecture version check fails and index will be rebuilt
+    if magic != _magic or k != kind or version != _version or size != st.st_size or mtime != st.st_mtime_ns or \
+            len(data) != _header.size + count * 8 or checksum != _checksum(source, size):
+        data.close()
+        return
+    return data, memoryview(data)[_header.size:].cast('Q')
+
+
+def _checksum(path, size, samples=16, length=4096):
+    h = blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for i in range(samples):
+            f.seek(size * i // samples)
+            h.update(f.read(length))
+        if size > length:
+            f.seek(size - length)
+            h.update(f.read())
+    return h.digest()
+
+
+_magic = b'CGRINDEX'
+_version = 1
+_header = Struct('=8s4sIQQ16sQ8x')  # 64 bytes aligned
+
+
+__all__ = ['scan_offsets', 'scan_lines', 'scan_tags', 'cache_dir', 'dump_index', 'load_index', 'OffsetsIndex',
+           'Checkpoint']
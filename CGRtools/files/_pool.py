@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
+
+def imap(func, tasks, workers, ordered=True, prefetch=None, executor=ProcessPoolExecutor):
+    """
+    lazy map of function over tasks in pool of workers. number of tasks in processing is limited by prefetch window,
+    thus tasks iterator is consumed on demand
+
+    :param func: picklable function
+    :param tasks: iterable of function arguments tuples
+    :param workers: number of workers
+    :param ordered: if True: results returned in tasks order, otherwise in order of finish
+    :param prefetch: number of tasks in processing at the same time. default is twice the workers count
+    :param executor: executor class. ProcessPoolExecutor or ThreadPoolExecutor
+    :return: generator of results
+    """
+    tasks = iter(tasks)
+    prefetch = prefetch or 2 * workers
+    with executor(workers) as pool:
+        if ordered:
+            pending = deque(pool.submit(func, *x) for x in islice(tasks, prefetch))
+            while pending:
+                done = pending.popleft()
+                pending.extend(pool.submit(func, *x) for x in islice(tasks, 1))
+                yield done.result()
+        else:
+            pending = {pool.submit(func, *x) for x in islice(tasks, prefetch)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.update(pool.submit(func, *x) for x in islice(tasks, len(done)))
+                for x in done:
+                    yield x.result()
+
+
+__all__ = ['imap']
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from collections import defaultdict
+from hashlib import blake2b
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+from ._pool import imap
+from ._writer import BufferedWrite, _formatter
+
+
+class ShardedWrite:
+    """
+    writer of records split into shards files by key. each record is routed into shard by stable hash of key,
+    thus records with equal keys are always written into the same shard in any process and run.
+    every shard has own buffered writer. support `with` context manager:
+
+    >>> with ShardedWrite('out_{:03d}.sdf', SDFWrite, 16) as f:
+    ...     f.write_many(molecules)
+    """
+    def __init__(self, files, writer, shards=None, *args, key=None, workers=1, chunksize=100, prefetch=None,
+                 **kwargs):
+        """
+        :param files: path template formatted by shard number, e.g. 'out_{}.sdf', or list of paths or
+            opened files of shards
+        :param writer: SDFWrite, RDFWrite or MRVWrite class
+        :param shards: number of shards. required for path template
+        :param key: callable returning key of record. by default record itself is key.
+            int keys are used as shard number modulo shards count. molecules, reactions and CGRs keys are hashed
+            by canonical SMILES, e.g. reaction center given by key function. other keys are hashed by string.
+            for parallel formatting key should be picklable
+        :param workers: number of processes used for records formatting and routing in `write_many`
+        :param chunksize: number of records in one chunk passed to worker process
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+
+        other arguments are options of shards writers, e.g. encoding, v3000, background or stats
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        elif not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        elif not issubclass(writer, BufferedWrite):
+            raise TypeError('SDFWrite, RDFWrite or MRVWrite class expected')
+
+        if isinstance(files, (str, Path)):
+            if not isinstance(shards, int) or shards < 1:
+                raise ValueError('shards should be positive integer')
+            files = str(files)
+            if files.format(0) == files:
+                raise ValueError('path template should contain shard number placeholder')
+            files = [files.format(x) for x in range(shards)]
+        else:
+            files = list(files)
+            if shards is None:
+                shards = len(files)
+            elif shards != len(files):
+                raise ValueError('number of files not equal to shards')
+            if not shards:
+                raise ValueError('no files given')
+
+        self.__writers = []
+        try:
+            for file in files:
+                self.__writers.append(writer(file, *args, **kwargs))
+        except Exception:
+            self.close()
+            raise
+        self.__key = key
+        self.__shards = shards
+        self.__workers = workers
+        self.__chunksize = chunksize
+        self.__prefetch = prefetch
+
+    @property
+    def writers(self):
+        """
+        writers of shards in shards order
+        """
+        return list(self.__writers)
+
+    def shard(self, data):
+        """
+        shard number of record
+        """
+        return _route(data if self.__key is None else self.__key(data), self.__shards)
+
+    def write(self, data):
+        """
+        write single record into its shard
+        """
+        self.__writers[self.shard(data)].write(data)
+
+    def write_many(self, data):
+        """
+        write records into shards. order of records in each shard is the same as in data.
+        with workers records are formatted and routed in worker processes by chunks, otherwise text of chunk
+        is formatted in current thread and written into each shard by one call.
+        records of chunk with invalid record are not written
+
+        :param data: iterable of records
+        """
+        data = iter(data)
+        chunksize = self.__chunksize
+        chunks = iter(lambda: list(islice(data, chunksize)), [])
+        writers = self.__writers
+        if self.__workers == 1:
+            for chunk in chunks:
+                texts = defaultdict(list)
+                for x in chunk:
+                    shard = self.shard(x)
+                    texts[shard].append(writers[shard]._format(x))
+                for shard, text in texts.items():
+                    writers[shard]._write_text(''.join(text), len(text))
+        else:
+            writer = writers[0]
+            options = writer._get_options()
+            tasks = ((type(writer), x, options, self.__key, self.__shards) for x in chunks)
+            stats = {id(x.stats): x.stats for x in writers if x.stats is not None}
+
+            start = perf_counter()
+            for texts in imap(_format_shards, tasks, self.__workers, True, self.__prefetch):
+                for s in stats.values():  # waiting of workers
+                    s.timings['format'] += perf_counter() - start
+                for shard, (text, records) in texts.items():
+                    writers[shard]._write_text(text, records)
+                start = perf_counter()
+
+    def flush(self):
+        """
+        write all buffered records of shards into files
+        """
+        for w in self.__writers:
+            w.flush()
+
+    def close(self, force=False):
+        """
+        close writers of shards
+
+        :param force: force closing of externally opened files
+        """
+        error = None
+        for w in self.__writers:
+            try:
+                w.close(force)
+            except Exception as e:  # other shards should be closed anyway
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.__shards
+
+
+def _route(key, shards):
+    """
+    stable shard number of key. python hash of strings is randomized per process, thus not used
+    """
+    if isinstance(key, int):
+        return key % shards
+    elif isinstance(key, str):
+        key = key.encode()
+    elif not isinstance(key, bytes):
+        key = bytes(key) if hasattr(key, '__bytes__') else str(key).encode()  # containers give SMILES digest
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), 'big') % shards
+
+
+def _format_shards(writer, chunk, options, key, shards):
+    """
+    format records of chunk grouped by shards
+    :return: dict of shard number and pair of text and records count
+    """
+    obj = _formatter(writer, options)
+    texts = defaultdict(list)
+    for x in chunk:
+        texts[_route(x if key is None else key(x), shards)].append(obj._format(x))
+    return {k: (''.join(v), len(v)) for k, v in texts.items()}
+
+
+__all__ = ['ShardedWrite']
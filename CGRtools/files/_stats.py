@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from collections import defaultdict
+from time import perf_counter
+
+
+class IOStats:
+    """
+    throughput and timings counters of readers and writers. collected only by readers and writers given
+    this object in `stats` option, otherwise instrumentation is not installed. one object can be shared
+    by many readers or writers.
+
+    counters: `records` - number of returned or written records, `errors` - number of records errors of readers,
+    `bytes` - size in bytes of encoded lines of records read by SDF, RDF, SMILES and INCHI readers or text written
+    by writers. text streams without encoding are counted in utf-8. MRV readers count bytes by position of
+    buffered stream, thus counts advance by read-ahead blocks and are not counted for not seekable streams.
+    parallel readers count bytes of chunks parsed by workers.
+    `timings` - cumulative seconds of stages. stages of readers: `io` - reading, decoding and splitting of lines
+    of text files, `parse` - records parsing and filtering (includes io for MRV files),
+    `convert` - containers construction. stages of writers: `format` - formatting of records text,
+    `write` - writing of text into file or queue of background writer.
+    in parallel mode workers are not instrumented and waiting time of results is counted as `parse` or `format`
+    """
+    def __init__(self, every=1000, callback=None):
+        """
+        :param every: number of records between callback calls
+        :param callback: callable accepting IOStats object. called every `every` records, at the end of reading
+            and on closing of writer. e.g. for exporting of `snapshot` into monitoring system
+        """
+        if not isinstance(every, int) or every < 1:
+            raise ValueError('every should be positive integer')
+        self.every = every
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        """
+        reset counters and start time
+        """
+        self.records = self.errors = self.bytes = 0
+        self.timings = defaultdict(float)
+        self.started = perf_counter()
+        self.__next = self.every
+
+    @property
+    def elapsed(self):
+        """
+        seconds from creation or reset
+        """
+        return perf_counter() - self.started
+
+    @property
+    def records_per_second(self):
+        elapsed = self.elapsed
+        return self.records / elapsed if elapsed else 0.
+
+    @property
+    def bytes_per_second(self):
+        elapsed = self.elapsed
+        return self.bytes / elapsed if elapsed else 0.
+
+    def snapshot(self):
+        """
+        dict of counters, rates and timings
+        """
+        elapsed = self.elapsed
+        return {'records': self.records, 'errors': self.errors, 'bytes': self.bytes, 'elapsed': elapsed,
+                'records_per_second': self.records / elapsed if elapsed else 0.,
+                'bytes_per_second': self.bytes / elapsed if elapsed else 0., 'timings': dict(self.timings)}
+
+    def count(self, records=1, size=0, errors=0):
+        """
+        add processed records. callback is called if `every` records collected from previous call
+        """
+        self.records += records
+        self.bytes += size
+        self.errors += errors
+        if self.records >= self.__next:
+            self.__next = self.records + self.every
+            if self.callback is not None:
+                self.callback(self)
+
+    def finish(self):
+        """
+        call callback with final counters
+        """
+        if self.callback is not None:
+            self.callback(self)
+
+    def __repr__(self):
+        timings = ', '.join(f'{k}={v:.3f}s' for k, v in self.timings.items())
+        return f'{type(self).__name__}(records={self.records}, errors={self.errors}, bytes={self.bytes}, ' \
+            f'{self.records_per_second:.1f} records/s, {timings})'
+
+
+def _encoded_size(text, encoding):
+    """
+    size of text in bytes. ascii text is not encoded
+    """
+    return len(text) if text.isascii() else len(text.encode(encoding, 'replace'))
+
+
+def _encoding(file):
+    """
+    encoding of text file. utf-8 for StringIO
+    """
+    return getattr(file, 'encoding', None) or 'utf-8'
+
+
+__all__ = ['IOStats']
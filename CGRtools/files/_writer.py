@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from collections import deque
+from itertools import islice
+from queue import Queue
+from sys import modules
+from threading import Thread
+from time import perf_counter
+from ._compressed import StreamWrapper
+from ._pool import imap
+from ._stats import _encoded_size, _encoding
+
+
+class WriterThread(Thread):
+    """
+    background writer. strings from queue are joined into chunks of `buffer_size` characters and written into file.
+    file errors are stored and raised in producer thread on next put, flush or close call
+    """
+    def __init__(self, file, buffer_size, queue_size=1024):
+        super().__init__(daemon=True)
+        self.__file = file
+        self.__buffer_size = buffer_size
+        self.__queue = Queue(queue_size)
+        self.__error = None
+        self.start()
+
+    def run(self):
+        file = self.__file
+        queue = self.__queue
+        buffer_size = self.__buffer_size
+        buffer = []
+        size = 0
+        while True:
+            data = queue.get()
+            if self.__error is None:  # otherwise file is broken and data dropped
+                if isinstance(data, str):
+                    buffer.append(data)
+                    size += len(data)
+                try:
+                    if size >= buffer_size or data is None or data is _flush:
+                        if buffer:
+                            file.write(''.join(buffer))
+                            buffer = []
+                            size = 0
+                        if data is _flush:
+                            file.flush()
+                except Exception as e:
+                    self.__error = e
+            queue.task_done()
+            if data is None:
+                break
+
+    def put(self, data):
+        """
+        put string into writing queue. blocks only if queue is full
+        """
+        self.__check()
+        self.__queue.put(data)
+
+    def flush(self):
+        """
+        write all queued strings into file and flush it. blocks until done
+        """
+        self.__queue.put(_flush)
+        self.__queue.join()
+        self.__check()
+
+    def close(self):
+        """
+        write all queued strings into file and stop thread
+        """
+        self.__queue.put(None)
+        self.join()
+        self.__check()
+
+    def __check(self):
+        if self.__error is not None:
+            raise self.__error
+
+
+class BufferedWrite:
+    """
+    mixin for text writers. subclasses implement `_format` method returning text of record and can implement
+    `_prologue` and `_epilogue` methods returning text written before first record and on closing.
+    requires `_file` and `_is_buffer` attributes. names of attributes used by `_format` are listed in `_options`,
+    thus records can be formatted by writer object created without file, e.g. in worker process
+    """
+    def __init__(self, background=False, workers=1, chunksize=100, prefetch=None, buffer_size=1 << 20,
+                 append=False, stats=None):
+        """
+        :param background: if True: records text is written into file by background thread, thus producer doesn't
+            wait for disk. file errors are raised on next write, flush or close call
+        :param workers: number of processes used for records formatting in `write_many`
+        :param chunksize: number of records in one chunk passed to worker process
+        :param prefetch: number of chunks in processing at the same time. default is twice the workers count
+        :param buffer_size: size in characters of text chunks written by background thread
+        :param append: if True: prologue is not written. used for continuation of previously written file
+            opened in append mode, e.g. on resuming of interrupted job
+        :param stats: IOStats object collecting written records and characters counts and stages timings.
+            available as `stats` attribute of writer. by default writer is not instrumented
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers should be positive integer')
+        elif not isinstance(chunksize, int) or chunksize < 1:
+            raise ValueError('chunksize should be positive integer')
+        self.__workers = workers
+        self.__chunksize = chunksize
+        self.__prefetch = prefetch
+        self.__started = append
+        self.stats = stats
+        if stats is not None:  # instance attributes override methods only in instrumented writers
+            self._format = self.__timed_format
+            self.__output = self.__timed_output
+        if background:
+            self.__thread = WriterThread(self._file, buffer_size)
+
+    def close(self, force=False):
+        """
+        close opened file
+
+        :param force: force closing of externally opened file or buffer
+        """
+        try:
+            if not self.__closed:
+                try:
+                    epilogue = self._epilogue()
+                    if epilogue:
+                        self.__output(epilogue)
+                finally:
+                    self.__closed = True
+                    thread, self.__thread = self.__thread, None
+                    if thread is not None:
+                        thread.close()
+                    if self.stats is not None:
+                        self.stats.finish()
+        finally:
+            if not self._is_buffer or force:
+                self._file.close()
+            elif isinstance(self._file, StreamWrapper):
+                self._file.detach()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        self.close()
+
+    def write(self, data):
+        """
+        write single record into file
+        """
+        self.__output(self._format(data), 1)
+
+    def write_many(self, data):
+        """
+        write records into file in iteration order. with workers records are formatted in worker processes
+        by chunks, otherwise text of chunks is formatted in current thread and written by one call.
+        records of chunk with invalid record are not written
+
+        :param data: iterable of records
+        """
+        data = iter(data)
+        chunksize = self.__chunksize
+        chunks = iter(lambda: list(islice(data, chunksize)), [])
+        if self.__workers == 1:
+            for chunk in chunks:
+                self.__output(''.join(self._format(x) for x in chunk), len(chunk))
+        else:
+            writer = getattr(modules[type(self).__module__], type(self).__name__)
+            options = self._get_options()
+            sizes = deque()  # records counts of chunks in processing
+
+            def tasks():
+                for x in chunks:
+                    sizes.append(len(x))
+                    yield writer, x, options
+
+            start = perf_counter()
+            for text in imap(_format_chunk, tasks(), self.__workers, True, self.__prefetch):
+                if self.stats is not None:  # waiting of workers
+                    self.stats.timings['format'] += perf_counter() - start
+                self.__output(text, sizes.popleft())
+                start = perf_counter()
+
+    def flush(self):
+        """
+        write all buffered records into file. in background mode waits until writer thread done all queued records
+        """
+        if self.__closed:
+            raise ValueError('I/O operation on closed writer')
+        if self.__thread is not None:
+            self.__thread.flush()
+        else:
+            self._file.flush()
+
+    def _write_text(self, text, records=0):
+        """
+        write already formatted text of records, e.g. formatted in worker process
+        """
+        self.__output(text, records)
+
+    def __output(self, text, records=0):
+        if self.__closed:
+            raise ValueError('I/O operation on closed writer')
+        if not self.__started:
+            self.__started = True
+            text = self._prologue() + text
+        if self.__thread is not None:
+            self.__thread.put(text)
+        else:
+            self._file.write(text)
+
+    def __timed_output(self, text, records=0):
+        start = perf_counter()
+        BufferedWrite.__output(self, text)
+        self.stats.timings['write'] += perf_counter() - start
+        self.stats.count(records, _encoded_size(text, _encoding(self._file)))
+
+    def __timed_format(self, data):
+        start = perf_counter()
+        try:
+            return type(self)._format(self, data)
+        finally:
+            self.stats.timings['format'] += perf_counter() - start
+
+    def _get_options(self):
+        """
+        formatting options of writer
+        """
+        return {x: getattr(self, x) for x in self._options}
+
+    def _format(self, data):
+        raise NotImplementedError
+
+    def _prologue(self):
+        return ''
+
+    def _epilogue(self):
+        return ''
+
+    _options = ()
+    stats = __thread = None
+    __closed = __started = False
+
+
+def _format_chunk(writer, chunk, options=None):
+    obj = _formatter(writer, options)
+    return ''.join(obj._format(x) for x in chunk)
+
+
+def _formatter(writer, options=None):
+    """
+    writer object without file for records formatting
+    """
+    obj = object.__new__(writer)
+    if options:
+        for k, v in options.items():
+            setattr(obj, k, v)
+    return obj
+
+
+_flush = object()  # flush command of writer thread
+
+
+__all__ = ['BufferedWrite']
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+"""
+loading time and size of SDF, pickle and CGRB (CGRtools binary) files with the same molecules.
+
+usage: python benchmarks/cgrb_load.py [file.sdf]
+
+without arguments test/stereo.sdf copied 10 times is used.
+"""
+from logging import disable, CRITICAL
+from pathlib import Path
+from pickle import dump, load
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from CGRtools.files import SDFRead, SDFWrite, CGRBRead, CGRBWrite
+
+
+def main():
+    disable(CRITICAL)  # skip invalid records warnings
+    source = argv[1] if len(argv) > 1 else Path(__file__).parent.parent / 'test' / 'stereo.sdf'
+    with SDFRead(source) as f:
+        data = f.read()
+    if len(argv) == 1:
+        data = [x.copy() for _ in range(10) for x in data]  # pickle memoizes repeated objects
+
+    with TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        with SDFWrite(tmp / 'data.sdf') as f:
+            for x in data:
+                f.write(x)
+        with CGRBWrite(tmp / 'data.cgrb') as f:
+            for x in data:
+                f.write(x)
+        with (tmp / 'data.pickle').open('wb') as f:
+            dump(data, f, -1)
+
+        for name, loader in (('sdf', lambda x: SDFRead(x).read()), ('pickle', lambda x: load(x.open('rb'))),
+                             ('cgrb', lambda x: CGRBRead(x).read())):
+            path = tmp / f'data.{name}'
+            start = perf_counter()
+            count = len(loader(path))
+            time = perf_counter() - start
+            print(f'{name:>6}: {count} records, {path.stat().st_size / 1024:.0f} KiB, {time:.2f} s, '
+                  f'{count / time:.0f} records/s')
+
+
+if __name__ == '__main__':
+    main()
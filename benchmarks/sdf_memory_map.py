@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+"""
+SDFRead text mode vs memory mapped bytes mode records/second benchmark.
+
+usage: python benchmarks/sdf_memory_map.py [file.sdf]
+
+without arguments test/stereo.sdf copied 20 times is used.
+"""
+from logging import disable, CRITICAL
+from pathlib import Path
+from sys import argv
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+from CGRtools.files import SDFRead
+
+
+def bench(path, **kwargs):
+    start = perf_counter()
+    with SDFRead(path, **kwargs) as f:
+        count = sum(1 for _ in f)
+    return count, perf_counter() - start
+
+
+def main():
+    disable(CRITICAL)  # skip invalid records warnings
+    if len(argv) > 1:
+        path = argv[1]
+    else:
+        data = (Path(__file__).parent.parent / 'test' / 'stereo.sdf').read_bytes()
+        with NamedTemporaryFile('wb', suffix='.sdf', delete=False) as f:
+            for _ in range(20):
+                f.write(data)
+        path = f.name
+
+    for name, kwargs in (('text', {}), ('memory map', {'memory_map': True})):
+        count, time = bench(path, **kwargs)
+        print(f'{name:>10}: {count} records, {time:.2f} s, {count / time:.0f} records/s')
+
+    if len(argv) == 1:
+        Path(path).unlink()
+
+
+if __name__ == '__main__':
+    main()
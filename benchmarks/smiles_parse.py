@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+"""
+SMILES parsing speed: lexing and tokens parsing alone and full parsing with containers building.
+
+usage: python benchmarks/smiles_parse.py [file.smi]
+
+without arguments test/smiles.txt with some drug-like molecules repeated up to 20000 lines is used.
+"""
+from itertools import islice, cycle
+from logging import disable, CRITICAL
+from pathlib import Path
+from sys import argv
+from time import perf_counter
+from CGRtools.files import SMILESRead
+
+
+drugs = ['CC(=O)Oc1ccccc1C(=O)O', 'CN1C=NC2=C1C(=O)N(C(=O)N2C)C', 'C[C@H](N)C(=O)O', 'OC[C@H]1OC(O)[C@H](O)[C@@H]1O',
+         'CC(C)Cc1ccc(cc1)[C@@H](C)C(=O)O', 'c1ccc2c(c1)[nH]c1ccccc12', 'O=C(O)C[N+](C)(C)C.[Cl-]',
+         'CC(=O)Nc1ccc(O)cc1', 'CCN(CC)CC(=O)Nc1c(C)cccc1C', 'C1CCC(CC1)NC(=O)N']
+
+
+def main():
+    disable(CRITICAL)  # skip invalid records warnings
+    if len(argv) > 1:
+        with open(argv[1]) as f:
+            lines = [x for x in f]
+    else:
+        with (Path(__file__).parent.parent / 'test' / 'smiles.txt').open() as f:
+            lines = list(islice(cycle([x for x in f] + drugs * 5), 20000))
+    smiles = [x.split()[0] for x in lines if x.strip()]
+
+    parser = SMILESRead.create_parser(ignore=True)
+    tokenize = SMILESRead._tokenize
+    parse = parser.__self__._parse_tokens
+
+    start = perf_counter()
+    for x in smiles:
+        try:
+            tokenize(x)
+        except ValueError:
+            pass
+    time = perf_counter() - start
+    print(f'  lexer: {len(smiles) / time:.0f} SMILES/s')
+
+    start = perf_counter()
+    for x in smiles:
+        try:
+            parse(tokenize(x))
+        except ValueError:
+            pass
+    time = perf_counter() - start
+    print(f' tokens: {len(smiles) / time:.0f} SMILES/s')
+
+    start = perf_counter()
+    count = sum(parser(x) is not None for x in lines)
+    time = perf_counter() - start
+    print(f'   full: {len(lines) / time:.0f} SMILES/s, {count} of {len(lines)} parsed')
+
+
+if __name__ == '__main__':
+    main()
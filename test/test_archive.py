@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from gzip import compress
+from io import BytesIO, RawIOBase
+from pathlib import Path
+from tarfile import open as tar_open, TarInfo
+from zipfile import ZipFile
+from pytest import fixture
+from CGRtools.files import ArchiveRead, ErrorSink, RDFRead, SDFRead, SMILESRead
+
+
+data = Path(__file__).parent
+members = (('a/stereo.sdf', 'stereo.sdf', SDFRead), ('b.rdf', 'standardize.rdf', RDFRead),
+           ('c.smi', 'smiles.txt', SMILESRead), ('d.sdf.gz', 'cycle.sdf', SDFRead),
+           ('noext', 'spheroids.sdf', SDFRead))
+
+
+def dump(records):
+    return [(str(x), dict(x.meta)) for x in records]
+
+
+def content(name, file):
+    raw = (data / file).read_bytes()
+    return compress(raw) if name.endswith('.gz') else raw
+
+
+@fixture(scope='module')
+def expected():
+    out = []
+    for name, file, reader in members:
+        with reader(data / file) as f:
+            out.extend(dump(f))
+    return out
+
+
+@fixture
+def zip_path(tmp_path):
+    path = tmp_path / 'data.zip'
+    with ZipFile(path, 'w') as z:
+        for name, file, _ in members:
+            z.writestr(name, content(name, file))
+        z.writestr('readme', b'not a structures file')
+    return path
+
+
+@fixture
+def tar_path(tmp_path):
+    path = tmp_path / 'data.tar.gz'
+    with tar_open(path, 'w:gz') as t:
+        for name, file, _ in members:
+            raw = content(name, file)
+            info = TarInfo(name)
+            info.size = len(raw)
+            t.addfile(info, BytesIO(raw))
+    return path
+
+
+class Pipe(RawIOBase):
+    def __init__(self, data):
+        self.__data = BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self.__data.readinto(b)
+
+
+def test_zip(zip_path, expected):
+    with ArchiveRead(zip_path) as f:
+        assert dump(f) == expected
+        assert f.member == 'noext'
+
+
+def test_tar(tar_path, expected):
+    with ArchiveRead(tar_path) as f:
+        assert dump(f) == expected
+
+
+def test_tar_stream(tar_path, expected):
+    with ArchiveRead(Pipe(tar_path.read_bytes())) as f:
+        assert dump(f) == expected
+
+
+def test_parallel(zip_path, tar_path, expected):
+    with ArchiveRead(zip_path, workers=2) as f:
+        assert dump(f) == expected
+    with ArchiveRead(tar_path, workers=2) as f:
+        assert dump(f) == expected
+
+
+def test_errors(zip_path):
+    with ArchiveRead(zip_path) as f:
+        f.read()
+        assert {x.index[0] for x in f.errors} == {'a/stereo.sdf', 'c.smi'}
+
+
+def test_options_errors(zip_path):
+    for workers in (1, 2):
+        sink = ErrorSink()
+        with ArchiveRead(zip_path, options={SMILESRead: {'errors': sink}}, workers=workers) as f:
+            f.read()
+            assert len(f.errors) > len(sink) > 0
+            assert {x.index[0] for x in sink} == {'c.smi'}
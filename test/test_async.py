@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from asyncio import gather, run, sleep, StreamReader
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO, StringIO
+from pathlib import Path
+from pytest import mark
+from CGRtools.files import AsyncRead, AsyncWrite, MRVRead, MRVWrite, RDFRead, RDFWrite, SDFRead, SDFWrite, SMILESRead
+
+
+data = Path(__file__).parent
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+def serial(reader, file):
+    with reader(data / file) as f:
+        return dump(f)
+
+
+async def feed(stream, raw):
+    for i in range(0, len(raw), 1000):
+        stream.feed_data(raw[i:i + 1000])
+        await sleep(0)
+    stream.feed_eof()
+
+
+async def parse(reader, raw, **kwargs):
+    stream = StreamReader()
+    async with AsyncRead(stream, reader, **kwargs) as f:
+        _, records = await gather(feed(stream, raw), f.read())
+    return dump(records), f.errors
+
+
+class Writer:
+    """
+    stream with asyncio.StreamWriter interface
+    """
+    def __init__(self):
+        self.data = BytesIO()
+        self.drains = 0
+
+    def write(self, data):
+        self.data.write(data)
+
+    async def drain(self):
+        self.drains += 1
+
+
+@mark.parametrize('reader, file, errors', ((SDFRead, 'stereo.sdf', 2), (RDFRead, 'standardize.rdf', 0),
+                                           (RDFRead, 'colored_v3000.rxn', 0), (SMILESRead, 'smiles.txt', 1)))
+def test_read(reader, file, errors):
+    records, sink = run(parse(reader, (data / file).read_bytes(), chunksize=7))
+    assert records == serial(reader, file)
+    assert len(sink) == errors
+
+
+def test_read_mrv():
+    text = StringIO()
+    with SDFRead(data / 'stereo.sdf') as f, MRVWrite(text) as w:
+        for x in f:
+            w.write(x)
+    with MRVRead(BytesIO(text.getvalue().encode())) as f:
+        expected = dump(f)
+    records, _ = run(parse(MRVRead, text.getvalue().encode(), chunksize=13))
+    assert records == expected
+
+
+def test_process_executor():
+    with ProcessPoolExecutor(2) as executor:
+        records, sink = run(parse(SDFRead, (data / 'stereo.sdf').read_bytes(), executor=executor, chunksize=50))
+    assert records == serial(SDFRead, 'stereo.sdf')
+    assert [x.index for x in sink] == [177, 179]
+
+
+@mark.parametrize('writer, reader, source, file', ((SDFWrite, SDFRead, SDFRead, 'stereo.sdf'),
+                                                   (RDFWrite, RDFRead, RDFRead, 'standardize.rdf'),
+                                                   (MRVWrite, MRVRead, SDFRead, 'stereo.sdf')))
+def test_write(writer, reader, source, file):
+    with source(data / file) as f:
+        records = f.read()
+
+    async def write():
+        async with AsyncWrite(stream, writer, chunksize=40) as f:
+            await f.write(records[0])
+            await f.write_many(records[1:])
+
+    stream = Writer()
+    run(write())
+    assert stream.drains >= len(records) // 40 + 1  # drain per chunk
+    text = BytesIO()
+    with writer(text) as f:
+        for x in records:
+            f.write(x)
+    text.seek(0)
+    stream.data.seek(0)
+    with reader(stream.data) as f, reader(text) as expected:
+        assert dump(f) == dump(expected)
+    if writer is not RDFWrite:  # RDF header contains date
+        assert stream.data.getvalue() == text.getvalue()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from pickle import dumps, loads
+from subprocess import run
+from sys import executable
+from pytest import fixture, mark, raises
+from CGRtools.files import CGRBRead, CGRBWrite, RDFRead, SDFRead
+from CGRtools.files import CGRBrw
+
+
+data = Path(__file__).parent
+
+
+def dump(x):
+    if hasattr(x, 'reactants'):
+        return str(x), dict(x.meta), x.name, [dump(m) for m in (*x.reactants, *x.products, *x.reagents)]
+    return (str(x), dict(x.meta), x.name, dict(x._plane), dict(x._charges), dict(x._radicals),
+            dict(x._atoms_stereo), x._conformers, dict(x._parsed_mapping))
+
+
+@fixture(scope='module')
+def records():
+    with SDFRead(data / 'stereo.sdf') as f:
+        out = f.read()
+    with SDFRead(data / 'spheroids.sdf') as f:
+        out.extend(f)
+    with RDFRead(data / 'standardize.rdf') as f:
+        out.extend(f)
+    return out
+
+
+def pack(records):
+    buffer = BytesIO()
+    with CGRBWrite(buffer) as f:
+        for x in records:
+            f.write(x)
+    return buffer
+
+
+def test_round_trip(records, tmp_path):
+    path = tmp_path / 'data.cgrb'
+    with CGRBWrite(path) as f:
+        for x in records:
+            f.write(x)
+    for source in (path, pack(records), memoryview(pack(records).getvalue())):
+        with CGRBRead(source) as f:
+            assert len(f) == len(records)
+            assert [dump(x) for x in f] == [dump(x) for x in records]
+
+
+def test_access(records):
+    with CGRBRead(pack(records)) as f:
+        assert dump(f[10]) == dump(records[10])
+        assert dump(f[-1]) == dump(records[-1])
+        assert [dump(x) for x in f[5:50:3]] == [dump(x) for x in records[5:50:3]]
+        f.seek(100)
+        assert f.tell() == 100
+        assert dump(next(f)) == dump(records[100])
+        with raises(IndexError):
+            f[len(records)]
+
+
+def test_invalid():
+    with raises(ValueError):
+        CGRBRead(BytesIO(b'not a cgrb file' * 10))
+    buffer = pack([])
+    truncated = BytesIO(buffer.getvalue()[:-1])
+    with raises(ValueError):
+        CGRBRead(truncated)
+
+
+def titles(reader):
+    return [str(x) for x in reader]
+
+
+shm = mark.skipif('SharedMemoryRead' not in CGRBrw.__all__, reason='shared memory not available')
+
+
+@shm
+def test_shared_memory(records):
+    reader = CGRBrw.SharedMemoryRead.create(records[:50])
+    try:
+        assert [dump(x) for x in reader] == [dump(x) for x in records[:50]]
+        copy = loads(dumps(reader))
+        assert dump(copy[7]) == dump(records[7])
+        copy.close()
+        with ProcessPoolExecutor(2) as pool:
+            assert pool.submit(titles, reader).result() == [str(x) for x in records[:50]]
+    finally:
+        reader.close()
+        reader.unlink()
+
+
+@shm
+def test_shared_memory_untracked(records):
+    """
+    block attached by unrelated process is not removed on its exit
+    """
+    reader = CGRBrw.SharedMemoryRead.create(records[:5])
+    try:
+        code = f'from CGRtools.files import SharedMemoryRead; print(len(SharedMemoryRead({reader.name!r})))'
+        out = run([executable, '-c', code], capture_output=True, text=True, cwd=data.parent)
+        assert out.stdout.strip() == '5'
+        assert 'leaked' not in out.stderr
+        with CGRBrw.SharedMemoryRead(reader.name) as f:
+            assert len(f) == 5
+    finally:
+        reader.close()
+        reader.unlink()
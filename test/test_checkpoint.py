@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from pathlib import Path
+from subprocess import run
+from sys import executable
+from pytest import mark, raises
+from CGRtools.files import MRVWrite, RDFRead, RDFWrite, ResumableJob, SDFRead, SDFWrite
+
+
+data = Path(__file__).parent
+
+
+class Crash(Exception):
+    pass
+
+
+def convert(tmp_path, writer, crash=None, every=25):
+    """
+    convert stereo.sdf into file of writer and SDF of molecules with stereo. crash after given number of records
+    """
+    with ResumableJob(tmp_path / 'job.json', every=every) as job:
+        reader = job.reader(SDFRead, data / 'stereo.sdf', index_dir=tmp_path)
+        out = job.writer(writer, tmp_path / 'out')
+        stereo = job.writer(SDFWrite, tmp_path / 'stereo.sdf')
+        for n, x in enumerate(reader):
+            if n == crash:
+                raise Crash
+            out.write(x)
+            if x._atoms_stereo:
+                stereo.write(x)
+            job.step()
+    return (tmp_path / 'out').read_bytes(), (tmp_path / 'stereo.sdf').read_bytes()
+
+
+@mark.parametrize('writer', (SDFWrite, MRVWrite))
+def test_resume(writer, tmp_path):
+    expected = convert(tmp_path, writer)
+    assert not (tmp_path / 'job.json').exists()
+
+    with raises(Crash):
+        convert(tmp_path, writer, crash=110)
+    assert (tmp_path / 'job.json').exists()
+    with raises(Crash):
+        convert(tmp_path, writer, crash=60)  # resumed from record 100
+    assert convert(tmp_path, writer) == expected
+    assert not (tmp_path / 'job.json').exists()
+
+
+def test_killed(tmp_path):
+    """
+    process killed without closing of files
+    """
+    expected = convert(tmp_path, SDFWrite)
+    code = f'''
+from os import _exit
+from pathlib import Path
+from CGRtools.files import ResumableJob, SDFRead, SDFWrite
+job = ResumableJob({str(tmp_path / 'job.json')!r}, every=30)
+reader = job.reader(SDFRead, {str(data / 'stereo.sdf')!r}, index_dir={str(tmp_path)!r})
+out = job.writer(SDFWrite, {str(tmp_path / 'out')!r})
+stereo = job.writer(SDFWrite, {str(tmp_path / 'stereo.sdf')!r})
+for n, x in enumerate(reader):
+    if n == 200:
+        out.flush()
+        _exit(1)
+    out.write(x)
+    if x._atoms_stereo:
+        stereo.write(x)
+    job.step()
+'''
+    assert run([executable, '-c', code], cwd=data.parent, capture_output=True).returncode == 1
+    assert len((tmp_path / 'out').read_bytes()) > 0
+    assert convert(tmp_path, SDFWrite) == expected
+
+
+def test_other_file(tmp_path):
+    with raises(Crash):
+        convert(tmp_path, SDFWrite, crash=50)
+    with ResumableJob(tmp_path / 'job.json') as job:
+        assert job.resumed
+        with raises(ValueError):
+            job.reader(RDFRead, data / 'standardize.rdf')
+        job.reader(SDFRead, data / 'stereo.sdf', index_dir=tmp_path)
+        with raises(ValueError):
+            job.writer(RDFWrite, tmp_path / 'other.rdf')
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from bz2 import compress as bz2_compress
+from gzip import compress as gzip_compress
+from io import SEEK_END
+from lzma import compress as xz_compress
+from pathlib import Path
+from random import Random
+from zlib import compressobj, crc32, DEFLATED
+from pytest import fixture, mark
+from CGRtools.files import RDFRead, SDFRead
+from CGRtools.files._compressed import GzipReader, open_file
+
+
+data = Path(__file__).parent
+plain = (data / 'stereo.sdf').read_bytes()
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+def bgzf(raw, size=1 << 14):
+    out = []
+    for i in [*range(0, len(raw), size), len(raw)]:  # last block is empty EOF marker
+        block = raw[i:i + size]
+        deflate = compressobj(6, DEFLATED, -15)
+        body = deflate.compress(block) + deflate.flush()
+        out.append(b'\x1f\x8b\x08\x04\0\0\0\0\0\xff\x06\0BC\x02\0' + (len(body) + 25).to_bytes(2, 'little') + body +
+                   crc32(block).to_bytes(4, 'little') + len(block).to_bytes(4, 'little'))
+    return b''.join(out)
+
+
+def members(raw, size=100000):
+    return b''.join(gzip_compress(raw[i:i + size]) for i in range(0, len(raw), size))
+
+
+compressors = {'gz': gzip_compress, 'members.gz': members, 'bgzf.gz': bgzf, 'bz2': bz2_compress, 'xz': xz_compress}
+
+
+@fixture(scope='module')
+def expected():
+    with SDFRead(data / 'stereo.sdf') as f:
+        return dump(f)
+
+
+@mark.parametrize('kind', compressors)
+def test_read(kind, tmp_path, expected):
+    path = tmp_path / f'data.sdf.{kind}'
+    path.write_bytes(compressors[kind](plain))
+    with open_file(path, binary=True) as f:
+        assert f.read() == plain
+    with SDFRead(path) as f:
+        assert dump(f) == expected
+    with SDFRead(data / 'stereo.sdf', indexable=True, index_dir=tmp_path) as f:
+        sliced = dump(f[250:]), dump(f[2:40:3]), dump([f[-1]])
+    with SDFRead(path, indexable=True, index_dir=tmp_path) as f:
+        assert len(f) == 300
+        assert (dump(f[250:]), dump(f[2:40:3]), dump([f[-1]])) == sliced
+        assert dump(f) == expected
+
+
+def read(file, size):
+    """
+    raw stream returns data of one gzip member or decompressed block by one call
+    """
+    out = b''
+    while len(out) < size:
+        data = file.read(size - len(out))
+        if not data:
+            break
+        out += data
+    return out
+
+
+@mark.parametrize('kind', ('gz', 'members.gz', 'bgzf.gz'))
+def test_gzip_seek(kind, tmp_path):
+    path = tmp_path / f'data.{kind}'
+    path.write_bytes(compressors[kind](plain))
+    random = Random(1)
+    with GzipReader(str(path), spacing=1 << 15) as f:
+        for offset in [random.randrange(len(plain)) for _ in range(50)] + [0, len(plain) - 10, len(plain)]:
+            assert f.seek(offset) == offset
+            assert read(f, 1000) == plain[offset:offset + 1000]
+        assert f.seek(-100, SEEK_END) == len(plain) - 100
+        assert f.readall() == plain[-100:]
+
+
+def test_bgzf_index(tmp_path):
+    path = tmp_path / 'data.gz'
+    path.write_bytes(bgzf(plain))
+    with GzipReader(str(path)) as f:
+        f.seek(len(plain) - 100)  # blocks are found by headers without decompression
+        assert len(f._GzipReader__positions) == len(range(0, len(plain), 1 << 14)) + 1
+        assert f.readall() == plain[-100:]
+
+
+def test_rdf(tmp_path):
+    with RDFRead(data / 'standardize.rdf') as f:
+        expected = dump(f)
+    path = tmp_path / 'data.rdf.gz'
+    path.write_bytes(gzip_compress((data / 'standardize.rdf').read_bytes()))
+    with RDFRead(path, indexable=True, index_dir=tmp_path) as f:
+        assert dump(f[::-1]) == expected[::-1]
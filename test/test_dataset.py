@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from pathlib import Path
+from shutil import copyfile
+from pytest import fixture, raises
+from CGRtools.files import DatasetRead, RDFRead, SDFRead, SMILESRead
+
+
+data = Path(__file__).parent
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+@fixture
+def shards(tmp_path):
+    """
+    stereo.sdf split into 3 shards, empty shard, RDF and SMILES shards
+    """
+    raw = (data / 'stereo.sdf').read_bytes().split(b'$$$$\n')[:-1]
+    directory = tmp_path / 'dataset'
+    (directory / 'sub').mkdir(parents=True)
+    for n, (start, stop) in enumerate(((0, 100), (100, 100), (100, 180), (180, 300))):
+        (directory / f'a{n}.sdf').write_bytes(b''.join(x + b'$$$$\n' for x in raw[start:stop]))
+    copyfile(data / 'standardize.rdf', directory / 'b.rdf')
+    copyfile(data / 'smiles.txt', directory / 'sub' / 'c.smi')
+    return directory
+
+
+@fixture
+def expected(shards):
+    """
+    paths and records of shards in dataset order
+    """
+    out = []
+    for path in sorted(shards.glob('*')):
+        if path.is_file():
+            with (SDFRead if path.suffix == '.sdf' else RDFRead)(path) as f:
+                out.append((str(path), dump(f)))
+    with SMILESRead(shards / 'sub' / 'c.smi') as f:
+        out.append((str(shards / 'sub' / 'c.smi'), dump(f)))
+    return out
+
+
+def test_dataset(shards, expected, tmp_path):
+    with DatasetRead(shards / '**' / '*.*', index_dir=tmp_path) as f:
+        assert f.shards == [x[0] for x in expected]
+        assert len(f) == 300 + 5 + 42
+        assert dump(f) == [x for _, records in expected for x in records]
+        assert f.locate(0) == (expected[0][0], 0)
+        assert f.locate(100) == (expected[2][0], 0)  # empty shard skipped
+        assert f.locate(-1) == (expected[-1][0], 41)
+        assert dump([f[300]]) == expected[4][1][:1]
+        with raises(IndexError):
+            f[347]
+        with raises(IndexError):
+            f[177]  # invalid record
+
+    with DatasetRead(shards / '**' / '*.*', index_dir=tmp_path, max_open=1) as f:
+        assert dump(f[90:110]) == expected[0][1][90:] + expected[2][1][:10]
+        assert dump(f[295:310]) == expected[3][1][-5:] + expected[4][1] + expected[5][1][:5]
+        assert dump(f[0:300:50]) == dump(x for x in (f[i] for i in range(0, 300, 50)))
+
+
+def test_parallel(shards, expected, tmp_path):
+    serial = [x for _, records in expected for x in records]
+    with DatasetRead(shards / '**' / '*.*', index_dir=tmp_path, workers=2, chunksize=30) as f:
+        assert dump(f) == serial
+        assert sorted((x.index for x in f.errors), key=str) == sorted([(str(shards / 'a2.sdf'), 77),
+                                                                      (str(shards / 'a2.sdf'), 79),
+                                                                      (str(shards / 'sub' / 'c.smi'), 41)], key=str)
+    with DatasetRead(shards / '**' / '*.*', index_dir=tmp_path, workers=2, chunksize=30, ordered=False) as f:
+        assert sorted(dump(f), key=str) == sorted(serial, key=str)
+
+
+def test_files(shards, tmp_path):
+    paths = [shards / 'a3.sdf', shards / 'a0.sdf']
+    with DatasetRead(paths, reader=SDFRead, index_dir=tmp_path) as f:
+        assert len(f) == 220
+        with SDFRead(paths[0]) as s:
+            assert dump(f[:3]) == dump(s.read()[:3])
+    with raises(ValueError):
+        DatasetRead(shards / '*.xyz')
+    with raises(TypeError):
+        DatasetRead(paths, reader=dict)
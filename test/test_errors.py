@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from logging import WARNING
+from pathlib import Path
+from pytest import raises
+from CGRtools.files import ErrorSink, SDFRead, SMILESRead
+from CGRtools.files._errors import RecordError
+
+
+data = Path(__file__).parent
+
+
+def fail(sink, n):
+    for i in range(n):
+        try:
+            raise (KeyError if i % 3 else ValueError)(i)
+        except Exception:
+            sink(i, None, f'record {i}', f'error {i}')
+
+
+def test_sampling(caplog):
+    sink = ErrorSink(first=3, sample=10, limit=5)
+    with caplog.at_level(WARNING):
+        fail(sink, 35)
+    assert [x.getMessage().split(':')[0] for x in caplog.records] == ['error 0', 'error 1', 'error 2', 'error 10',
+                                                                      'error 20', 'error 30']
+    assert 'Traceback' in caplog.records[0].getMessage()
+    assert len(sink) == 35
+    assert sink.counts == {'ValueError': 12, 'KeyError': 23}
+    assert [x.index for x in sink] == [30, 31, 32, 33, 34]
+    assert sink.entries[-1] == RecordError(34, None, 'KeyError', '34', None)
+
+    with raises(ValueError):
+        ErrorSink(sample=-1)
+
+
+def test_merge():
+    entries = []
+    sink = ErrorSink(capture=True, first=0, sample=0, callback=entries.append)
+    fail(sink, 2)
+    other = sink.spawn()
+    assert other.capture and other.callback is None
+    fail(other, 4)
+    sink.merge(other)
+    assert len(sink) == 6
+    assert sink.counts == {'ValueError': 3, 'KeyError': 3}
+    assert [x.index for x in entries] == [0, 1, 0, 1, 2, 3]
+    assert entries[0].record == 'record 0'
+    sink.clear()
+    assert len(sink) == 0 and not list(sink)
+
+
+def test_readers(tmp_path):
+    sink = ErrorSink(first=0, sample=0)
+    with SDFRead(data / 'stereo.sdf', errors=sink) as f:
+        assert len(f.read()) == 298
+    assert [(x.index, x.offset, x.error, x.record) for x in sink] == [(177, None, 'ValueError', None),
+                                                                      (179, None, 'ValueError', None)]
+
+    sink = ErrorSink(capture=True, first=0, sample=0)
+    with SDFRead(data / 'stereo.sdf', indexable=True, index_dir=tmp_path, errors=sink) as f:
+        f.read()
+        assert [(x.index, x.offset) for x in sink] == [(177, f._shifts[177]), (179, f._shifts[179])]
+        assert all(x.record == f._read_record(x.index) and 'VS' in x.record for x in sink)
+
+    with SDFRead(data / 'stereo.sdf', index_dir=tmp_path, workers=2, chunksize=10) as f:
+        f.read()
+        assert [(x.index, x.offset) for x in f.errors] == [(x.index, x.offset) for x in sink]
+
+    with SMILESRead(data / 'smiles.txt', errors=ErrorSink(capture=True, first=0)) as f:
+        f.read()
+        assert [(x.index, x.error, x.record.strip()) for x in f.errors] == \
+            [(41, 'IncorrectSmiles', 'O=S(=O)(N(C)C)N:1:C:C:N:C1[.>-][Zn+2>+]')]
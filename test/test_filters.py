@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from functools import partial
+from io import StringIO
+from pathlib import Path
+from pytest import fixture, mark
+from CGRtools.containers import ReactionContainer
+from CGRtools.files import MRVRead, MRVWrite, RDFRead, RDFWrite, SDFRead, SMILESRead
+
+
+data = Path(__file__).parent
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+def title(x):
+    return x.endswith(('1', '3', '7'))
+
+
+def meta(x):
+    return 'TH' in x.get('STEREOGENIC_UNITS', '')
+
+
+def counts(limit, x):
+    return x['atoms'] < limit
+
+
+def reactants(x):
+    return x['reactants'] == 1
+
+
+filters = [({'title_filter': title}, lambda x: title(x.name)),
+           ({'meta_filter': meta}, lambda x: meta(x.meta)),
+           ({'counts_filter': partial(counts, 20)}, lambda x: x.atoms_count < 20),
+           ({'title_filter': title, 'meta_filter': meta, 'counts_filter': partial(counts, 20)},
+            lambda x: title(x.name) and meta(x.meta) and x.atoms_count < 20)]
+
+
+@fixture(scope='module')
+def molecules():
+    with SDFRead(data / 'stereo.sdf') as f:
+        return f.read()
+
+
+@mark.parametrize('options, predicate', filters)
+def test_sdf(options, predicate, molecules, tmp_path):
+    expected = dump(x for x in molecules if predicate(x))
+    assert 0 < len(expected) < len(molecules)
+    with SDFRead(data / 'stereo.sdf', **options) as f:
+        assert dump(f) == expected
+    with SDFRead(data / 'stereo.sdf', index_dir=tmp_path, workers=2, **options) as f:
+        assert dump(f) == expected
+
+
+@mark.parametrize('options, predicate', filters)
+def test_mrv(options, predicate, molecules, tmp_path):
+    text = StringIO()
+    with MRVWrite(text) as f:
+        for x in molecules:
+            f.write(x)
+    path = tmp_path / 'data.mrv'
+    path.write_text(text.getvalue())
+    with MRVRead(path) as f:
+        expected = dump(x for x in f if predicate(x))
+    with MRVRead(path, **options) as f:
+        assert dump(f) == expected
+    with MRVRead(path, index_dir=tmp_path, workers=2, **options) as f:
+        assert dump(f) == expected
+
+
+def test_rdf(tmp_path):
+    with RDFRead(data / 'standardize.rdf') as f:
+        reactions = f.read()
+    for n, x in enumerate(reactions[:3]):
+        extra = x.reactants[0].remap({m: m + 100 for m in x.reactants[0]}, copy=True)
+        reactions.append(ReactionContainer((*x.reactants, extra), x.products, meta={'n': str(n)}, name=f'r{n}'))
+    path = tmp_path / 'data.rdf'
+    with RDFWrite(path) as f:
+        for x in reactions:
+            f.write(x)
+    with RDFRead(path) as f:
+        reactions = f.read()
+
+    for options, predicate in (({'counts_filter': reactants}, lambda x: len(x.reactants) == 1),
+                               ({'meta_filter': bool}, lambda x: x.meta),
+                               ({'title_filter': partial(str.__eq__, 'r1')}, lambda x: x.name == 'r1')):
+        expected = dump(x for x in reactions if predicate(x))
+        assert 0 < len(expected) < len(reactions)
+        with RDFRead(path, **options) as f:
+            assert dump(f) == expected
+        with RDFRead(path, index_dir=tmp_path, workers=2, chunksize=2, **options) as f:
+            assert dump(f) == expected
+
+
+def test_smiles():
+    with SMILESRead(data / 'smiles.txt') as f:
+        records = f.read()
+    molecules = [x for x in records if hasattr(x, 'atoms_count')]
+    expected = dump(x for x in molecules if x.atoms_count < 3)
+    assert 0 < len(expected) < len(molecules)
+    with SMILESRead(data / 'smiles.txt', counts_filter=lambda x: 'atoms' in x and x['atoms'] < 3) as f:
+        assert dump(f) == expected
+
+
+def test_skipped_errors():
+    with SDFRead(data / 'stereo.sdf', title_filter=lambda x: False) as f:
+        assert f.read() == []
+        assert len(f.errors) == 0
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import StringIO
+from pytest import mark
+from CGRtools.files import INCHIrw
+
+
+pytestmark = mark.skipif('INCHIRead' not in INCHIrw.__all__, reason='libinchi not available')
+
+
+def alkane(n):
+    """
+    InChI of linear alkane. long alkanes exceed initial string buffer of thread
+    """
+    chain = '-'.join(map(str, [*range(1, n + 1, 2), *range(n - n % 2, 1, -2)]))
+    return f'InChI=1S/C{n}H{2 * n + 2}/c{chain}/h3-{n}H2,1-2H3'
+
+
+strings = ['InChI=1S/CH4/h1H4', 'InChI=1S/C2H6O/c1-2-3/h3H,2H2,1H3', alkane(6), alkane(400),
+           'InChI=1S/C6H6/c1-2-4-6-5-3-1/h1-6H', alkane(20)] * 5
+
+
+def test_buffer_reuse():
+    with INCHIrw.INCHIRead(StringIO('\n'.join(strings))) as f:
+        assert [x.atoms_count for x in f] == [1, 3, 6, 400, 6, 20] * 5
+
+
+def test_threads():
+    with INCHIrw.INCHIRead(StringIO('\n'.join(strings))) as f:
+        serial = [str(x) for x in f]
+    with INCHIrw.INCHIRead(StringIO('\n'.join(strings)), workers=3, chunksize=2) as f:
+        assert [str(x) for x in f] == serial
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import BytesIO, StringIO
+from os import utime
+from pathlib import Path
+from shutil import copyfile
+from pytest import fixture
+from CGRtools.files import RDFRead, SDFRead, SMILESRead
+from CGRtools.files._index import scan_lines, scan_offsets
+
+
+data = Path(__file__).parent
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+@fixture
+def sdf(tmp_path):
+    path = tmp_path / 'data.sdf'
+    copyfile(data / 'stereo.sdf', path)
+    return path
+
+
+def no_scan(*args, **kwargs):
+    raise AssertionError('index rebuilt')
+
+
+def test_cache_reuse(sdf, tmp_path, monkeypatch):
+    cache = tmp_path / 'cache'
+    cache.mkdir()
+    with SDFRead(sdf, indexable=True, index_dir=cache) as f:
+        expected = dump(f)
+        shifts = list(f._shifts)
+    assert len(list(cache.glob('*.cgri'))) == 1
+
+    monkeypatch.setattr(SDFRead, '_scan_offsets', no_scan)
+    with SDFRead(sdf, indexable=True, index_dir=cache) as f:
+        assert list(f._shifts) == shifts
+        assert len(f) == 300
+        assert dump(f) == expected
+        assert dump([f[299]]) == expected[-1:]
+
+
+def test_sidecar(sdf):
+    with SDFRead(sdf, indexable=True, index_dir=True) as f:
+        assert len(f) == 300
+    assert sdf.with_name('data.sdf.cgri').exists()
+
+
+def test_cache_invalidation(sdf, tmp_path):
+    with SDFRead(sdf, indexable=True, index_dir=tmp_path) as f:
+        first = dump(f[:2])
+
+    text = sdf.read_bytes()
+    sdf.write_bytes(text + text)  # size changed
+    with SDFRead(sdf, indexable=True, index_dir=tmp_path) as f:
+        assert len(f) == 600
+        assert dump(f[300:302]) == first
+
+    sdf.write_bytes(text[:1118] + text)  # first record duplicated
+    with SDFRead(sdf, indexable=True, index_dir=tmp_path) as f:
+        assert len(f) == 301
+
+    stat = sdf.stat()
+    sdf.write_bytes(text + text[:1118])  # same size, other content
+    utime(sdf, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    with SDFRead(sdf, indexable=True, index_dir=tmp_path) as f:
+        assert len(f) == 301
+        assert dump(f[-1:]) == first[:1]
+
+
+def test_broken_cache(sdf, tmp_path):
+    with SDFRead(sdf, indexable=True, index_dir=tmp_path) as f:
+        expected = dump(f)
+    for path in tmp_path.glob('*.cgri'):
+        path.write_bytes(path.read_bytes()[:100])
+    with SDFRead(sdf, indexable=True, index_dir=tmp_path) as f:
+        assert len(f) == 300
+        assert dump(f) == expected
+
+
+def test_buffers():
+    text = (data / 'stereo.sdf').read_bytes()
+    for stream in (BytesIO(text), StringIO(text.decode())):
+        with SDFRead(stream, indexable=True) as f:
+            assert len(f) == 300
+
+    with open(data / 'stereo.sdf', 'rb') as f:
+        expected = scan_offsets(f, (b'$$$$',), after=True)
+    assert scan_offsets(BytesIO(text), (b'$$$$',), after=True, block=1000) == expected
+    assert scan_offsets(StringIO(text.decode()), (b'$$$$',), after=True, block=1000) == expected
+
+
+def test_lines():
+    text = 'C\r\nCC\n\nCCC'
+    assert scan_lines(BytesIO(text.encode()), block=3).tolist() == [0, 3, 6, 7, 10]
+    assert scan_lines(StringIO(text + '\n')).tolist() == [0, 3, 6, 7, 11]
+    with SMILESRead(data / 'smiles.txt', indexable=True) as f:
+        serial = dump(f)
+        assert dump(f[::-1]) == serial[::-1]
+
+
+def test_rdf(tmp_path):
+    with RDFRead(data / 'standardize.rdf') as f:
+        serial = dump(f)
+    for _ in range(2):
+        with RDFRead(data / 'standardize.rdf', indexable=True, index_dir=tmp_path) as f:
+            assert len(f) == 5
+            assert dump(f) == serial
+            assert dump(f[3:]) == serial[3:]
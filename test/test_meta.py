@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import BytesIO, StringIO
+from pathlib import Path
+from pytest import mark
+from CGRtools.files import RDFRead, SDFRead
+
+
+data = Path(__file__).parent
+
+
+@mark.parametrize('reader, file, size', ((SDFRead, 'stereo.sdf', 300), (RDFRead, 'standardize.rdf', 5),
+                                         (RDFRead, 'template.rdf', None)))
+def test_read_meta(reader, file, size, tmp_path):
+    with reader(data / file, indexable=True, index_dir=tmp_path, ignore=True) as f:
+        expected = []
+        for i in range(len(f)):
+            try:
+                x = f[i]
+            except IndexError:  # records with errors
+                continue
+            expected.append((i, x.name, dict(x.meta)))
+        meta = list(f.read_meta())
+        assert size is None or len(meta) == size
+        assert [(i, t.strip(), m) for i, t, m in meta if i in {x[0] for x in expected}] == expected
+        assert dict(next(f).meta) == expected[0][2]  # iteration not affected
+
+    raw = (data / file).read_bytes()
+    for stream in (BytesIO(raw), StringIO(raw.decode())):
+        with reader(stream) as f:
+            assert list(f.read_meta()) == meta
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from pathlib import Path
+from pytest import mark
+from CGRtools.files import SDFRead
+
+
+data = Path(__file__).parent
+raw = (data / 'stereo.sdf').read_bytes()
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+@mark.parametrize('text', (raw, raw.replace(b'\n', b'\r\n'), raw[:-5], raw + b'\n\n'), ids=('lf', 'crlf', 'end', 'tail'))
+def test_records(text, tmp_path):
+    path = tmp_path / 'data.sdf'
+    path.write_bytes(text)
+    with SDFRead(path) as f:
+        expected = dump(f)
+        errors = [x.index for x in f.errors]
+    with SDFRead(path, memory_map=True, index_dir=tmp_path) as f:
+        assert dump(f) == expected
+        assert [x.index for x in f.errors] == errors
+        assert all(x.offset == f._shifts[x.index] for x in f.errors)
+
+
+def test_access(tmp_path):
+    with SDFRead(data / 'stereo.sdf', indexable=True, index_dir=tmp_path) as f:
+        expected = dump(f[::-3]), dump([f[150]]), dump(f[200:210])
+        f.seek(295)
+        tail = dump(f)
+    with SDFRead(data / 'stereo.sdf', indexable=True, memory_map=True, index_dir=tmp_path) as f:
+        assert len(f) == 300
+        assert (dump(f[::-3]), dump([f[150]]), dump(f[200:210])) == expected
+        f.seek(295)
+        assert dump(f) == tail
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import BytesIO, StringIO
+from pathlib import Path
+from pytest import fixture, importorskip, raises
+
+
+importorskip('lxml')
+from CGRtools.files import MRVRead, MRVWrite, RDFRead, SDFRead  # noqa: E402
+
+
+data = Path(__file__).parent
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+def write(records):
+    text = StringIO()
+    with MRVWrite(text) as f:
+        for x in records:
+            f.write(x)
+    return text.getvalue().encode()
+
+
+@fixture(scope='module')
+def mrv(tmp_path_factory):
+    with SDFRead(data / 'stereo.sdf') as f:
+        molecules = f.read()
+    with RDFRead(data / 'standardize.rdf') as f:
+        reactions = f.read()
+    path = tmp_path_factory.mktemp('mrv') / 'data.mrv'
+    path.write_bytes(write(molecules[:100] + reactions + molecules[100:]))
+    return path
+
+
+@fixture(scope='module')
+def serial(mrv):
+    with MRVRead(mrv) as f:
+        return dump(f)
+
+
+def test_indexable(mrv, serial, tmp_path):
+    with MRVRead(mrv, indexable=True, index_dir=tmp_path) as f:
+        assert len(f) == len(serial) == 303
+        assert dump(f) == serial
+        assert dump(f[95:110]) == serial[95:110]
+        assert dump([f[-1], f[0]]) == [serial[-1], serial[0]]
+        f.seek(200)
+        assert f.tell() == 200
+        assert dump([next(f)]) == serial[200:201]
+    with MRVRead(BytesIO(mrv.read_bytes()), indexable=True) as f:
+        assert dump(f[::-7]) == serial[::-7]
+
+
+def test_parallel(mrv, serial, tmp_path):
+    with MRVRead(mrv, index_dir=tmp_path, workers=2, chunksize=20) as f:
+        assert dump(f) == serial
+    with MRVRead(BytesIO(mrv.read_bytes()), workers=2, chunksize=30, ordered=False) as f:
+        assert sorted(dump(f), key=str) == sorted(serial, key=str)
+
+
+def test_resume(mrv, serial, tmp_path):
+    with MRVRead(mrv, indexable=True, index_dir=tmp_path) as f:
+        for _ in range(150):
+            next(f)
+        checkpoint = f.checkpoint()
+    with MRVRead(mrv, resume_from=checkpoint, index_dir=tmp_path) as f:
+        assert dump(f) == serial[150:]
+    with raises(ValueError):
+        MRVRead(mrv, resume_from=(checkpoint.index, checkpoint.offset + 1), index_dir=tmp_path)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from pathlib import Path
+from CGRtools.files import RDFRead, SDFRead
+
+
+data = Path(__file__).parent
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+def test_sdf_parallel(tmp_path):
+    with SDFRead(data / 'stereo.sdf', index_dir=tmp_path) as f:
+        serial = dump(f)
+    with SDFRead(data / 'stereo.sdf', index_dir=tmp_path, workers=2, chunksize=7) as f:
+        assert dump(f) == serial
+        assert len(f.errors) == 2
+
+
+def test_sdf_unordered(tmp_path):
+    with SDFRead(data / 'stereo.sdf', index_dir=tmp_path) as f:
+        serial = dump(f)
+    with SDFRead(data / 'stereo.sdf', index_dir=tmp_path, workers=2, chunksize=7, ordered=False) as f:
+        assert sorted(dump(f), key=str) == sorted(serial, key=str)
+
+
+def test_rdf_parallel(tmp_path):
+    with RDFRead(data / 'standardize.rdf', index_dir=tmp_path) as f:
+        serial = dump(f)
+    with RDFRead(data / 'standardize.rdf', index_dir=tmp_path, workers=2, chunksize=2) as f:
+        assert dump(f) == serial
+
+
+def test_rxn_parallel_fallback(tmp_path):
+    with RDFRead(data / 'colored_v3000.rxn', index_dir=tmp_path) as f:
+        serial = dump(f)
+    with RDFRead(data / 'colored_v3000.rxn', index_dir=tmp_path, workers=2) as f:
+        assert f.checkpoint().index == 0
+        assert dump(f) == serial
+        assert f.checkpoint().index == 1
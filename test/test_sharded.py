@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import StringIO
+from pathlib import Path
+from pytest import fixture, raises
+from CGRtools.files import RDFRead, RDFWrite, SDFRead, SDFWrite, ShardedWrite
+from CGRtools.files._sharded import _route
+
+
+data = Path(__file__).parent
+
+
+def dump(records):
+    return [x.meta.get('STRUCTURE_ID', str(x)) for x in records]
+
+
+def identifier(x):
+    return int(x.meta['STRUCTURE_ID'][2:])
+
+
+@fixture(scope='module')
+def molecules():
+    with SDFRead(data / 'stereo.sdf') as f:
+        return f.read()
+
+
+def read(paths, reader=SDFRead):
+    out = []
+    for path in paths:
+        with reader(path) as f:
+            out.append(dump(f))
+    return out
+
+
+def test_shards(molecules, tmp_path):
+    template = str(tmp_path / 'out_{}.sdf')
+    with ShardedWrite(template, SDFWrite, 4) as f:
+        assert len(f) == 4
+        f.write_many(molecules)
+        routes = [f.shard(x) for x in molecules]
+    assert routes == [_route(bytes(x), 4) for x in molecules]
+    shards = read(template.format(x) for x in range(4))
+    assert all(shards)
+    assert sorted(x for s in shards for x in s) == sorted(dump(molecules))
+    for n, shard in enumerate(shards):  # order of records preserved
+        assert shard == dump(x for x, r in zip(molecules, routes) if r == n)
+
+
+def test_keys(molecules, tmp_path):
+    paths = [tmp_path / f'{x}.sdf' for x in 'abc']
+    with ShardedWrite(paths, SDFWrite, key=identifier, chunksize=7) as f:
+        f.write(molecules[0])
+        f.write_many(molecules[1:])
+        assert f.shard(molecules[5]) == identifier(molecules[5]) % 3
+    for n, shard in enumerate(read(paths)):
+        assert shard == dump(x for x in molecules if identifier(x) % 3 == n)
+
+
+def test_workers(molecules, tmp_path):
+    with ShardedWrite(str(tmp_path / 'a{}.sdf'), SDFWrite, 3) as f:
+        f.write_many(molecules)
+    with ShardedWrite(str(tmp_path / 'b{}.sdf'), SDFWrite, 3, workers=2, chunksize=20) as f:
+        f.write_many(molecules)
+    for n in range(3):
+        assert (tmp_path / f'a{n}.sdf').read_text() == (tmp_path / f'b{n}.sdf').read_text()
+
+    with RDFRead(data / 'standardize.rdf') as f:
+        reactions = f.read()
+    with ShardedWrite(str(tmp_path / 'r{}.rdf'), RDFWrite, 2, workers=2, chunksize=2) as f:
+        f.write_many(reactions)
+    shards = read((tmp_path / f'r{n}.rdf' for n in range(2)), RDFRead)
+    assert sorted(x for s in shards for x in s) == sorted(dump(reactions))
+
+
+def test_route():
+    assert _route(7, 5) == 2
+    assert _route('CCO', 1000) == _route(b'CCO', 1000) == 43  # not randomized per process
+    assert {_route(str(x), 8) for x in range(1000)} == set(range(8))
+
+
+def test_invalid(tmp_path):
+    with raises(ValueError):
+        ShardedWrite(str(tmp_path / 'out.sdf'), SDFWrite, 2)
+    with raises(ValueError):
+        ShardedWrite([StringIO()], SDFWrite, 2)
+    with raises(TypeError):
+        ShardedWrite([StringIO()], dict)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import BytesIO, StringIO
+from pathlib import Path
+from CGRtools.files import SMILESRead
+
+
+data = Path(__file__).parent
+lines = (data / 'smiles.txt').read_text().splitlines()
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+def test_parallel():
+    with SMILESRead(data / 'smiles.txt') as f:
+        serial = dump(f)
+    with SMILESRead(data / 'smiles.txt', workers=2, chunksize=5) as f:
+        assert dump(f) == serial
+        assert [x.index for x in f.errors] == [41]
+    with SMILESRead(BytesIO((data / 'smiles.txt').read_bytes()), workers=3, chunksize=4, ordered=False) as f:
+        assert sorted(dump(f), key=str) == sorted(serial, key=str)
+
+
+def test_header():
+    text = 'smiles id value\n' + '\n'.join(f'{x.split()[0]} m{n} {n * 2}' for n, x in enumerate(lines) if x.strip())
+    with SMILESRead(StringIO(text), header=True) as f:
+        serial = dump(f)
+    assert serial[3][1] == {'id': 'm3', 'value': '6'}
+    with SMILESRead(StringIO(text), header=True, workers=2, chunksize=3) as f:
+        assert dump(f) == serial
+    with SMILESRead(StringIO(text), header=True, indexable=True) as f:
+        assert dump(f[3:6]) == serial[3:6]
+
+
+def test_lexer():
+    smiles = ['C[C@H](N)C(=O)O', '[13CH3][N+](C)(C)C.[Cl-]', 'C1CC%12CC1CC%12', 'c1ccccc1/C=C/Br', '[Fe+3]',
+              'C1=CC=C2C=CC=CC2=C1', 'N#CC(=O)[O-]', '[2H]C([2H])([2H])O', 'C[C@@]12CCC[C@H]1CCC2', '[CH2]=O',
+              'CC(=O)O>>CC(=O)OC', '[CH3:1][OH:2]>[Na+]>[CH3:1][O:2]C']
+    with SMILESRead(StringIO('\n'.join(smiles)), ignore=True) as f:
+        records = f.read()
+    assert len(records) == len(smiles)
+    assert [x.atoms_count for x in records[:10]] == [6, 6, 7, 9, 1, 10, 5, 5, 9, 2]
+    assert [str(x) for x in records] == ['CC(N)C(O)=O', '[Cl-].C[N+](C)(C)[13C]', 'C1CC2CCC1C2',
+                                         'BrC=CC:1:C:C:C:C:C:1', '[Fe+3]', 'C1=C2C=CC=CC2=CC=C1', 'N#CC([O-])=O',
+                                         'OC([2H])([2H])[2H]', 'CC12CCCC2CCC1', 'C=O', 'CC(O)=O>>CC(=O)OC',
+                                         'CO>[Na+]>COC']
+    with SMILESRead(StringIO('\n'.join(str(x) for x in records)), ignore=True) as f:
+        assert [str(x) for x in f] == [str(x) for x in records]
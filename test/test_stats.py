@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import StringIO
+from pathlib import Path
+from CGRtools.files import IOStats, RDFRead, SDFRead, SDFWrite, SMILESRead
+
+
+data = Path(__file__).parent
+
+
+def test_reader_bytes():
+    stats = IOStats()
+    with SDFRead(data / 'stereo.sdf', stats=stats) as f:
+        f.read()
+    assert stats.records == 298
+    assert stats.errors == 2
+    assert stats.bytes == (data / 'stereo.sdf').stat().st_size
+
+
+def test_parallel_bytes(tmp_path):
+    stats = IOStats()
+    with SDFRead(data / 'stereo.sdf', index_dir=tmp_path, workers=2, stats=stats) as f:
+        f.read()
+    assert stats.records == 298
+    assert stats.bytes == (data / 'stereo.sdf').stat().st_size
+
+
+def test_encoded_bytes(tmp_path):
+    with SMILESRead(data / 'smiles.txt') as f:
+        molecules = [x for x in f if x.atoms_count]
+    for x in molecules:
+        x.meta['name'] = 'молекула ∑'
+    stats = IOStats(every=10, callback=lambda x: calls.append(x.records))
+    calls = []
+    with SDFWrite(tmp_path / 'out.sdf', stats=stats) as f:
+        for x in molecules:
+            f.write(x)
+    size = (tmp_path / 'out.sdf').stat().st_size
+    assert stats.bytes == size
+    assert stats.records == len(molecules)
+    assert calls[-1] == len(molecules)
+
+    read = IOStats()
+    with SDFRead(tmp_path / 'out.sdf', stats=read) as f:
+        assert [x.meta['name'] for x in f] == ['молекула ∑'] * len(molecules)
+    assert read.bytes == size
+
+    read = IOStats()
+    with SDFRead(StringIO((tmp_path / 'out.sdf').read_text()), stats=read) as f:
+        f.read()
+    assert read.bytes == size
+
+
+def test_rdf_parallel_bytes(tmp_path):
+    stats = IOStats()
+    with RDFRead(data / 'standardize.rdf', index_dir=tmp_path, workers=2, chunksize=2, stats=stats) as f:
+        f.read()
+    assert stats.bytes == (data / 'standardize.rdf').stat().st_size
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import BytesIO, StringIO
+from os import fdopen, pipe
+from pathlib import Path
+from threading import Thread
+from pytest import mark
+from CGRtools.files import MRVRead, MRVWrite, RDFRead, RDFWrite, SDFRead, SDFWrite, SMILESRead
+
+
+data = Path(__file__).parent
+readers = ((SDFRead, 'stereo.sdf'), (RDFRead, 'standardize.rdf'), (RDFRead, 'colored_v3000.rxn'),
+           (SMILESRead, 'smiles.txt'))
+
+
+def dump(records):
+    return [(str(x), dict(x.meta), x.name) for x in records]
+
+
+def os_pipe(raw):
+    """
+    unbuffered read end of OS pipe filled by thread
+    """
+    r, w = pipe()
+
+    def feed():
+        with fdopen(w, 'wb') as f:
+            f.write(raw)
+
+    Thread(target=feed, daemon=True).start()
+    return fdopen(r, 'rb', buffering=0)
+
+
+@mark.parametrize('reader, file', readers)
+def test_binary(reader, file):
+    with reader(data / file) as f:
+        expected = dump(f)
+    raw = (data / file).read_bytes()
+    with reader(BytesIO(raw)) as f:
+        assert dump(f) == expected
+    with open(data / file, 'rb') as b, reader(b) as f:
+        assert dump(f) == expected
+        assert not b.closed  # external streams are not closed
+    stream = os_pipe(raw)
+    with reader(stream) as f:
+        assert dump(f) == expected
+    stream.close()
+
+
+@mark.parametrize('writer, reader, file', ((SDFWrite, SDFRead, 'stereo.sdf'), (RDFWrite, RDFRead, 'standardize.rdf'),
+                                           (MRVWrite, MRVRead, 'stereo.sdf')))
+def test_writers(writer, reader, file):
+    with (SDFRead if reader is MRVRead else reader)(data / file) as f:
+        records = f.read()
+    text, binary = StringIO(), BytesIO()
+    for stream in (text, binary):
+        with writer(stream) as f:
+            for x in records:
+                f.write(x)
+        assert not stream.closed
+    assert binary.getvalue().decode().splitlines()[1:] == text.getvalue().splitlines()[1:]  # RDF header has date
+
+    binary.seek(0)
+    with reader(binary) as f:
+        assert len(f.read()) == len(records)
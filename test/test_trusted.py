@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import StringIO
+from pathlib import Path
+from pytest import mark
+from CGRtools.files import RDFRead, RDFWrite, SDFRead, SDFWrite, SMILESRead
+
+
+data = Path(__file__).parent
+
+
+attributes = ('_charges', '_radicals', '_plane', '_neighbors', '_hybridizations', '_hydrogens', '_atoms_stereo',
+              '_conformers', '_parsed_mapping', '_p_charges', '_p_radicals')
+
+
+def state(x):
+    if hasattr(x, 'reactants'):
+        return str(x), dict(x.meta), x.name, [state(m) for m in (*x.reactants, *x.products, *x.reagents)]
+    return (str(x), dict(x.meta), x.name, {n: (a.atomic_symbol, a.isotope) for n, a in x.atoms()},
+            {(n, m): str(b) for n, m, b in x.bonds()}, *(getattr(x, k, None) for k in attributes))
+
+
+def written(writer, records):
+    text = StringIO()
+    with writer(text) as f:
+        for x in records:
+            f.write(x)
+    text.seek(0)
+    return text
+
+
+@mark.parametrize('reader, writer, file', ((SDFRead, SDFWrite, 'stereo.sdf'), (RDFRead, RDFWrite, 'standardize.rdf')))
+def test_written(reader, writer, file):
+    with reader(data / file) as f:
+        records = f.read()
+    with reader(written(writer, records)) as f:
+        expected = [state(x) for x in f]
+    with reader(written(writer, records), trusted=True) as f:
+        assert [state(x) for x in f] == expected
+    with reader(written(writer, records), trusted=True, ignore=True, remap=False) as f:
+        assert len(f.read()) == len(records)
+
+
+def test_smiles():
+    with SMILESRead(data / 'smiles.txt') as f:
+        expected = [state(x) for x in f]
+    with SMILESRead(data / 'smiles.txt', trusted=True) as f:
+        assert [state(x) for x in f] == expected
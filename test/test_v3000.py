@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import StringIO
+from pathlib import Path
+from pytest import raises
+from CGRtools.containers import MoleculeContainer
+from CGRtools.files import RDFRead, RDFWrite, SDFRead, SDFWrite
+
+
+data = Path(__file__).parent
+
+
+def state(x):
+    if hasattr(x, 'reactants'):
+        return str(x), dict(x.meta), x.name, [state(m) for m in (*x.reactants, *x.products, *x.reagents)]
+    return (str(x), dict(x.meta), x.name, {n: (a.atomic_symbol, a.isotope) for n, a in x.atoms()},
+            {(n, m): str(b) for n, m, b in x.bonds()}, x._charges, x._radicals, x._plane, x._atoms_stereo,
+            x._conformers)
+
+
+def round_trip(reader, writer, records, **kwargs):
+    text = StringIO()
+    with writer(text, **kwargs) as f:
+        for x in records:
+            f.write(x)
+    text.seek(0)
+    with reader(text) as f:
+        return text.getvalue(), f.read()
+
+
+def chain(n):
+    g = MoleculeContainer()
+    for i in range(n):
+        g.add_atom('C', xy=(i / 2, i % 2 / 2))
+    for i in range(1, n):
+        g.add_bond(i, i + 1, 1)
+    g.meta['size'] = str(n)
+    return g
+
+
+def test_molecules():
+    with SDFRead(data / 'stereo.sdf') as f:
+        molecules = f.read()
+    v2000, expected = round_trip(SDFRead, SDFWrite, molecules)
+    v3000, records = round_trip(SDFRead, SDFWrite, molecules, v3000=True)
+    assert 'V3000' not in v2000 and v3000.count('V3000') == len(molecules)
+    assert [state(x) for x in records] == [state(x) for x in expected]
+
+
+def test_reactions():
+    with RDFRead(data / 'standardize.rdf') as f:
+        reactions = f.read()
+    _, expected = round_trip(RDFRead, RDFWrite, reactions)
+    text, records = round_trip(RDFRead, RDFWrite, reactions, v3000=True)
+    assert 'M  V30 BEGIN CTAB' in text
+    assert [state(x) for x in records] == [state(x) for x in expected]
+
+
+def test_large():
+    molecules = [chain(5), chain(1500), chain(999)]
+    text, records = round_trip(SDFRead, SDFWrite, molecules)
+    assert text.count('V3000') == 1
+    assert [(x.atoms_count, x.bonds_count, x.meta['size']) for x in records] == \
+        [(5, 4, '5'), (1500, 1499, '1500'), (999, 998, '999')]
+    assert [x._plane for x in records] == [x._plane for x in molecules]
+    with raises(ValueError):
+        round_trip(SDFRead, SDFWrite, molecules, v3000=False)
+
+
+def test_conformers():
+    g = chain(4)
+    g._conformers.append({1: (0., 0., 0.), 2: (1.2, .3, .5), 3: (2.4, -.1, -.5), 4: (3.5, 0., 1.25)})
+    text, (record,) = round_trip(SDFRead, SDFWrite, [g], v3000=True)
+    assert record._conformers == g._conformers
+    assert record._plane == {n: xyz[:2] for n, xyz in g._conformers[0].items()}
+    text, (record,) = round_trip(SDFRead, SDFWrite, [g])  # V2000 keeps plane
+    assert record._plane == g._plane and not record._conformers
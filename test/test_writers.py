@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+#  Copyright 2019 Ramil Nugmanov <nougmanoff@protonmail.com>
+#  This file is part of CGRtools.
+#
+#  CGRtools is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, see <https://www.gnu.org/licenses/>.
+#
+from io import StringIO
+from pathlib import Path
+from pytest import fixture, mark, raises
+from CGRtools.files import IOStats, MRVWrite, RDFRead, RDFWrite, SDFRead, SDFWrite
+
+
+data = Path(__file__).parent
+
+
+class Failing(StringIO):
+    def write(self, text):
+        raise OSError('disk full')
+
+
+@fixture(scope='module')
+def records():
+    with SDFRead(data / 'stereo.sdf') as f:
+        molecules = f.read()
+    with RDFRead(data / 'standardize.rdf') as f:
+        return {SDFWrite: molecules, MRVWrite: molecules, RDFWrite: f.read()}
+
+
+def text(writer, records, many=False, **kwargs):
+    out = StringIO()
+    with writer(out, **kwargs) as f:
+        if many:
+            f.write_many(records)
+        else:
+            for x in records:
+                f.write(x)
+        assert f.stats is kwargs.get('stats')
+    return '\n'.join(out.getvalue().splitlines()[1:])  # RDF header contains date
+
+
+@mark.parametrize('writer', (SDFWrite, RDFWrite, MRVWrite))
+def test_modes(writer, records):
+    records = records[writer]
+    expected = text(writer, records)
+    assert text(writer, records, background=True, buffer_size=1000) == expected
+    assert text(writer, records, True, chunksize=7) == expected
+    assert text(writer, records, True, workers=2, chunksize=7) == expected
+    stats = IOStats()
+    assert text(writer, records, True, background=True, workers=2, chunksize=30, stats=stats) == expected
+    assert stats.records == len(records)
+
+
+def test_flush(records, tmp_path):
+    path = tmp_path / 'out.sdf'
+    with SDFWrite(path, background=True) as f:
+        f.write_many(records[SDFWrite][:10])
+        f.flush()
+        with SDFRead(path) as r:
+            assert len(r.read()) == 10
+        f.write_many(records[SDFWrite][10:])
+    with SDFRead(path) as r:
+        assert len(r.read()) == len(records[SDFWrite])
+
+
+def test_background_error(records):
+    f = SDFWrite(Failing(), background=True)
+    f.write(records[SDFWrite][0])
+    with raises(OSError):
+        f.flush()
+    with raises(OSError):
+        f.close()
+    with raises(ValueError):
+        SDFWrite(StringIO(), workers=0)